@@ -0,0 +1,242 @@
+# backend/app/catalog.py
+
+import os
+import re
+import sqlite3
+import time
+
+# ==========================================
+# 0. Catalog (locations 테이블) 메타 정보
+# ==========================================
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BACKEND_DIR, "ktrip.db")
+
+
+def get_catalog_version(conn=None):
+    """
+    locations 카탈로그 버전 문자열.
+    catalog_meta 테이블이 있으면 거기 기록된 버전을, 없으면 행 수/최대 id 로 대신 계산합니다.
+    (캐시/사전계산 결과가 어떤 카탈로그로 만들어졌는지 비교하는 용도)
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        try:
+            row = conn.execute("SELECT value FROM catalog_meta WHERE key = 'version'").fetchone()
+            if row:
+                return str(row[0])
+        except sqlite3.OperationalError:
+            pass  # catalog_meta 없음
+        count, max_id = conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM locations").fetchone()
+        return f"{count}:{max_id}"
+    finally:
+        if own_conn:
+            conn.close()
+
+
+LOCATION_EXTRA_COLUMNS = {
+    "ai_summary": "TEXT",  # 장소별 영어 팁 (app/location_tips.py 가 offline 생성)
+    "name_en": "TEXT",     # 영어 이름 (팁 배치 / GPT 일정 응답에서 학습, 규칙 기반 플래너가 사용)
+    "row_hash": "TEXT",    # CSV 원본 행 해시 (init_db 증분 동기화가 변경 여부 비교에 사용)
+    "region": "TEXT",      # 시/도 단위 지역 키 (region_for, app/region_catalog.py 가 지역별로 나눠 로드)
+}
+
+
+def ensure_location_columns(conn):
+    """예전 init_db 로 만든 locations 테이블에는 추가 컬럼이 없으므로 필요하면 추가"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(locations)")}
+    missing = [name for name in LOCATION_EXTRA_COLUMNS if name not in columns]
+    for name in missing:
+        conn.execute(f"ALTER TABLE locations ADD COLUMN {name} {LOCATION_EXTRA_COLUMNS[name]}")
+    if "region" in missing:
+        # 주소/좌표로 지역을 채움 (카탈로그 내용 변경이 아니므로 버전은 그대로)
+        rows = conn.execute("SELECT id, address, lat, lng FROM locations").fetchall()
+        conn.executemany(
+            "UPDATE locations SET region = ? WHERE id = ?",
+            [(region_for(address, lat, lng), loc_id) for loc_id, address, lat, lng in rows],
+        )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_locations_region ON locations (region, place_type)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_locations_lat_lng ON locations (lat, lng)")  # region_near 범위 검색
+    conn.commit()
+
+
+# ==========================================
+# 0-1. Regions (시/도)
+# ==========================================
+# region 키 -> (주소 첫 단어 접두어, 검색어 별칭, 대표 좌표)
+# 주소 첫 단어로 정하므로 "경기도 광주시" 는 gyeonggi, "광주광역시" 는 gwangju 가 됩니다.
+REGIONS = {
+    "seoul": (("서울",), ("seoul", "gangnam", "hongdae", "myeongdong", "itaewon", "insadong", "seongsu"), (37.5665, 126.9780)),
+    "busan": (("부산",), ("busan", "haeundae", "gwangalli", "nampo"), (35.1796, 129.0756)),
+    "daegu": (("대구",), ("daegu",), (35.8714, 128.6014)),
+    "incheon": (("인천",), ("incheon", "songdo"), (37.4563, 126.7052)),
+    "gwangju": (("광주",), ("gwangju",), (35.1595, 126.8526)),
+    "daejeon": (("대전",), ("daejeon",), (36.3504, 127.3845)),
+    "ulsan": (("울산",), ("ulsan",), (35.5384, 129.3114)),
+    "sejong": (("세종",), ("sejong",), (36.4800, 127.2890)),
+    "gyeonggi": (("경기",), ("gyeonggi", "suwon", "paju", "gapyeong", "yongin"), (37.4138, 127.5183)),
+    "gangwon": (("강원",), ("gangwon", "gangneung", "sokcho", "chuncheon", "pyeongchang"), (37.8228, 128.1555)),
+    "chungbuk": (("충북", "충청북"), ("chungbuk", "chungcheongbuk", "cheongju"), (36.6357, 127.4917)),
+    "chungnam": (("충남", "충청남"), ("chungnam", "chungcheongnam", "buyeo", "gongju"), (36.5184, 126.8000)),
+    "jeonbuk": (("전북", "전라북"), ("jeonbuk", "jeollabuk", "jeonju"), (35.7175, 127.1530)),
+    "jeonnam": (("전남", "전라남"), ("jeonnam", "jeollanam", "yeosu", "suncheon", "mokpo"), (34.8679, 126.9910)),
+    "gyeongbuk": (("경북", "경상북"), ("gyeongbuk", "gyeongsangbuk", "gyeongju", "andong", "pohang"), (36.4919, 128.8889)),
+    "gyeongnam": (("경남", "경상남"), ("gyeongnam", "gyeongsangnam", "changwon", "tongyeong", "geoje"), (35.4606, 128.2132)),
+    "jeju": (("제주",), ("jeju", "seogwipo"), (33.4996, 126.5312)),
+}
+OTHER_REGION = "other"
+MAX_REGION_DISTANCE_KM = 80  # 주소로 못 정할 때 이 거리 안의 가장 가까운 대표 좌표로
+AREA_TOKEN_RE = re.compile(r"[\s,/()·]+")
+
+
+def region_for(address, lat=None, lng=None):
+    """주소(첫 단어) -> region 키, 안 되면 좌표로 가장 가까운 지역, 그것도 안 되면 OTHER_REGION"""
+    first = str(address or "").strip().split(" ")[0]
+    for region, (prefixes, aliases, _) in REGIONS.items():
+        if first.startswith(prefixes) or first.lower() in aliases:
+            return region
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return OTHER_REGION
+    best, best_km = OTHER_REGION, MAX_REGION_DISTANCE_KM
+    for region, (_, _, (c_lat, c_lng)) in REGIONS.items():
+        # 한국 위도에서는 경도 1도 ~ 89km 로 근사
+        km = (((lat - c_lat) * 111) ** 2 + ((lng - c_lng) * 89) ** 2) ** 0.5
+        if km < best_km:
+            best, best_km = region, km
+    return best
+
+
+def resolve_region(target_area):
+    """
+    설문 target_area ("Seoul", "부산 해운대", "Gyeongju", "경기도 광주" ...) -> region 키 또는 None
+    주소처럼 단어 단위로 앞에서부터 봅니다: 한글은 접두어("경기도" -> gyeonggi), 영어는 별칭/키와 일치
+    ("Gyeonggi-do" 처럼 '-' 뒤 행정구역 표기는 무시). 부분 문자열은 보지 않음 ("경기도 광주" 는 gwangju 가 아님)
+    """
+    for token in AREA_TOKEN_RE.split(str(target_area or "").strip().lower()):
+        if not token:
+            continue
+        word = token.split("-")[0]
+        for region, (prefixes, aliases, _) in REGIONS.items():
+            if token.startswith(prefixes) or word == region or word in aliases:
+                return region
+    return None
+
+
+# ==========================================
+# 1. Catalog Versions / Change Log
+# ==========================================
+# init_db 의 증분 동기화가 바뀐 행이 있을 때마다 catalog_meta 'version' 을 1씩 올리고
+# catalog_changes 에 (version, location_id, op) 를 남깁니다.
+# 캐시/색인은 자기가 만들어진 버전 이후 바뀐 id 만 보고 부분 갱신할 수 있습니다 (changed_ids_since).
+CHANGE_LOG_VERSIONS = 50  # 이만큼 지난 버전의 변경 기록은 정리 (더 오래된 캐시는 전체 재생성)
+
+
+def ensure_catalog_tables(conn):
+    # executescript 는 진행 중인 트랜잭션을 커밋해버리므로 execute 로 하나씩
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            version INTEGER NOT NULL,
+            location_id INTEGER NOT NULL,
+            op TEXT NOT NULL,               -- insert / update / delete
+            PRIMARY KEY (version, location_id)
+        ) WITHOUT ROWID
+    """)
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM catalog_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def record_catalog_changes(conn, changes):
+    """
+    {location id: op} 를 새 버전으로 기록하고 새 버전 번호를 반환.
+    호출하는 쪽 트랜잭션 안에서 실행 (locations 변경과 함께 커밋되어야 함)
+    """
+    ensure_catalog_tables(conn)
+    current = _get_meta(conn, "version")
+    version = int(current) + 1 if current and current.isdigit() else 1
+    conn.executemany(
+        "INSERT OR REPLACE INTO catalog_changes (version, location_id, op) VALUES (?, ?, ?)",
+        [(version, loc_id, op) for loc_id, op in changes.items()],
+    )
+    # log_base: 이 버전 이후의 변경은 모두 catalog_changes 에 남아 있음
+    log_base = max(int(_get_meta(conn, "log_base") or 0), version - CHANGE_LOG_VERSIONS) if version > 1 else 0
+    conn.execute("DELETE FROM catalog_changes WHERE version <= ?", (log_base,))
+    conn.executemany(
+        "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES (?, ?)",
+        [("version", str(version)), ("log_base", str(log_base)), ("updated_at", str(time.time()))],
+    )
+    return version
+
+
+def changed_ids_since(version, conn=None):
+    """
+    version 이후 바뀐 장소 -> {location id: 마지막 op}.
+    같은 버전이면 {}, 기록이 정리되었거나 예전 형식 버전("행수:최대id")이면 None (전체 재생성 필요)
+    """
+    version = str(version or "")
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        try:
+            current, base = _get_meta(conn, "version"), _get_meta(conn, "log_base")
+        except sqlite3.OperationalError:
+            return None  # catalog_meta 없음
+        if version == current:
+            return {}
+        if not version.isdigit() or current is None or base is None or int(version) < int(base):
+            return None
+        rows = conn.execute(
+            "SELECT location_id, op FROM catalog_changes WHERE version > ? ORDER BY version", (int(version),)
+        ).fetchall()
+    finally:
+        if own_conn:
+            conn.close()
+    return dict(rows)
+
+
+def save_english_names(names, conn=None):
+    """{location id: 영어 이름} 저장. 이미 이름이 있는 장소는 덮어쓰지 않음"""
+    if not names:
+        return
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        conn.executemany(
+            "UPDATE locations SET name_en = ? WHERE id = ? AND (name_en IS NULL OR name_en = '')",
+            [(name, loc_id) for loc_id, name in names.items()],
+        )
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+
+
+def save_location_tips(tips, conn=None):
+    """{location id: 영어 팁} 저장. 이미 팁이 있는 장소는 덮어쓰지 않음 (다시 만들 때는 location_tips --refresh)"""
+    if not tips:
+        return
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        conn.executemany(
+            "UPDATE locations SET ai_summary = ? WHERE id = ? AND (ai_summary IS NULL OR ai_summary = '')",
+            [(text, loc_id) for loc_id, text in tips.items()],
+        )
+        conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
@@ -0,0 +1,116 @@
+# backend/app/clients.py
+
+import os
+import threading
+import time
+
+# ==========================================
+# 0. Lazy SDK Clients
+# ==========================================
+# Azure / OpenAI SDK는 import만 해도 수백 ms가 걸립니다.
+# App Service 콜드 스타트를 줄이기 위해 "처음 쓰는 순간" import + 생성하고,
+# 한 번 만든 클라이언트는 프로세스 안에서 재사용합니다.
+
+OPENAI_API_VERSION = "2023-05-15"
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _get_or_create(name, factory):
+    client = _clients.get(name)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            client = factory()
+            _clients[name] = client
+    return client
+
+
+def get_openai_client():
+    """Azure OpenAI 클라이언트 (첫 호출 시 SDK import)"""
+    def factory():
+        from openai import AzureOpenAI
+        return AzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            api_version=OPENAI_API_VERSION,
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            max_retries=0,  # 재시도는 app/upstream.py 스케줄러가 담당
+        )
+    return _get_or_create("openai", factory)
+
+
+def get_document_client():
+    """Azure Document Intelligence 클라이언트. 키가 없으면 None"""
+    doc_endpoint = os.getenv("AZURE_DOC_ENDPOINT")
+    doc_key = os.getenv("AZURE_DOC_KEY")
+    if not doc_endpoint or not doc_key:
+        return None
+
+    def factory():
+        from azure.ai.documentintelligence import DocumentIntelligenceClient
+        from azure.core.credentials import AzureKeyCredential
+        return DocumentIntelligenceClient(
+            endpoint=doc_endpoint,
+            credential=AzureKeyCredential(doc_key),
+            retry_total=0,  # 재시도는 app/upstream.py 스케줄러가 담당
+        )
+    return _get_or_create("document", factory)
+
+
+def get_blob_service_client():
+    """Azure Blob Storage 클라이언트. 연결 문자열이 없으면 None"""
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if not connection_string:
+        return None
+
+    def factory():
+        from azure.storage.blob import BlobServiceClient
+        return BlobServiceClient.from_connection_string(connection_string)
+    return _get_or_create("blob", factory)
+
+
+# ==========================================
+# 1. Background Warm-up
+# ==========================================
+WARMUP_STEPS = {
+    "openai": get_openai_client,
+    "document": get_document_client,
+    "blob": get_blob_service_client,
+}
+
+
+def warm_up(steps=None):
+    """SDK import + 클라이언트 생성을 미리 해둡니다 (실패해도 서비스에는 영향 없음)"""
+    for name in steps or WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            WARMUP_STEPS[name]()
+            print(f"🔥 [warm-up] {name} 준비 완료 ({(time.perf_counter() - started) * 1000:.0f}ms)")
+        except Exception as e:
+            print(f"⚠️ [warm-up] {name} 실패: {e}")
+
+
+def start_background_warm_up(delay_sec=None):
+    """
+    서버가 트래픽을 받기 시작한 뒤 백그라운드 스레드에서 warm-up 실행.
+    KTRIP_WARMUP=0 이면 끄고, KTRIP_WARMUP=openai,blob 처럼 일부만 고를 수 있습니다.
+    """
+    setting = os.getenv("KTRIP_WARMUP", "1").strip().lower()
+    if setting in ("0", "false", "off", "no"):
+        return None
+    steps = None
+    if setting not in ("1", "true", "on", "yes", "all"):
+        steps = [s.strip() for s in setting.split(",") if s.strip() in WARMUP_STEPS]
+    if delay_sec is None:
+        delay_sec = float(os.getenv("KTRIP_WARMUP_DELAY_SEC", "1.0"))
+
+    def run():
+        time.sleep(delay_sec)
+        warm_up(steps)
+
+    thread = threading.Thread(target=run, name="ktrip-warmup", daemon=True)
+    thread.start()
+    return thread
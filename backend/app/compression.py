@@ -0,0 +1,85 @@
+# backend/app/compression.py
+
+import gzip
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .static_assets import COMPRESSIBLE_TYPES, _accepted_encodings, brotli
+
+# ==========================================
+# 0. API Response Compression
+# ==========================================
+# 15곳짜리 일정(팁 포함) / 메뉴 번역 결과는 JSON 이 수십 KB 라 로밍 데이터에서는 꽤 큽니다.
+# Accept-Encoding 을 보고 br(brotli 설치 시) > gzip 순서로 압축해서 보냅니다.
+#   - KTRIP_COMPRESS_MIN_BYTES (기본 1024) 보다 작은 응답은 그대로 (압축 이득보다 CPU 비용이 큼)
+#   - 이미 Content-Encoding 이 있는 응답(미리 압축한 정적 파일)과 이미지 등은 건드리지 않음
+#   - 스트리밍 응답(/api/analyze-menu/batch NDJSON 등)은 줄 단위로 바로 보내야 하므로 압축하지 않음
+# 요청마다 압축하므로 정적 파일(quality 11)보다 가벼운 압축 레벨을 씁니다.
+
+MIN_COMPRESS_BYTES = int(os.getenv("KTRIP_COMPRESS_MIN_BYTES", "1024"))
+BROTLI_QUALITY = 5
+GZIP_LEVEL = 6
+
+
+def choose_encoding(accept_encoding):
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=MIN_COMPRESS_BYTES, path_prefix="/api/"):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            return await self.app(scope, receive, send)
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message  # 본문을 보고 결정하므로 잠시 보류
+                return
+            if message["type"] != "http.response.body" or passthrough or start_message is None:
+                return await send(message)
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if (message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+
+            packed = compress(body, encoding)
+            if len(packed) >= len(body):
+                passthrough = True
+                await send(start_message)
+                return await send(message)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(packed))
+            headers.add_vary_header("Accept-Encoding")
+            passthrough = True  # 남은 메시지(없음)는 그대로
+            await send(start_message)
+            await send({"type": "http.response.body", "body": packed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,184 @@
+# backend/app/dish_memory.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from .catalog import DB_PATH
+from .shared_state import STATE_DB_PATH, connect_sqlite, import_legacy_table
+
+# ==========================================
+# 0. Dish Translation Memory
+# ==========================================
+# 김치찌개, 떡볶이, 비빔밥 같은 메뉴는 수천 개의 메뉴판에 반복해서 나옵니다.
+# 한 번 번역한 메뉴는 정규화한 한글 이름으로 저장해두고,
+# 다음 메뉴판에서는 처음 보는 메뉴만 GPT 에 보냅니다 (메모리가 쌓일수록 비용/지연 감소).
+# 가격이 없는 행을 GPT 가 "음식 아님"으로 건너뛰면 그것도 기억해서 다시 보내지 않습니다.
+# 조회수(hits)는 읽을 때마다 UPDATE 하지 않고 워커 메모리에 모았다가 KTRIP_DISH_HIT_FLUSH_SEC 마다 한 번에 저장합니다
+# (워커가 비정상 종료되면 그 사이의 조회수는 유실될 수 있음 - 통계용이라 허용).
+
+HIT_FLUSH_SEC = float(os.getenv("KTRIP_DISH_HIT_FLUSH_SEC", "60"))
+
+_PAREN_RE = re.compile(r"[\(\[（].*?[\)\]）]")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def normalize_dish_name(name):
+    """'김치 찌개 (2인분)' -> '김치찌개'. 공백/괄호 설명/구두점 제거, 라틴 문자는 소문자"""
+    name = unicodedata.normalize("NFC", str(name or ""))
+    name = _PAREN_RE.sub("", name)
+    return _NON_WORD_RE.sub("", name).lower()
+
+
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS dish_memory (
+            normalized_name TEXT PRIMARY KEY,
+            korean TEXT NOT NULL,
+            english TEXT,
+            description TEXT,
+            spicy_level INTEGER,
+            is_food INTEGER NOT NULL DEFAULT 1,   -- 0 이면 가게 이름/전화번호 같은 비메뉴 행
+            hits INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL
+        )
+    """)
+
+
+_table_ready = False
+
+
+def _connect():
+    global _table_ready
+    conn = connect_sqlite(STATE_DB_PATH)
+    if not _table_ready:
+        ensure_table(conn)
+        conn.commit()
+        import_legacy_table(conn, "dish_memory", DB_PATH)
+        _table_ready = True
+    return conn
+
+
+_pending_hits = Counter()
+_hits_lock = threading.Lock()
+_last_hit_flush = time.monotonic()
+
+
+def _count_hits(keys):
+    with _hits_lock:
+        _pending_hits.update(keys)
+        due = time.monotonic() - _last_hit_flush >= HIT_FLUSH_SEC
+    if due:
+        flush_dish_hits()
+
+
+def flush_dish_hits():
+    """메모리에 모아둔 조회수를 한 번의 트랜잭션으로 저장 (주기적으로 + 워커 종료 시). 저장한 메뉴 수 반환"""
+    global _last_hit_flush
+    with _hits_lock:
+        pending = dict(_pending_hits)
+        _pending_hits.clear()
+        _last_hit_flush = time.monotonic()
+    if not pending:
+        return 0
+    try:
+        conn = _connect()
+        try:
+            conn.executemany(
+                "UPDATE dish_memory SET hits = hits + ? WHERE normalized_name = ?",
+                [(n, key) for key, n in pending.items()],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        print(f"⚠️ [메뉴 메모리] 조회수 저장 실패, 다음 주기에 다시 시도: {e}")
+        with _hits_lock:
+            _pending_hits.update(pending)
+        return 0
+    return len(pending)
+
+
+def recall_dishes(rows):
+    """
+    rows: [{"name", "price"}]
+    -> (known, unknown_indices)
+       known: {row index: food dict 또는 None(비메뉴)}, unknown_indices: GPT 에 보내야 할 행 index 목록
+    """
+    keys = {i: normalize_dish_name(r["name"]) for i, r in enumerate(rows)}
+    wanted = sorted({k for k in keys.values() if k})
+    found = {}
+    if wanted:
+        conn = _connect()
+        try:
+            for start in range(0, len(wanted), 500):  # SQLite 변수 개수 제한
+                chunk = wanted[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, korean, english, description, spicy, is_food in conn.execute(
+                    f"SELECT normalized_name, korean, english, description, spicy_level, is_food "
+                    f"FROM dish_memory WHERE normalized_name IN ({placeholders})", chunk
+                ):
+                    found[key] = None if not is_food else {
+                        "korean": korean, "english": english, "description": description, "spicy_level": spicy,
+                    }
+        finally:
+            conn.close()
+        if found:
+            _count_hits(list(found))
+
+    known, unknown = {}, []
+    for i, key in keys.items():
+        if key and key in found and not (found[key] is None and rows[i].get("price")):
+            # 비메뉴로 기억된 이름이라도 이번에 가격이 붙어 있으면 GPT 에게 다시 물어봄
+            known[i] = found[key]
+        else:
+            unknown.append(i)
+    return known, unknown
+
+
+def learn_dishes(rows, foods):
+    """
+    GPT 에 보낸 rows 와 그 응답 foods({"i", "english", ...}) 를 메모리에 저장.
+    응답에 없는 행은 가격이 없을 때만 비메뉴로 기억합니다 (가격 있는 행은 GPT 가 빠뜨린 것일 수 있음).
+    """
+    by_index = {}
+    for food in foods:
+        try:
+            by_index[int(food.get("i"))] = food
+        except (TypeError, ValueError):
+            continue
+
+    now = time.time()
+    records = []
+    for i, row in enumerate(rows):
+        key = normalize_dish_name(row["name"])
+        if not key:
+            continue
+        food = by_index.get(i)
+        if food and food.get("english"):
+            records.append((key, food.get("korean") or row["name"], food["english"], food.get("description", ""),
+                            int(food.get("spicy_level") or 0), 1, now))
+        elif food is None and not row.get("price"):
+            records.append((key, row["name"], None, None, None, 0, now))
+    if not records:
+        return 0
+
+    conn = _connect()
+    try:
+        conn.executemany("""
+            INSERT INTO dish_memory
+                (normalized_name, korean, english, description, spicy_level, is_food, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(normalized_name) DO UPDATE SET
+                korean = excluded.korean, english = excluded.english, description = excluded.description,
+                spicy_level = excluded.spicy_level, is_food = excluded.is_food, updated_at = excluded.updated_at
+            WHERE excluded.is_food = 1 OR dish_memory.is_food = 0  -- 번역된 메뉴를 비메뉴로 덮어쓰지 않음
+        """, records)
+        conn.commit()
+    finally:
+        conn.close()
+    return len(records)
@@ -0,0 +1,56 @@
+# backend/app/fast_json.py
+
+import json
+import os
+
+from starlette.responses import JSONResponse
+
+# ==========================================
+# 0. Fast JSON (orjson, 선택 의존성)
+# ==========================================
+# LLM 응답 파싱 / API 응답 직렬화에 쓰는 JSON 함수 모음.
+#   - KTRIP_FAST_JSON=1 이고 orjson 이 설치되어 있으면 orjson 으로 (표준 json 보다 몇 배 빠름)
+#   - 기본값(KTRIP_FAST_JSON=0) 이거나 orjson 이 없으면 표준 json (opt-in)
+#   - 출력은 항상 ensure_ascii=False 와 같은 UTF-8 (한글을 \uXXXX 로 늘리지 않음)
+# orjson.JSONDecodeError 는 json.JSONDecodeError 의 하위 클래스라 기존 except 문은 그대로 동작합니다.
+#
+#   python bench_json.py     (직렬화 시간 / 압축 크기 벤치마크)
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+if os.getenv("KTRIP_FAST_JSON", "0") != "1":
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+def loads(data):
+    """str / bytes -> 파이썬 객체"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps_bytes(obj):
+    """파이썬 객체 -> 압축된(공백 없는) UTF-8 JSON bytes"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS)
+        except TypeError:
+            pass  # orjson 이 모르는 타입 (예: 64비트를 넘는 정수) -> 표준 json 으로
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps(obj):
+    """파이썬 객체 -> JSON 문자열 (json.dumps(obj, ensure_ascii=False) 대신)"""
+    return dumps_bytes(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """FastAPI 기본 응답 클래스 (main.py 의 default_response_class)"""
+
+    def render(self, content):
+        return dumps_bytes(content)
@@ -1,13 +1,78 @@
+import argparse
+import hashlib
+import json
 import sqlite3
 import pandas as pd
 import os
 
+try:
+    from .catalog import (
+        ensure_catalog_tables, ensure_location_columns, get_catalog_version, record_catalog_changes, region_for,
+    )
+except ImportError:  # python app/init_db.py 로 직접 실행한 경우
+    from catalog import (
+        ensure_catalog_tables, ensure_location_columns, get_catalog_version, record_catalog_changes, region_for,
+    )
+
 # 1. 파일 경로 설정 (backend 폴더 기준)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # backend 폴더
 CSV_PATH = os.path.join(BASE_DIR, "locations.csv")
 DB_PATH = os.path.join(BASE_DIR, "ktrip.db")
 
-def init_database():
+# CSV 한글 컬럼 -> DB 영어 컬럼 (연번은 id 로 사용)
+CSV_COLUMNS = {
+    "장소명": "name",
+    "주소": "address",
+    "위도": "lat",
+    "경도": "lng",
+    "제목": "media_title",
+    "미디어타입": "media_type",
+    "장소설명": "description",
+    "장소타입": "place_type",
+}
+FIELDS = list(CSV_COLUMNS.values())
+
+
+def _plain(value):
+    """numpy 스칼라 -> 파이썬 값 (해시가 CSV/DB 어느 쪽에서 계산해도 같도록)"""
+    return value.item() if hasattr(value, "item") else value
+
+
+def row_hash(values):
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def create_locations_table(cursor):
+    # 테이블 스키마 정의 (우리가 쓸 영어 변수명으로 매핑할 준비)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS locations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,   -- CSV 연번
+        name TEXT NOT NULL,         -- 장소명
+        address TEXT,               -- 주소
+        lat REAL,                   -- 위도
+        lng REAL,                   -- 경도
+        media_title TEXT,           -- 제목 (영화/드라마 이름)
+        media_type TEXT,            -- 미디어타입 (movie, drama 등)
+        description TEXT,           -- 장소설명
+        place_type TEXT,            -- 장소타입(restaurant, cafe, place)
+        ai_summary TEXT,            -- 장소별 영어 팁 (app/location_tips.py 가 오프라인 생성)
+        name_en TEXT,               -- 영어 이름 (규칙 기반 플래너가 사용)
+        row_hash TEXT,              -- CSV 행 해시 (증분 동기화용)
+        region TEXT                 -- 시/도 지역 키 (주소/좌표로 계산, 지역별 카탈로그 로드용)
+    )
+    """)
+
+
+def init_database(dry_run=False):
+    """
+    locations.csv -> locations 테이블 증분 동기화.
+    예전에는 DROP TABLE 후 전체를 다시 넣어서, 그동안 서버는 빈 테이블을 보고
+    ai_summary / name_en 같은 생성 데이터도 매번 사라졌습니다.
+      - 행마다 해시를 비교해 새 행/바뀐 행만 upsert, CSV 에서 빠진 행은 삭제 (한 트랜잭션)
+      - 바뀐 게 있으면 catalog_meta 버전을 올리고 바뀐 id 를 catalog_changes 에 기록
+      - WAL 모드라 서버는 커밋 전까지 이전 스냅샷을 그대로 읽음 (중단 없음)
+    반환: {"version", "inserted", "updated", "deleted", "unchanged"} (실패 시 None)
+    """
     print(f"📂 CSV 파일 읽는 중: {CSV_PATH}")
     
     # 2. CSV 파일 불러오기 (한글 컬럼명이므로 utf-8-sig 사용)
@@ -19,67 +84,106 @@ def init_database():
         print(f"   - 컬럼 목록: {list(df.columns)}")
     except FileNotFoundError:
         print("❌ 오류: locations.csv 파일을 찾을 수 없습니다. backend 폴더에 파일이 있는지 확인해주세요.")
-        return
+        return None
     except Exception as e:
         print(f"❌ 데이터 로드 실패: {e}")
-        return
+        return None
 
-    # 3. 데이터베이스 연결 (없으면 자동 생성됨)
-    conn = sqlite3.connect(DB_PATH)
+    # 3. CSV 행 -> {id: (값들, 해시)}
+    try:
+        source = {}
+        for _, row in df.iterrows():
+            values = [_plain(row[column]) for column in CSV_COLUMNS]
+            source[int(row['연번'])] = (values, row_hash(values))
+    except KeyError as e:
+        print(f"⚠️ 컬럼 이름이 다릅니다! CSV 파일의 헤더를 확인해주세요. (없는 컬럼: {e})")
+        return None
+    if len(source) != len(df):
+        print("❌ 연번이 중복된 행이 있습니다. CSV 파일을 확인해주세요.")
+        return None
+
+    # 4. 데이터베이스 연결 (없으면 자동 생성됨)
+    # git 으로 배포되는 파일이라 WAL 로 바꾸지 않음. 서버 읽기는 마지막 COMMIT 순간에만 잠깐 기다림
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.isolation_level = None  # 트랜잭션을 직접 관리
     cursor = conn.cursor()
+    try:
+        # 스키마 준비 (테이블이 없을 때만 생성 / 컬럼 추가는 기존 행에 영향 없음)
+        create_locations_table(cursor)
+        ensure_location_columns(conn)
+        ensure_catalog_tables(conn)
 
-    # 4. 기존 테이블이 있다면 삭제하고 새로 생성 (초기화)
-    cursor.execute("DROP TABLE IF EXISTS locations")
-    
-    # 5. 테이블 스키마 정의 (우리가 쓸 영어 변수명으로 매핑할 준비)
-    # [수정 1] description 뒤에 쉼표(,) 추가!
-    cursor.execute("""
-    CREATE TABLE locations (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,         -- 장소명
-        address TEXT,               -- 주소
-        lat REAL,                   -- 위도
-        lng REAL,                   -- 경도
-        media_title TEXT,           -- 제목 (영화/드라마 이름)
-        media_type TEXT,            -- 미디어타입 (movie, drama 등)
-        description TEXT,           -- 장소설명 (여기 쉼표 필수!)
-        place_type TEXT             -- 장소타입(restaurant, cafe, place)
-    )
-    """)
+        cursor.execute("BEGIN IMMEDIATE")  # 동시에 두 번 실행되지 않도록 쓰기 잠금
 
-    # 6. 데이터 집어넣기 (한글 컬럼 -> 영어 DB 컬럼 매핑)
-    success_count = 0
-    
-    for index, row in df.iterrows():
-        try:
-            # CSV의 한글 컬럼명에서 데이터를 꺼냅니다.
-            name = row['장소명']
-            address = row['주소']
-            lat = row['위도']
-            lng = row['경도']
-            media_title = row['제목']
-            media_type = row['미디어타입']
-            description = row['장소설명']
-            place_type = row['장소타입']
-
-            # [수정 2] VALUES에 물음표 8개, 변수에도 place_type 추가!
-            cursor.execute("""
-            INSERT INTO locations (name, address, lat, lng, media_title, media_type, description, place_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (name, address, lat, lng, media_title, media_type, description, place_type))
-            
-            success_count += 1
-            
-        except KeyError as e:
-            print(f"⚠️ 컬럼 이름이 다릅니다! CSV 파일의 헤더를 확인해주세요. (없는 컬럼: {e})")
-            break
-        except Exception as e:
-            print(f"⚠️ {index}번째 행 저장 실패: {e}")
-
-    # 7. 저장 및 종료
-    conn.commit()
-    conn.close()
-    print(f"🎉 총 {success_count}개 장소 데이터 저장 완료! (DB 파일: {DB_PATH})")
+        existing = {}
+        for loc_id, stored_hash, *values in cursor.execute(
+            f"SELECT id, row_hash, {', '.join(FIELDS)} FROM locations"
+        ):
+            existing[loc_id] = stored_hash or row_hash(values)  # 해시가 없던 예전 행은 현재 값으로 계산
+
+        # 5. 비교
+        changes, upserts = {}, []
+        for loc_id, (values, digest) in source.items():
+            if loc_id not in existing:
+                changes[loc_id] = "insert"
+                upserts.append((loc_id, *values, digest, region_for(*values[1:4])))
+            elif existing[loc_id] != digest:
+                changes[loc_id] = "update"
+                upserts.append((loc_id, *values, digest, region_for(*values[1:4])))
+        deleted = [loc_id for loc_id in existing if loc_id not in source]
+        for loc_id in deleted:
+            changes[loc_id] = "delete"
+        unchanged = len(source) - len(upserts)
+
+        # 6. 반영 (이름/설명이 바뀐 장소는 생성 데이터도 비워서 다시 만들게 함)
+        cursor.executemany(f"""
+            INSERT INTO locations (id, {', '.join(FIELDS)}, row_hash, region)
+            VALUES ({', '.join('?' * (len(FIELDS) + 3))})
+            ON CONFLICT(id) DO UPDATE SET
+                {', '.join(f'{field} = excluded.{field}' for field in FIELDS)},
+                row_hash = excluded.row_hash,
+                region = excluded.region,
+                ai_summary = CASE WHEN name = excluded.name AND description = excluded.description
+                                  THEN ai_summary END,
+                name_en = CASE WHEN name = excluded.name THEN name_en END
+        """, upserts)
+        cursor.executemany("DELETE FROM locations WHERE id = ?", [(loc_id,) for loc_id in deleted])
+        # 해시가 없던 예전 행 중 내용이 같은 행은 해시만 채움 (변경으로 치지 않음)
+        backfill = [(source[loc_id][1], loc_id) for loc_id in existing if loc_id in source and loc_id not in changes]
+        cursor.executemany("UPDATE locations SET row_hash = ? WHERE id = ? AND row_hash IS NULL", backfill)
+
+        # 버전 기록이 없던 DB 는 바뀐 게 없어도 첫 버전을 남김 (캐시가 이 버전부터 변경을 추적)
+        if changes or not get_catalog_version(conn).isdigit():
+            version = record_catalog_changes(conn, changes)
+        else:
+            version = None
+        if dry_run:
+            cursor.execute("ROLLBACK")
+        else:
+            cursor.execute("COMMIT")
+    except Exception as e:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        print(f"❌ 동기화 실패 (변경 없음): {e}")
+        return None
+    finally:
+        conn.close()
+
+    # 7. 결과
+    summary = {
+        "version": version,
+        "inserted": sum(op == "insert" for op in changes.values()),
+        "updated": sum(op == "update" for op in changes.values()),
+        "deleted": len(deleted),
+        "unchanged": unchanged,
+    }
+    label = "🧪 [dry-run] " if dry_run else "🎉 "
+    if changes:
+        print(f"{label}카탈로그 v{version}: 추가 {summary['inserted']}, 수정 {summary['updated']}, "
+              f"삭제 {summary['deleted']}, 그대로 {unchanged} (DB 파일: {DB_PATH})")
+    else:
+        print(f"{label}변경 없음: {unchanged}개 장소 모두 최신 상태 (DB 파일: {DB_PATH})")
+    return summary
 
 def init_visited_table():
     """추가 기능: 방문자 카운트를 위한 visited_spots 테이블 생성"""
@@ -108,13 +212,15 @@ def init_visited_table():
     print("✅ 'visited_spots' 테이블 준비 완료!")
 
 if __name__ == "__main__":
-    # 1. 기존 장소 데이터 초기화 실행
-    init_database()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="바뀔 내용만 출력하고 반영하지 않음")
+    args = parser.parse_args()
+
+    # 1. 장소 데이터 증분 동기화
+    init_database(dry_run=args.dry_run)
     
     # 2. 새로운 방문자 카운트 테이블 생성 실행
-    init_visited_table()
+    if not args.dry_run:
+        init_visited_table()
     
     print(f"\n🚀 모든 데이터베이스 설정이 완료되었습니다! (경로: {DB_PATH})")
-
-if __name__ == "__main__":
-    init_database()
\ No newline at end of file
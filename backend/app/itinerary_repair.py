@@ -0,0 +1,241 @@
+# backend/app/itinerary_repair.py
+
+import difflib
+import re
+
+from . import fast_json
+from .catalog import REGIONS
+from .clients import get_openai_client
+from .planner import (ROLE_CATEGORIES, candidate_to_spot, distance_km, pick_candidate, slot_pattern,
+                      usable_candidates)
+from .region_catalog import region_of_spots
+from .upstream import UpstreamOverloaded, chat_completion
+
+# ==========================================
+# 0. Itinerary Validation & Slot Repair
+# ==========================================
+# GPT 일정이 규칙을 어겨도 통째로 버리거나 전체를 다시 생성하지 않고, 문제가 있는 칸만 고칩니다.
+#   1) 카탈로그 매칭: location_id / korean_id / 영어 이름 / 좌표로 검색 후보에 붙이고 좌표·미디어·팁은 카탈로그 값으로
+#   2) 중복 제거, 후보에 없는(지어낸) 장소 제거
+#   3) 역할 순서(Lunch -> Tour -> Cafe -> Tour -> Dinner)에 맞게 순서 교체 + 역할 표기 수정
+#   4) 그래도 빈 칸만 작은 GPT 호출로 한 칸씩 채움 (실패하거나 빈 칸이 많으면 규칙 기반 선택)
+
+MAX_LLM_SLOT_REPAIRS = 3     # 이보다 빈 칸이 많으면 GPT 응답 자체가 잘못된 것 -> 전부 규칙 기반으로
+SLOT_CANDIDATES = 8          # 한 칸 보정 호출에 보여줄 후보 수
+SNAP_RADIUS_KM = 0.15        # 좌표만 맞는 경우 이 거리 안의 후보로 매칭
+NAME_MATCH_CUTOFF = 0.75
+
+ROLE_RE = re.compile(r"\s*\(([A-Za-z]+)\)\s*$")
+HANGUL_RE = re.compile(r"[가-힣]")
+
+
+def _norm_name(text):
+    return re.sub(r"[^\w]+", "", ROLE_RE.sub("", str(text or ""))).lower()
+
+
+class _Catalog:
+    """검색된 후보(get_db_info 결과) 색인"""
+
+    def __init__(self, db_data):
+        self.candidates = usable_candidates(db_data)
+        self.category_of = {}
+        self.by_id, self.by_korean, self.by_english = {}, {}, {}
+        for category, items in self.candidates.items():
+            for item in items:
+                self.category_of[item["korean_id"]] = category
+                self.by_id.setdefault(item.get("location_id"), item)
+                self.by_korean.setdefault(_norm_name(item["korean_id"]), item)
+                if item.get("name_en"):
+                    self.by_english.setdefault(_norm_name(item["name_en"]), item)
+
+    def snap(self, spot):
+        """spot -> 카탈로그 후보 또는 None"""
+        item = self.by_id.get(spot.get("location_id"))
+        if item:
+            return item
+        for key, index in ((spot.get("korean_id"), self.by_korean), (spot.get("name"), self.by_english),
+                           (spot.get("name"), self.by_korean)):
+            key = _norm_name(key)
+            if not key:
+                continue
+            if key in index:
+                return index[key]
+            close = difflib.get_close_matches(key, list(index), n=1, cutoff=NAME_MATCH_CUTOFF)
+            if close:
+                return index[close[0]]
+        if spot.get("lat") and spot.get("lng"):
+            nearest = min((i for items in self.candidates.values() for i in items),
+                          key=lambda i: distance_km(spot, i), default=None)
+            if nearest is not None and distance_km(spot, nearest) <= SNAP_RADIUS_KM:
+                return nearest
+        return None
+
+
+def _apply_catalog(spot, item, role):
+    """좌표/미디어/팁은 카탈로그 값으로, 이름 끝의 역할 표기는 칸 역할로"""
+    name = ROLE_RE.sub("", str(spot.get("name") or "")).strip()
+    if not name or HANGUL_RE.search(name):
+        name = item.get("name_en") or name or item["korean_id"]
+    spot.pop("korean_id", None)
+    spot.update({
+        "name": f"{name}({role})",
+        "lat": item["lat"],
+        "lng": item["lng"],
+        "media_title": item.get("media_title") or "",
+        "location_id": item.get("location_id"),
+    })
+    if item.get("tips"):
+        spot["tips"] = item["tips"]
+    spot.setdefault("tips", "")
+    spot.setdefault("description", "")
+    return spot
+
+
+def _assign_slots(matched, pattern, catalog):
+    """카테고리가 맞는 장소를 원래 순서대로 칸에 배정 (주 카테고리 먼저, 다음에 대체 카테고리)"""
+    slots = [None] * len(pattern)
+    remaining = list(matched)
+    for fallback in (False, True):
+        for position, role in enumerate(pattern):
+            if slots[position] is not None:
+                continue
+            categories = ROLE_CATEGORIES[role][1:] if fallback else ROLE_CATEGORIES[role][:1]
+            for k, (spot, item) in enumerate(remaining):
+                if catalog.category_of[item["korean_id"]] in categories:
+                    slots[position] = remaining.pop(k)
+                    break
+    return slots, remaining
+
+
+def _previous_item(slots, position):
+    for k in range(position - 1, -1, -1):
+        if slots[k] is not None:
+            return slots[k][1]
+    return None
+
+
+def _itinerary_place(assigned, catalog):
+    """일정 장소(없으면 검색 후보)들의 지역 -> 프롬프트에 쓸 영어 지역 이름 ('seoul' -> 'Seoul', 모르면 'Korea')"""
+    items = [item for _, item in assigned] or [item for items in catalog.candidates.values() for item in items]
+    region = region_of_spots(items)
+    return region.title() if region in REGIONS else "Korea"
+
+
+def _llm_pick(role, options, previous, used_names, place):
+    """한 칸만 고르는 작은 GPT 호출 -> (후보, 영어 이름, 설명) 또는 None"""
+    lines = [f"{k} | {o['korean_id']} | {o.get('media') or '-'} | {o.get('description', '')[:80]}"
+             for k, o in enumerate(options)]
+    prompt = (
+        f"Pick ONE place for the ({role}) slot of a K-culture itinerary in {place}.\n"
+        f"Previous stop: {previous['korean_id'] if previous else 'none'}. Already in plan: {', '.join(used_names) or 'none'}.\n"
+        "Options (index | Korean name | related content | description):\n" + "\n".join(lines) +
+        '\nReturn JSON: {"index": <int>, "name": "<natural English name>", "description": "<one English sentence>"}'
+    )
+    response = chat_completion(
+        get_openai_client(),
+        max_output_tokens=80,
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0,
+        response_format={"type": "json_object"},
+    )
+    picked = fast_json.loads(response.choices[0].message.content)
+    index = int(picked.get("index"))
+    if not 0 <= index < len(options):
+        return None
+    return options[index], str(picked.get("name") or ""), str(picked.get("description") or "")
+
+
+def _fill_slot(position, role, slots, catalog, used, llm_budget, place):
+    """빈 칸 하나 채우기. llm_budget["calls"] 가 남아 있으면 GPT 로 (place: 일정 지역 이름), 아니면 규칙 기반으로"""
+    previous = _previous_item(slots, position)
+    for category in ROLE_CATEGORIES[role]:
+        pool = [c for c in catalog.candidates.get(category, []) if c["korean_id"] not in used]
+        if not pool:
+            continue
+        if llm_budget["calls"] > 0:
+            llm_budget["calls"] -= 1
+            # 직전 장소 기준 (거리 - 관련도) 상위 후보만 보여줌
+            options = []
+            while pool and len(options) < SLOT_CANDIDATES:
+                best = pick_candidate(pool, set(), previous)
+                options.append(best)
+                pool.remove(best)
+            try:
+                picked = _llm_pick(role, options, previous, [s[1]["korean_id"] for s in slots if s is not None], place)
+                if picked:
+                    item, name, description = picked
+                    spot = {"name": name, "description": description}
+                    return _apply_catalog(spot, item, role), item, category
+            except UpstreamOverloaded:
+                llm_budget["calls"] = 0  # 과부하면 더 부르지 않고 규칙 기반으로
+            except Exception as e:
+                print(f"⚠️ [일정 보정] {role} 칸 GPT 보정 실패, 규칙 기반으로 대체: {e}")
+            item = options[0]
+        else:
+            item = pick_candidate(pool, set(), previous)
+        return candidate_to_spot(item, role, category), item, category
+    return None
+
+
+def repair_itinerary(result_json, db_data, duration, allow_llm=True):
+    """
+    GPT 일정(JSON 문자열) -> 검증/보정된 JSON 문자열.
+    JSON 자체가 깨졌으면 빈 일정으로 보고 전 칸을 규칙 기반으로 채웁니다.
+    """
+    try:
+        parsed = fast_json.loads(result_json)
+        if not isinstance(parsed, dict):
+            raise ValueError("not an object")
+    except (TypeError, ValueError):
+        parsed = {}
+    spots = parsed.get("spots") if isinstance(parsed.get("spots"), list) else []
+
+    catalog = _Catalog(db_data)
+    pattern = slot_pattern(duration)
+    problems = []
+
+    # 1) 카탈로그 매칭 + 중복/미확인 장소 제거
+    matched, seen = [], set()
+    for spot in spots:
+        item = catalog.snap(spot) if isinstance(spot, dict) else None
+        if item is None:
+            problems.append(f"unknown:{spot.get('name') if isinstance(spot, dict) else spot}")
+        elif item["korean_id"] in seen:
+            problems.append(f"duplicate:{item['korean_id']}")
+        else:
+            seen.add(item["korean_id"])
+            matched.append((spot, item))
+
+    # 2) 역할 순서에 맞게 배정 (남는 장소는 버림)
+    slots, extra = _assign_slots(matched, pattern, catalog)
+    assigned = [s for s in slots if s is not None]
+    kept = {id(s) for s, _ in assigned}
+    if [id(s) for s, _ in assigned] != [id(s) for s, _ in matched if id(s) in kept]:
+        problems.append("reordered")
+    if extra:
+        problems.append(f"extra:{len(extra)}")
+    for position, role in enumerate(pattern):
+        if slots[position] is not None:
+            spot, item = slots[position]
+            slots[position] = (_apply_catalog(spot, item, role), item)
+
+    # 3) 빈 칸만 채움
+    missing = [k for k, s in enumerate(slots) if s is None]
+    if missing:
+        problems.append(f"missing:{len(missing)}")
+        llm_budget = {"calls": len(missing) if allow_llm and len(missing) <= MAX_LLM_SLOT_REPAIRS else 0}
+        used = {item["korean_id"] for _, item in assigned}
+        place = _itinerary_place(assigned, catalog) if llm_budget["calls"] else None
+        for position in missing:
+            filled = _fill_slot(position, pattern[position], slots, catalog, used, llm_budget, place)
+            if filled is None:
+                continue
+            spot, item, _ = filled
+            slots[position] = (spot, item)
+            used.add(item["korean_id"])
+
+    if problems:
+        print(f"🔧 [일정 보정] {', '.join(problems)}")
+    parsed["spots"] = [spot for spot, _ in (s for s in slots if s is not None)]
+    return fast_json.dumps(parsed)
@@ -0,0 +1,117 @@
+# backend/app/itinerary_sessions.py
+
+import os
+import re
+import sqlite3
+import uuid
+
+from .catalog import DB_PATH
+from .shared_state import get_shared_store
+
+# ==========================================
+# 0. Server-side Itinerary Sessions
+# ==========================================
+# 예전에는 chat.html 이 메시지마다 current_spots 전체(팁 포함)를 /api/modify 로 보내고,
+# 그 JSON 이 그대로 프롬프트에 들어갔습니다 (대화가 길어질수록 요청/프롬프트가 커짐).
+# /api/recommend 가 session_id 를 발급하고 일정은 공유 저장소(shared_state)에 TTL 과 함께 보관합니다.
+#   - 저장 형식: 카탈로그에서 다시 채울 수 있는 좌표/미디어/팁은 빼고 {id, role, name, description}만
+#   - /api/modify 는 {session_id, message} 만 받음
+# 만료된 세션이면 클라이언트가 current_spots 로 한 번 다시 보내서 새 세션을 만듭니다.
+
+SESSION_TTL_SEC = int(os.getenv("KTRIP_SESSION_TTL_SEC", str(6 * 3600)))
+SESSION_PREFIX = "itinerary_session:"
+
+ROLE_RE = re.compile(r"\s*\(([A-Za-z]+)\)\s*$")
+
+
+def split_role(name):
+    """'N Seoul Tower(Tour)' -> ('N Seoul Tower', 'Tour')"""
+    name = str(name or "")
+    match = ROLE_RE.search(name)
+    if not match:
+        return name.strip(), ""
+    return name[:match.start()].strip(), match.group(1)
+
+
+def compact_spot(spot, catalog_tips=None):
+    """전체 spot -> 저장용 압축 형태. 카탈로그에 없는 장소는 그대로 보관"""
+    loc_id = spot.get("location_id")
+    if not loc_id:
+        return {"raw": spot}
+    name, role = split_role(spot.get("name"))
+    item = {"id": loc_id, "role": role, "name": name, "description": spot.get("description", "")}
+    tips = spot.get("tips") or ""
+    if tips and tips != (catalog_tips or {}).get(loc_id):
+        item["tips"] = tips  # GPT 가 만든 팁 (카탈로그에 아직 없음)
+    return item
+
+
+def _catalog_rows(ids):
+    if not ids:
+        return {}
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT id, lat, lng, media_title, ai_summary FROM locations WHERE id IN ({placeholders})", list(ids)
+        ).fetchall()
+    except sqlite3.OperationalError:  # ai_summary 컬럼이 없는 예전 DB
+        rows = conn.execute(
+            f"SELECT id, lat, lng, media_title, NULL FROM locations WHERE id IN ({placeholders})", list(ids)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {r[0]: r for r in rows}
+
+
+def expand_spots(items):
+    """압축 형태 -> 프론트엔드가 쓰는 전체 spot 목록 (좌표/미디어/팁은 카탈로그에서)"""
+    catalog = _catalog_rows({i["id"] for i in items if "id" in i})
+    spots = []
+    for item in items:
+        if "raw" in item:
+            spots.append(item["raw"])
+            continue
+        row = catalog.get(item["id"])
+        if row is None:
+            continue  # 카탈로그에서 삭제된 장소
+        _, lat, lng, media_title, ai_summary = row
+        role = f"({item['role']})" if item.get("role") else ""
+        spots.append({
+            "name": f"{item['name']}{role}",
+            "description": item.get("description", ""),
+            "lat": lat,
+            "lng": lng,
+            "media_title": media_title or "",
+            "location_id": item["id"],
+            "tips": item.get("tips") or ai_summary or "",
+        })
+    return spots
+
+
+def _save(session_id, spots):
+    ids = {s.get("location_id") for s in spots if s.get("location_id")}
+    catalog_tips = {loc_id: row[4] for loc_id, row in _catalog_rows(ids).items()}
+    items = [compact_spot(s, catalog_tips) for s in spots if isinstance(s, dict)]
+    get_shared_store().set(SESSION_PREFIX + session_id, {"spots": items}, ttl=SESSION_TTL_SEC)
+
+
+def create_session(spots):
+    session_id = uuid.uuid4().hex
+    _save(session_id, spots)
+    return session_id
+
+
+def load_session(session_id):
+    """전체 spot 목록 또는 None (없거나 만료). 읽을 때마다 TTL 연장"""
+    if not session_id:
+        return None
+    data = get_shared_store().get(SESSION_PREFIX + session_id)
+    if data is None:
+        return None
+    get_shared_store().set(SESSION_PREFIX + session_id, data, ttl=SESSION_TTL_SEC)
+    return expand_spots(data["spots"])
+
+
+def update_session(session_id, spots):
+    _save(session_id, spots)
@@ -0,0 +1,267 @@
+# backend/app/itinerary_templates.py
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .catalog import DB_PATH, changed_ids_since, get_catalog_version
+from .shared_state import STATE_DB_PATH, connect_sqlite, get_shared_store, import_legacy_table
+
+# ==========================================
+# 0. Precomputed Itinerary Templates
+# ==========================================
+# 설문 응답은 대부분 (target_area, duration, interests, food_preference) 몇 가지 조합으로 몰립니다.
+# 인기 조합은 한가한 시간에 배치로 get_ai_recommendation 을 미리 돌려 저장해두고,
+# /api/recommend 는 일치하는 조합이 있으면 LLM 없이 즉시 응답합니다.
+#
+#   python -m app.itinerary_templates --top 50 --workers 4          (요청 로그 상위 조합)
+#   python -m app.itinerary_templates --config popular_surveys.json  (설정 파일의 조합)
+
+TEMPLATE_FIELDS = ("target_area", "duration", "interests", "food_preference")
+
+# 설정 파일 조합에 없는 나머지 설문 항목은 아래 기본값으로 채워서 생성
+DEFAULT_SURVEY = {
+    "pace": "Balanced pace",
+    "companion": "Solo",
+    "k_content_ratio": "About half",
+    "need_cafe": "Nice to have",
+    "photo_priority": "Sometimes",
+    "record_method": "Instagram-style summary",
+}
+
+
+def _norm(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def canonical_survey(survey):
+    """템플릿 키에 쓰이는 4개 항목(+ 사용자 좌표로 정한 region)만 정규화 (대소문자/공백/관심사 순서 무시)"""
+    interests = survey.get("interests") or []
+    if not isinstance(interests, list):
+        interests = [interests]
+    canonical = {
+        "target_area": _norm(survey.get("target_area")),
+        "duration": _norm(survey.get("duration")),
+        "interests": sorted({_norm(i) for i in interests if _norm(i)}),
+        "food_preference": _norm(survey.get("food_preference")),
+    }
+    if survey.get("region"):  # 좌표가 없던 설문의 기존 키는 그대로
+        canonical["region"] = _norm(survey["region"])
+    return canonical
+
+
+def survey_key(survey):
+    canonical = json.dumps(canonical_survey(survey), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def ensure_tables(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS survey_stats (
+            survey_key TEXT PRIMARY KEY,
+            survey_json TEXT NOT NULL,      -- 가장 최근에 들어온 원본 설문 (배치 생성 시 사용)
+            count INTEGER NOT NULL DEFAULT 0,
+            last_seen REAL
+        );
+        CREATE TABLE IF NOT EXISTS itinerary_templates (
+            survey_key TEXT PRIMARY KEY,
+            survey_json TEXT NOT NULL,
+            itinerary_json TEXT NOT NULL,
+            catalog_version TEXT NOT NULL,
+            created_at REAL NOT NULL
+        );
+    """)
+
+
+_tables_ready = False
+
+
+def _connect():
+    global _tables_ready
+    conn = connect_sqlite(STATE_DB_PATH)
+    if not _tables_ready:
+        ensure_tables(conn)
+        conn.commit()
+        for table in ("survey_stats", "itinerary_templates"):
+            import_legacy_table(conn, table, DB_PATH)
+        _tables_ready = True
+    return conn
+
+
+# ==========================================
+# 1. Request Log / Lookup
+# ==========================================
+def record_survey(survey):
+    """설문 조합 빈도 기록 (배치 작업이 인기 조합을 고르는 근거)"""
+    conn = _connect()
+    try:
+        conn.execute("""
+            INSERT INTO survey_stats (survey_key, survey_json, count, last_seen) VALUES (?, ?, 1, ?)
+            ON CONFLICT(survey_key) DO UPDATE SET
+                count = count + 1, survey_json = excluded.survey_json, last_seen = excluded.last_seen
+        """, (survey_key(survey), json.dumps(survey, ensure_ascii=False), time.time()))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_template(survey, catalog_version=None):
+    """(itinerary dict, is_stale) 또는 None. 일정에 쓰인 장소가 카탈로그에서 바뀌었으면 stale"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT itinerary_json, catalog_version FROM itinerary_templates WHERE survey_key = ?",
+            (survey_key(survey),),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    if catalog_version is None:
+        catalog_version = get_catalog_version()
+    itinerary = json.loads(row[0])
+    built_version = row[1]
+    if built_version == catalog_version:
+        return itinerary, False
+    # 카탈로그가 바뀌었어도 이 일정에 쓰인 장소가 그대로면 계속 사용 (변경 기록이 없으면 stale)
+    changed = changed_ids_since(built_version)
+    if changed is None:
+        return itinerary, True
+    used_ids = {spot.get("location_id") for spot in itinerary.get("spots", []) if isinstance(spot, dict)}
+    if changed and None in used_ids:  # 카탈로그 id 가 없는 장소는 확인할 수 없으므로 stale
+        return itinerary, True
+    return itinerary, bool(used_ids & changed.keys())
+
+
+def save_template(survey, itinerary, catalog_version):
+    conn = _connect()
+    try:
+        conn.execute("""
+            INSERT OR REPLACE INTO itinerary_templates
+                (survey_key, survey_json, itinerary_json, catalog_version, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            survey_key(survey),
+            json.dumps(survey, ensure_ascii=False),
+            json.dumps(itinerary, ensure_ascii=False),
+            catalog_version,
+            time.time(),
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ==========================================
+# 2. Precompute (batch / background refresh)
+# ==========================================
+def build_template(survey, catalog_version=None):
+    """get_ai_recommendation 으로 한 조합을 생성해서 저장. 성공하면 True"""
+    from .llm import get_ai_recommendation
+
+    if catalog_version is None:
+        catalog_version = get_catalog_version()
+    full_survey = {**DEFAULT_SURVEY, **survey}
+    try:
+        itinerary = json.loads(get_ai_recommendation(json.dumps(full_survey, ensure_ascii=False)))
+    except Exception as e:
+        print(f"⚠️ [템플릿] 생성 실패 ({survey.get('target_area')}, {survey.get('duration')}): {e}")
+        return False
+    if not itinerary.get("spots"):
+        return False
+    save_template(full_survey, itinerary, catalog_version)
+    return True
+
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+REFRESH_LEASE_SEC = 300
+
+
+def refresh_template(survey):
+    """
+    stale 템플릿 백그라운드 재생성.
+    같은 조합을 여러 요청/워커가 동시에 재생성하지 않도록 공유 저장소에 lease 를 잡습니다.
+    """
+    key = survey_key(survey)
+    lease_key = f"template-refresh:{key}"
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+    try:
+        store = get_shared_store()
+        if not store.add(lease_key, True, ttl=REFRESH_LEASE_SEC):
+            return  # 다른 워커가 재생성 중
+        try:
+            if build_template(survey):
+                print(f"♻️ [템플릿] 갱신 완료: {canonical_survey(survey)}")
+        finally:
+            store.delete(lease_key)
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(key)
+
+
+def top_surveys(limit=50, min_count=2):
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT survey_json FROM survey_stats WHERE count >= ? ORDER BY count DESC LIMIT ?",
+            (min_count, limit),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [json.loads(r[0]) for r in rows]
+
+
+def precompute(surveys, workers=4, stale_only=False):
+    """조합 목록을 bounded parallelism 으로 생성 (workers 개 이상 동시에 Azure 를 호출하지 않음)"""
+    catalog_version = get_catalog_version()
+    todo = []
+    seen = set()
+    for survey in surveys:
+        key = survey_key(survey)
+        if key in seen:
+            continue
+        seen.add(key)
+        if stale_only:
+            cached = get_template(survey, catalog_version)
+            if cached and not cached[1]:
+                continue
+        todo.append(survey)
+
+    print(f"🧮 [템플릿] {len(todo)}개 조합 생성 시작 (동시 {workers}개, 카탈로그 {catalog_version})")
+    started = time.perf_counter()
+    ok = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [pool.submit(build_template, survey, catalog_version) for survey in todo]
+        for future in as_completed(futures):
+            ok += 1 if future.result() else 0
+    print(f"✅ [템플릿] {ok}/{len(todo)}개 저장 ({time.perf_counter() - started:.1f}s)")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인기 설문 조합 일정 사전 생성")
+    parser.add_argument("--top", type=int, default=50, help="요청 로그 상위 N개 조합")
+    parser.add_argument("--min-count", type=int, default=2)
+    parser.add_argument("--config", help="설문 조합 목록 JSON 파일 (list of survey dict)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--stale-only", action="store_true", help="없거나 카탈로그 버전이 바뀐 조합만")
+    args = parser.parse_args()
+
+    surveys = []
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            surveys.extend(json.load(f))
+    if args.top:
+        surveys.extend(top_surveys(args.top, args.min_count))
+    precompute(surveys, workers=args.workers, stale_only=args.stale_only)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,13 @@
-import os
-import json
 import sqlite3
 import re
-from openai import AzureOpenAI
 from dotenv import load_dotenv
+from . import fast_json
+from .catalog import save_english_names, save_location_tips
+from .clients import get_openai_client
+from .location_tips import MAX_TIP_CHARS
+from .region_catalog import region_of_spots, snapshot_for_area
+from .upstream import UpstreamOverloaded, chat_completion
+from .visit_analytics import trending_boost
 
 load_dotenv()
 
@@ -45,16 +49,16 @@ def calculate_relevance_score(spot_data, keywords, user_preferences):
         if interest_lower in str(desc).lower():
             score += 2
     
+    # 최근 방문이 몰리는 장소 가산점 (메모리 스냅샷 조회라 DB 접근 없음)
+    score += trending_boost(name)
+    
     return score
 
 # ==========================================
 # 1. Enhanced Keyword Extraction
 # ==========================================
-def extract_smart_keywords(user_query_json):
-    api_key = os.getenv("AZURE_OPENAI_KEY")
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    client = AzureOpenAI(api_key=api_key, api_version="2023-05-15", azure_endpoint=endpoint)
-
+def extract_base_keywords(user_query_json):
+    """설문 항목에서 바로 나오는 키워드 (LLM 없이) -> (keywords, is_chat_mode)"""
     base_keywords = []
     is_chat_mode = False
     
@@ -62,7 +66,7 @@ def extract_smart_keywords(user_query_json):
         if isinstance(user_query_json, dict):
             data = user_query_json
         else:
-            data = json.loads(user_query_json)
+            data = fast_json.loads(user_query_json)
             
         if "interests" in data:
             KEYWORD_MAP = {
@@ -82,6 +86,11 @@ def extract_smart_keywords(user_query_json):
             base_keywords.append(data["bias"])
     except:
         is_chat_mode = True
+    return base_keywords, is_chat_mode
+
+def extract_smart_keywords(user_query_json):
+    client = get_openai_client()
+    base_keywords, is_chat_mode = extract_base_keywords(user_query_json)
 
     system_prompt = """
     You are a keyword extractor for K-culture travel recommendations.
@@ -94,7 +103,9 @@ def extract_smart_keywords(user_query_json):
     """
     
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
+            max_output_tokens=100,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -103,7 +114,7 @@ def extract_smart_keywords(user_query_json):
             temperature=0
         )
         cleaned_text = clean_json_string(response.choices[0].message.content)
-        ai_keywords = json.loads(cleaned_text)
+        ai_keywords = fast_json.loads(cleaned_text)
         
         final_keywords = list(set(base_keywords + ai_keywords))
         stop_words = ["추천", "여행", "코스", "맛집", "식당", "카페", "장소", "어디", "내위치", "자동"]
@@ -112,57 +123,47 @@ def extract_smart_keywords(user_query_json):
             return [str(user_query_json)[:10]]
             
         return [k for k in final_keywords if k not in stop_words]
+    except UpstreamOverloaded:
+        raise
     except:
         return [str(user_query_json)] if is_chat_mode else ["서울", "관광"]
 
 # ==========================================
 # 2. [ENHANCED] Multi-stage RAG Retrieval
 # ==========================================
-def get_db_info(user_query_json, limit_count=50):
-    """Enhanced retrieval with scoring and ranking"""
-    keywords = extract_smart_keywords(user_query_json)
+def get_db_info(user_query_json, limit_count=50, keywords=None, area=None, seed=None):
+    """Enhanced retrieval with scoring and ranking (keywords 를 주면 LLM 키워드 추출 생략, area 는 target_area 대신 쓸 지역,
+    seed 를 주면 Stage 2 무작위 후보가 고정됨)"""
+    if keywords is None:
+        keywords = extract_smart_keywords(user_query_json)
     
     # Parse user preferences
     try:
-        user_prefs = user_query_json if isinstance(user_query_json, dict) else json.loads(user_query_json)
+        user_prefs = user_query_json if isinstance(user_query_json, dict) else fast_json.loads(user_query_json)
     except:
         user_prefs = {}
     
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    db_path = os.path.join(os.path.dirname(current_dir), "ktrip.db")
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    # 요청 지역의 카탈로그 스냅샷 안에서만 검색 (app/region_catalog.py)
+    # 사용자 좌표로 정한 region(main.py) 이 있으면 그것, 없으면 target_area
+    if area is None and isinstance(user_prefs, dict):
+        area = user_prefs.get("region") or user_prefs.get("target_area")
+    snapshot = snapshot_for_area(area)
     
-    # Stage 1: Keyword-based retrieval
+    # Stage 1: Keyword-based retrieval (name / media_title / description 부분 일치)
     all_rows = []
     for kw in keywords:
-        param = f'%{str(kw).strip()}%'
-        cursor.execute("""
-            SELECT name, description, lat, lng, media_title, place_type 
-            FROM locations 
-            WHERE (name LIKE ? OR media_title LIKE ? OR description LIKE ?)
-            LIMIT ?
-        """, (param, param, param, limit_count))
-        all_rows.extend(cursor.fetchall())
+        all_rows.extend(snapshot.search(str(kw).strip(), limit_count))
 
     # Stage 2: Fallback retrieval if insufficient results
     if len(all_rows) < 30:
-        cursor.execute("""
-            SELECT name, description, lat, lng, media_title, place_type 
-            FROM locations 
-            ORDER BY RANDOM() 
-            LIMIT 50
-        """)
-        all_rows.extend(cursor.fetchall())
-    
-    conn.close()
+        all_rows.extend(snapshot.sample(50, seed=seed))
     
     # Stage 3: Score and rank results (semantic matching)
-    unique_rows = {row[0]: row for row in all_rows}.values()
+    unique_rows = {row[1]: row for row in all_rows}.values()
     scored_rows = []
     for row in unique_rows:
         score = calculate_relevance_score(
-            (row[0], row[1], row[4], row[5]), 
+            (row[1], row[2], row[5], row[6]), 
             keywords, 
             user_prefs
         )
@@ -174,17 +175,21 @@ def get_db_info(user_query_json, limit_count=50):
     # Stage 4: Categorize with rich context
     categorized = {"MEAL": [], "CAFE": [], "TOUR": []}
     
-    for score, (name, desc, lat, lng, m_title, p_type) in scored_rows:
+    for score, (loc_id, name, desc, lat, lng, m_title, p_type, ai_summary, name_en) in scored_rows:
         p_type_str = str(p_type).lower() if p_type else ""
         
         # [ENHANCED] Add relevance score to context
         info = {
             "korean_id": name,
+            "location_id": loc_id,
+            "name_en": name_en or "",
             "media": m_title or "General K-culture spot",
+            "media_title": m_title or "",
             "type": p_type_str,
             "lat": lat,
             "lng": lng,
             "description": desc[:150] if desc else "",
+            "tips": ai_summary or "",  # app/location_tips.py 가 미리 생성한 팁 (없으면 GPT 가 생성 -> 카탈로그에 저장)
             "relevance": score  # RAG scoring
         }
         
@@ -206,8 +211,8 @@ def get_db_info(user_query_json, limit_count=50):
 # ==========================================
 # [NEW] Context Builder for RAG
 # ==========================================
-def build_rag_context(db_data, category, limit=10):
-    """Build structured context for LLM from retrieved data"""
+def build_rag_context(db_data, category, limit=10, with_ids=False):
+    """Build structured context for LLM from retrieved data (with_ids: 'ID: c<location id>' 포함)"""
     items = db_data.get(category, [])[:limit]
     
     if not items:
@@ -216,25 +221,82 @@ def build_rag_context(db_data, category, limit=10):
     context_lines = [f"\n=== {category} OPTIONS (ranked by relevance) ==="]
     for idx, item in enumerate(items, 1):
         context_lines.append(
-            f"{idx}. Korean_Name: {item['korean_id']} | "
+            f"{idx}. "
+            + (f"ID: c{item['location_id']} | " if with_ids else "")
+            + f"Korean_Name: {item['korean_id']} | "
             f"Related_Content: {item['media']} | "
             f"Location: ({item['lat']}, {item['lng']}) | "
             f"Description: {item['description']}"
+            + ("" if item.get("tips") else " | NEEDS_TIPS")
         )
     
     return "\n".join(context_lines)
 
+# ==========================================
+# [NEW] Server-side merge of stored catalog details
+# ==========================================
+ROLE_SUFFIX_RE = re.compile(r"\s*\((?:Meal|Lunch|Dinner|Tour|Cafe)\)\s*$", re.I)
+
+def merge_stored_details(result_json, *db_datas):
+    """
+    GPT 는 korean_id / 영어 이름 / 설명만 돌려주고,
+    좌표·미디어·팁은 카탈로그(get_db_info 결과)에서 서버가 채워 넣습니다.
+    팁이 없던 장소(NEEDS_TIPS)에 GPT 가 써준 팁은 locations.ai_summary 에 저장해서 다음 요청부터 재사용합니다.
+    """
+    try:
+        parsed = fast_json.loads(result_json)
+    except (TypeError, ValueError):
+        return result_json
+    if not isinstance(parsed, dict) or not isinstance(parsed.get("spots"), list):
+        return result_json
+
+    by_name = {}
+    learned_names = {}
+    learned_tips = {}
+    for db_data in db_datas:
+        for items in db_data.values():
+            for item in items:
+                by_name.setdefault(item["korean_id"], item)
+
+    for spot in parsed["spots"]:
+        if not isinstance(spot, dict):
+            continue
+        item = by_name.get(spot.get("korean_id"))
+        if item is None:
+            continue  # 못 찾은 korean_id 는 그대로 두고 검증 단계(itinerary_repair)에서 보정
+        del spot["korean_id"]
+        spot["lat"] = item["lat"]
+        spot["lng"] = item["lng"]
+        spot["media_title"] = item["media_title"]
+        spot["location_id"] = item["location_id"]
+        english = ROLE_SUFFIX_RE.sub("", str(spot.get("name") or "")).strip()
+        if english and not item["name_en"] and not re.search(r"[가-힣]", english):
+            learned_names[item["location_id"]] = english
+        if item["tips"]:
+            spot["tips"] = item["tips"]
+        else:
+            tips = " ".join(str(spot.get("tips") or "").split())[:MAX_TIP_CHARS]
+            if tips and not re.search(r"[가-힣]", tips):
+                learned_tips[item["location_id"]] = tips
+        spot.setdefault("tips", "")
+
+    # GPT 가 번역한 영어 이름/새로 쓴 팁은 카탈로그에 기억해두고 다음 요청과 규칙 기반 플래너(app/planner.py)가 재사용
+    try:
+        save_english_names(learned_names)
+        save_location_tips(learned_tips)
+    except sqlite3.Error as e:
+        print(f"⚠️ 영어 이름/팁 저장 실패: {e}")
+    return fast_json.dumps(parsed)
+
 # ==========================================
 # 3. [ENHANCED] Main Recommendation with Rich RAG
 # ==========================================
 def get_ai_recommendation(user_query):
-    api_key = os.getenv("AZURE_OPENAI_KEY")
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    client = AzureOpenAI(api_key=api_key, api_version="2023-05-15", azure_endpoint=endpoint)
+    client = get_openai_client()
 
     # RAG Stage 1: Retrieve relevant data
     db_data = get_db_info(user_query)
-    user_data = user_query if isinstance(user_query, dict) else json.loads(user_query)
+    user_data = user_query if isinstance(user_query, dict) else fast_json.loads(user_query)
     duration = str(user_data.get("duration", "1 day")).lower()
 
     # Calculate exact count
@@ -292,29 +354,23 @@ You are a professional Seoul K-culture travel planner using a RETRIEVAL-AUGMENTE
 
 6. **NO DUPLICATES**: Never use the same location twice in the entire itinerary.
 
-7. **TIPS - MANDATORY FORMAT**:
-- For Restaurants (Lunch/Dinner): Recommend 1-2 signature menu items. Example: "Try the Kimchi Jjigae and Bulgogi. Arrive before 12pm to avoid lines."
-- For Cafes: Recommend 1-2 popular drinks/desserts. Example: "Order the Strawberry Latte and Croffle. Second floor has the best Instagram spot."
-- For Tours: Give practical visiting tips. Example: "Best visited at sunset. Take the cable car to avoid the stairs."
+7. **SELECT AND ORDER ONLY**: Coordinates, media titles and tips are filled in by the server from the database.
+- Copy "korean_id" EXACTLY from the Korean_Name field so the server can find the spot.
+- Write "tips" ONLY for options marked NEEDS_TIPS (1 short sentence: menu items for restaurants, drinks/desserts for cafes, visiting tips for tours). Otherwise omit it.
 
 8. **OUTPUT FORMAT** (JSON):
 {{
 "spots": [
     {{
+    "korean_id": "명동교자 본점",
     "name": "Myeongdong Kyoja(Lunch)",
-    "description": "Famous handmade noodle restaurant featured in multiple K-dramas",
-    "lat": "37.5665",
-    "lng": "126.9780",
-    "media_title": "Running Man, Itaewon Class",
-    "tips": "Must-try: Kalguksu (handmade noodles) and Mandu (dumplings). Arrive before 11:30am to skip the queue."
+    "description": "Famous handmade noodle restaurant featured in multiple K-dramas"
     }},
     {{
+    "korean_id": "어니언 성수",
     "name": "Cafe Onion(Cafe)",
     "description": "Industrial-chic cafe in a renovated factory building",
-    "lat": "37.5547",
-    "lng": "126.9236", 
-    "media_title": "Instagram favorite among K-pop idols",
-    "tips": "Order the Einspanner (cream coffee) and Croissant. The rooftop terrace offers great photo opportunities."
+    "tips": "Order the Einspanner and Croissant."
     }}
 ]
 }}
@@ -327,13 +383,6 @@ You are a professional Seoul K-culture travel planner using a RETRIEVAL-AUGMENTE
 
 {tour_context}
 
-⚠️ **IMPORTANT**: The database does NOT contain "tips" - you must CREATE tips yourself based on:
-- The location's description and media_title
-- General knowledge about Korean culture and tourism
-- Practical travel advice for each spot type (restaurant/cafe/tour)
-
-**Tips creation is YOUR responsibility - be creative and helpful!**
-
 **SEQUENCE VALIDATION CHECKLIST - YOU MUST VERIFY THIS:**
 For 1 day: spots[0]=(Lunch), spots[1]=(Tour), spots[2]=(Cafe), spots[3]=(Tour), spots[4]=(Dinner)
 For 2 days: Same pattern twice (positions 0-4, then 5-9)
@@ -342,8 +391,7 @@ For 3 days: Same pattern three times (positions 0-4, 5-9, 10-14)
 **IF YOUR OUTPUT DOESN'T MATCH THE CHECKLIST, IT'S WRONG. FIX IT BEFORE RESPONDING.**
 
 **RAG INSTRUCTION**: 
-- **Locations (name, lat, lng, media_title)**: Use ONLY from retrieved data above. Do NOT invent locations.
-- **Tips**: CREATE them yourself - they are NOT in the database. Be specific and helpful.
+- **Locations**: Use ONLY from retrieved data above. Do NOT invent locations.
 - If retrieved data is insufficient, explain the limitation but try your best with available data.
 """
 
@@ -374,15 +422,14 @@ CRITICAL RULES:
 3. Return EXACTLY {required_count} spots in correct order
 4. NO duplicates anywhere
 5. Add (Role) to every name: (Lunch), (Dinner), (Tour), or (Cafe)
-6. Write everything in ENGLISH
-7. **TIPS MUST INCLUDE:**
-- Restaurants → Recommend specific menu items (e.g., "Try the Bulgogi and Bibimbap")
-- Cafes → Recommend drinks/desserts (e.g., "Order the Einspanner and Tiramisu")
-- Tours → Give visiting tips (e.g., "Best time: sunset. Entrance fee: 10,000 won")
+6. Write everything in ENGLISH (except the korean_id copied from the data)
+7. Tips only for NEEDS_TIPS options
 """
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
+            max_output_tokens=120 * required_count,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -392,21 +439,17 @@ CRITICAL RULES:
             response_format={"type": "json_object"} 
         )
         
-        result = clean_json_string(response.choices[0].message.content)
+        result = merge_stored_details(clean_json_string(response.choices[0].message.content), db_data)
         
-        # Validation: Check if response meets requirements
-        try:
-            parsed = json.loads(result)
-            if "spots" in parsed and len(parsed["spots"]) != required_count:
-                print(f"⚠️ Warning: Expected {required_count} spots, got {len(parsed['spots'])}")
-        except:
-            pass
-            
-        return result
+        # Validation: 역할 순서/개수/중복/카탈로그 매칭 검사 후 문제 있는 칸만 보정
+        from .itinerary_repair import repair_itinerary  # planner -> llm 순환 import 방지
+        return repair_itinerary(result, db_data, duration)
         
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"❌ Error in get_ai_recommendation: {str(e)}")
-        return json.dumps({
+        return fast_json.dumps({
             "message": f"Planning error: {str(e)}", 
             "spots": []
         })
@@ -414,52 +457,92 @@ CRITICAL RULES:
 # ==========================================
 # 4. [ENHANCED] Chatbot Modification with RAG
 # ==========================================
-# [llm.py 의 modify_ai_recommendation 함수 전체 교체]
+# 현재 일정은 "키 | 역할 | 이름" 한 줄씩만 프롬프트에 넣고 (좌표/설명/팁 제외),
+# GPT 는 키 목록으로 새 일정을 돌려줍니다. 기존 장소 내용은 서버가 그대로 복사하므로
+# 대화가 길어지거나 일정에 팁이 많아도 프롬프트/출력 크기가 일정합니다.
+PLAN_ROLE_RE = re.compile(r"\s*\(([A-Za-z]+)\)\s*$")
+CATEGORY_ROLES = {"MEAL": "Meal", "CAFE": "Cafe", "TOUR": "Tour"}
+
+def compact_plan_lines(spots):
+    """현재 일정 -> 's0 | Lunch | Myeongdong Kyoja' 형태"""
+    lines = []
+    for idx, spot in enumerate(spots):
+        name = str(spot.get("name") or "")
+        match = PLAN_ROLE_RE.search(name)
+        role = match.group(1) if match else "-"
+        lines.append(f"s{idx} | {role} | {PLAN_ROLE_RE.sub('', name).strip()}")
+    return "\n".join(lines)
+
+def _rebuild_modified_plan(parsed, current_spots, db_data):
+    """GPT 의 키 목록 -> 전체 spot 목록 (기존 장소는 복사, 새 장소는 카탈로그 후보에서)"""
+    candidates = {}
+    for category, items in db_data.items():
+        for item in items:
+            candidates[f"c{item['location_id']}"] = (item, category)
+    existing_ids = {s.get("location_id") for s in current_spots if s.get("location_id")}
+
+    spots, used = [], set()
+    for entry in parsed.get("spots", []):
+        if not isinstance(entry, dict):
+            continue
+        key = str(entry.get("key", "")).strip()
+        if key in used:
+            continue
+        role = str(entry.get("role") or "").strip()
+        if key[:1] == "s" and key[1:].isdigit() and int(key[1:]) < len(current_spots):
+            spot = dict(current_spots[int(key[1:])])
+            if role:
+                spot["name"] = f"{PLAN_ROLE_RE.sub('', str(spot.get('name') or '')).strip()}({role})"
+        elif key in candidates:
+            item, category = candidates[key]
+            if item["location_id"] in existing_ids:
+                continue  # 이미 일정에 있는 장소
+            name = str(entry.get("name") or "").strip() or item["name_en"] or item["korean_id"]
+            spot = {
+                "korean_id": item["korean_id"],
+                "name": f"{name}({role or CATEGORY_ROLES[category]})",
+                "description": str(entry.get("description") or ""),
+            }
+            if entry.get("tips"):
+                spot["tips"] = str(entry["tips"])
+        else:
+            continue
+        used.add(key)
+        spots.append(spot)
+    return {"message": parsed.get("message", ""), "spots": spots}
 
 def modify_ai_recommendation(current_json, user_request):
-    api_key = os.getenv("AZURE_OPENAI_KEY")
-    endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-    client = AzureOpenAI(api_key=api_key, api_version="2023-05-15", azure_endpoint=endpoint)
+    client = get_openai_client()
+    current_spots = [s for s in current_json.get("spots", []) if isinstance(s, dict)]
 
-    # 1. 요청사항에 맞는 장소 검색 (RAG)
-    new_context_data = get_db_info(user_request, limit_count=30)
+    # 1. 요청사항에 맞는 장소 검색 (RAG) - 지금 일정 장소들의 지역 안에서
+    area = region_of_spots(current_spots)
+    new_context_data = get_db_info(user_request, limit_count=30, area=area)
     
-    meal_ctx = build_rag_context(new_context_data, "MEAL", limit=10)
-    cafe_ctx = build_rag_context(new_context_data, "CAFE", limit=8)
-    tour_ctx = build_rag_context(new_context_data, "TOUR", limit=10)
+    meal_ctx = build_rag_context(new_context_data, "MEAL", limit=10, with_ids=True)
+    cafe_ctx = build_rag_context(new_context_data, "CAFE", limit=8, with_ids=True)
+    tour_ctx = build_rag_context(new_context_data, "TOUR", limit=10, with_ids=True)
 
     # 2. 시스템 프롬프트 (강력한 규칙 추가)
     system_prompt = f"""
     You are an expert travel modification assistant.
     
     [CRITICAL RULE]
-    You must return the **FULL COMPLETE ITINERARY**. 
-    Do NOT return only the new spots. 
-    You must output ALL original spots + NEW spots combined in a single list.
+    Return the **FULL COMPLETE ITINERARY** as a list of keys, in visiting order.
+    - Existing spots: {{"key": "s0"}} (add "role" only if the role changes). Keep them unless asked to remove.
+    - New spots: {{"key": "c123", "role": "Cafe", "name": "Natural English name", "description": "One English sentence"}}
+      Use ONLY keys (ID) from RETRIEVED CANDIDATES. Add "tips" only for candidates marked NEEDS_TIPS.
 
     **MANDATORY RULES:**
-    1. Translate Korean location names to natural English.
-    2. Add role labels: Name(Role) - (Meal), (Lunch), (Dinner), (Tour), or (Cafe).
-    3. NO DUPLICATES - Check against [Current Itinerary].
-    4. **INSERTION**: Insert the new spot at a logical position (e.g., Cafe after Lunch).
-    5. **TIPS**: Provide specific English tips for the NEW spot.
+    1. Roles: Meal, Lunch, Dinner, Tour or Cafe.
+    2. NO DUPLICATES.
+    3. **INSERTION**: Insert the new spot at a logical position (e.g., Cafe after Lunch).
+    4. English only in name/description/tips/message.
 
     **OUTPUT FORMAT (JSON ONLY):**
     {{
     "message": "Added [Place Name] to your trip!",
-    "spots": [
-        {{
-        "name": "Existing Spot(Tour)",
-        "description": "...",
-        "lat": "...", "lng": "...", "media_title": "...", "tips": "..."
-        }},
-        {{
-        "name": "NEW SPOT(Cafe)", 
-        "description": "...", 
-        "lat": "...", "lng": "...", "media_title": "...", "tips": "..."
-        }},
-        ... (Return ALL spots)
-    ]
+    "spots": [{{"key": "s0"}}, {{"key": "c123", "role": "Cafe", "name": "...", "description": "..."}}, {{"key": "s1"}}]
     }}
 
     **RETRIEVED CANDIDATES (Use these for the new spot):**
@@ -469,13 +552,15 @@ def modify_ai_recommendation(current_json, user_request):
     """
 
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
+            max_output_tokens=30 * len(current_spots) + 200,
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"""
-                [Current Itinerary]
-                {json.dumps(current_json, ensure_ascii=False)}
+                [Current Itinerary] (key | role | name)
+                {compact_plan_lines(current_spots)}
 
                 [User Request]
                 "{user_request}"
@@ -483,8 +568,7 @@ def modify_ai_recommendation(current_json, user_request):
                 COMMAND: 
                 1. Identify what the user wants to add/change.
                 2. Select a suitable spot from RETRIEVED CANDIDATES.
-                3. Add it to the Current Itinerary (keep existing spots unless asked to remove).
-                4. Return the FULL JSON.
+                3. Return the FULL list of keys in the new order.
                 """}
             ],
             temperature=0,
@@ -496,9 +580,15 @@ def modify_ai_recommendation(current_json, user_request):
         # [디버깅] AI가 뭘 줬는지 서버 로그로 확인 (나중에 주석 처리 가능)
         print(f"🤖 AI Modify Response: {result[:200]}...") 
 
-        return result
+        plan = _rebuild_modified_plan(fast_json.loads(result), current_spots, new_context_data)
+        if not plan["spots"]:
+            print("⚠️ AI Modify 결과가 비어 있어 기존 일정 유지")
+            return fast_json.dumps(current_json)
+        return merge_stored_details(fast_json.dumps(plan), new_context_data)
         
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"❌ Error in modify_ai_recommendation: {str(e)}")
         # 에러가 나도 기존 데이터라도 보여주기 위해 반환
-        return json.dumps(current_json, ensure_ascii=False)
+        return fast_json.dumps(current_json)
@@ -0,0 +1,144 @@
+# backend/app/location_tips.py
+
+import argparse
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .catalog import DB_PATH, ensure_location_columns, save_english_names
+from .clients import get_openai_client
+from .upstream import UpstreamOverloaded, chat_completion
+
+# ==========================================
+# 0. Offline Per-location Tips
+# ==========================================
+# 예전에는 일정 생성 때마다 GPT 가 장소별 tips 를 새로 지어냈습니다 (출력 토큰의 대부분).
+# 이제 장소별 영어 팁을 locations.ai_summary 에 미리 저장해두고,
+# 일정 응답에서는 서버가 저장된 팁을 합쳐줍니다 (GPT 는 장소 선택/순서만 담당).
+# 같은 호출에서 영어 이름(name_en)도 받아두면 규칙 기반 플래너(app/planner.py)가 사용합니다.
+#
+#   python -m app.location_tips --workers 4 --batch-size 20     (팁이 없는 장소만 -> 중단 후 다시 실행하면 이어서)
+#   python -m app.location_tips --refresh --limit 100           (이미 있는 팁도 다시 생성)
+
+DEFAULT_BATCH_SIZE = 20
+MAX_TIP_CHARS = 300
+
+TIPS_SYSTEM_PROMPT = """
+You write short, practical English travel tips for places in Korea.
+For each place write 1-2 sentences (max 40 words). English only, no Korean characters.
+- Restaurants: recommend 1-2 signature menu items (e.g. "Try the Kimchi Jjigae and Bulgogi. Arrive before 12pm to avoid lines.")
+- Cafes: recommend 1-2 popular drinks/desserts (e.g. "Order the Strawberry Latte and Croffle.")
+- Others: give practical visiting tips (e.g. "Best visited at sunset. Take the cable car to avoid the stairs.")
+Also give a natural English name for the place ("name"), e.g. "Myeongdong Kyoja".
+Output JSON: {"tips": [{"id": <id>, "name": "...", "tips": "..."}]} with one entry per input line.
+""".strip()
+
+
+def _pending_rows(conn, refresh=False, limit=None):
+    query = "SELECT id, name, place_type, media_title, description FROM locations"
+    if not refresh:
+        query += " WHERE ai_summary IS NULL OR ai_summary = ''"
+    query += " ORDER BY id"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    return conn.execute(query).fetchall()
+
+
+def _format_batch(rows):
+    lines = []
+    for loc_id, name, p_type, media, desc in rows:
+        desc = " ".join(str(desc or "").split())[:150]
+        lines.append(f"{loc_id} | {name} | {p_type or '-'} | {media or '-'} | {desc}")
+    return "\n".join(lines)
+
+
+def generate_tips(rows):
+    """rows: [(id, name, place_type, media_title, description)] -> ({id: tips}, {id: 영어 이름})"""
+    client = get_openai_client()
+    response = chat_completion(
+        client,
+        max_output_tokens=70 * len(rows) + 50,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": TIPS_SYSTEM_PROMPT},
+            {"role": "user", "content": "id | name | type | related content | description\n" + _format_batch(rows)},
+        ],
+        temperature=0.3,
+        response_format={"type": "json_object"},
+    )
+    parsed = json.loads(response.choices[0].message.content)
+    wanted = {row[0] for row in rows}
+    tips, names = {}, {}
+    for item in parsed.get("tips", []):
+        try:
+            loc_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        text = " ".join(str(item.get("tips") or "").split())[:MAX_TIP_CHARS]
+        if loc_id in wanted and text:
+            tips[loc_id] = text
+            name = " ".join(str(item.get("name") or "").split())[:100]
+            if name:
+                names[loc_id] = name
+    return tips, names
+
+
+def _save_tips(tips, names):
+    conn = sqlite3.connect(DB_PATH, timeout=30)  # 카탈로그 파일은 WAL 로 바꾸지 않음
+    try:
+        conn.executemany("UPDATE locations SET ai_summary = ? WHERE id = ?", [(t, i) for i, t in tips.items()])
+        save_english_names(names, conn)
+    finally:
+        conn.close()
+
+
+def _run_batch(rows):
+    """배치 하나 생성 + 즉시 저장 (배치 단위 커밋이라 중간에 멈춰도 다음 실행이 이어서 진행)"""
+    tips, names = generate_tips(rows)
+    if tips:
+        _save_tips(tips, names)
+    return len(tips)
+
+
+def generate_all(workers=4, batch_size=DEFAULT_BATCH_SIZE, refresh=False, limit=None):
+    conn = sqlite3.connect(DB_PATH, timeout=30)  # 카탈로그 파일은 WAL 로 바꾸지 않음
+    try:
+        ensure_location_columns(conn)
+        rows = _pending_rows(conn, refresh, limit)
+    finally:
+        conn.close()
+
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    print(f"💡 [장소 팁] {len(rows)}곳 생성 시작 (배치 {len(batches)}개, 동시 {workers}개)")
+    started = time.perf_counter()
+    saved = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_run_batch, batch): batch for batch in batches}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                saved += future.result()
+            except UpstreamOverloaded as e:
+                failed += len(futures[future])
+                print(f"⏳ [장소 팁] Azure 과부하, 다음 실행 때 다시 시도: {e}")
+            except Exception as e:
+                failed += len(futures[future])
+                print(f"❌ [장소 팁] 배치 실패: {e}")
+            if done % 10 == 0:
+                print(f"   ... {done}/{len(batches)} 배치, {saved}곳 저장")
+    print(f"✅ [장소 팁] {saved}/{len(rows)}곳 저장, 실패 {failed}곳 ({time.perf_counter() - started:.1f}s)")
+    return saved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="장소별 영어 팁 오프라인 생성 (locations.ai_summary)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="GPT 호출 한 번에 넣을 장소 수")
+    parser.add_argument("--limit", type=int, help="이번 실행에서 처리할 최대 장소 수")
+    parser.add_argument("--refresh", action="store_true", help="이미 팁이 있는 장소도 다시 생성")
+    args = parser.parse_args()
+    generate_all(workers=args.workers, batch_size=args.batch_size, refresh=args.refresh, limit=args.limit)
+
+
+if __name__ == "__main__":
+    main()
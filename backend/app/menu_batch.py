@@ -0,0 +1,139 @@
+# backend/app/menu_batch.py
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .menu_layout import format_rows
+from .ocr import extract_menu_rows, translate_menu_row_sets, translate_menu_rows
+from .upstream import UpstreamOverloaded, estimate_tokens
+
+# ==========================================
+# 0. Batch Menu Translation Pipeline
+# ==========================================
+# 여행사가 메뉴판 수십 장을 한 번에 번역할 때 쓰는 파이프라인.
+#   - OCR 스테이지와 번역 스테이지를 각각의 워커 풀에서 동시에 돌려서
+#     N+1번째 이미지 OCR 이 N번째 이미지 번역과 겹치도록 합니다.
+#   - 번역 워커가 바쁜 동안 쌓인 짧은 메뉴판(OCR 행 목록)은 토큰 예산 안에서 한 번의 GPT 호출로 묶습니다.
+#   - 결과는 끝나는 순서대로 (index, result) 로 흘려보냅니다.
+#
+#   python -m app.menu_batch menu1.jpg menu2.jpg ... > results.ndjson
+
+DEFAULT_OCR_WORKERS = int(os.getenv("KTRIP_MENU_OCR_WORKERS", "4"))
+DEFAULT_TRANSLATE_WORKERS = int(os.getenv("KTRIP_MENU_TRANSLATE_WORKERS", "2"))
+DEFAULT_PACK_TOKENS = int(os.getenv("KTRIP_MENU_PACK_TOKENS", "1500"))
+MAX_PACK_SIZE = 8
+
+
+def _take_pack(pending, token_budget):
+    """pending 앞에서부터 토큰 예산 안에 들어가는 만큼 꺼냄 (최소 1개)"""
+    pack = [pending.pop(0)]
+    used = estimate_tokens(format_rows(pack[0][1]))
+    while pending and len(pack) < MAX_PACK_SIZE:
+        cost = estimate_tokens(format_rows(pending[0][1]))
+        if used + cost > token_budget:
+            break
+        pack.append(pending.pop(0))
+        used += cost
+    return pack
+
+
+def _translate_pack(pack):
+    """[(index, rows)] -> {index: result}. 묶음 응답에서 빠진 항목은 개별 호출로 보충"""
+    if len(pack) == 1:
+        index, rows = pack[0]
+        return {index: translate_menu_rows(rows)}
+
+    try:
+        results = translate_menu_row_sets(dict(pack))
+    except UpstreamOverloaded:
+        raise
+    except Exception as e:
+        print(f"⚠️ [배치 번역] 묶음 호출 실패, 개별 호출로 전환: {e}")
+        results = {}
+    for index, rows in pack:
+        if index not in results:
+            results[index] = translate_menu_rows(rows)
+    return results
+
+
+def _overloaded_result(exc):
+    return {"error": "Server is busy. Please try again shortly.", "retry_after": exc.retry_after}
+
+
+def translate_menus(images, ocr_workers=None, translate_workers=None, pack_tokens=None):
+    """
+    images: [bytes, ...]
+    yield (index, result) - result 는 analyze_menu_image 와 같은 형식 ({"foods": [...]} 또는 {"error": ...})
+    """
+    ocr_workers = ocr_workers or DEFAULT_OCR_WORKERS
+    translate_workers = translate_workers or DEFAULT_TRANSLATE_WORKERS
+    pack_tokens = pack_tokens or DEFAULT_PACK_TOKENS
+
+    with ThreadPoolExecutor(max_workers=ocr_workers, thread_name_prefix="menu-ocr") as ocr_pool, \
+         ThreadPoolExecutor(max_workers=translate_workers, thread_name_prefix="menu-translate") as translate_pool:
+        ocr_futures = {ocr_pool.submit(extract_menu_rows, image): index for index, image in enumerate(images)}
+        translate_futures = {}
+        pending = []  # OCR 은 끝났고 번역을 기다리는 (index, rows)
+
+        while ocr_futures or translate_futures or pending:
+            # 번역 워커에 빈자리가 있거나 OCR 이 모두 끝났으면 대기 중인 텍스트를 묶어서 보냄
+            while pending and (len(translate_futures) < translate_workers or not ocr_futures):
+                pack = _take_pack(pending, pack_tokens)
+                translate_futures[translate_pool.submit(_translate_pack, pack)] = pack
+
+            done, _ = wait(list(ocr_futures) + list(translate_futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in ocr_futures:
+                    index = ocr_futures.pop(future)
+                    try:
+                        rows = future.result()
+                    except UpstreamOverloaded as e:
+                        yield index, _overloaded_result(e)
+                        continue
+                    if isinstance(rows, dict):
+                        yield index, rows  # OCR 에러
+                    elif not rows:
+                        yield index, {"foods": []}
+                    else:
+                        pending.append((index, rows))
+                else:
+                    pack = translate_futures.pop(future)
+                    try:
+                        results = future.result()
+                    except UpstreamOverloaded as e:
+                        results = {index: _overloaded_result(e) for index, _ in pack}
+                    for index, _ in pack:
+                        yield index, results.get(index, {"error": "AI Failed: missing result"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="메뉴판 이미지 일괄 번역 (결과는 NDJSON 으로 출력)")
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--ocr-workers", type=int, default=DEFAULT_OCR_WORKERS)
+    parser.add_argument("--translate-workers", type=int, default=DEFAULT_TRANSLATE_WORKERS)
+    parser.add_argument("--pack-tokens", type=int, default=DEFAULT_PACK_TOKENS)
+    args = parser.parse_args()
+
+    images = []
+    for path in args.images:
+        with open(path, "rb") as f:
+            images.append(f.read())
+
+    started = time.perf_counter()
+    out = sys.stdout
+    # 진행 로그(print)는 stderr 로 보내고 stdout 에는 NDJSON 결과만
+    with contextlib.redirect_stdout(sys.stderr):
+        for index, result in translate_menus(images, args.ocr_workers, args.translate_workers, args.pack_tokens):
+            line = {"index": index, "filename": args.images[index], "result": result}
+            out.write(json.dumps(line, ensure_ascii=False) + "\n")
+            out.flush()
+    print(f"✅ {len(images)}장 처리 완료 ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# backend/app/menu_layout.py
+
+import re
+from statistics import median
+
+# ==========================================
+# 0. Layout-aware Menu Row Reconstruction
+# ==========================================
+# Document Intelligence 결과의 단어/줄 좌표(polygon)를 이용해 GPT 호출 전에 로컬에서
+#   - 같은 기준선(baseline)에 있는 글자/단어를 한 행으로 묶고
+#   - 자간이 넓은 글자("우        동")를 "우동"으로 합치고
+#   - 행/열 위치로 메뉴 이름과 가격을 짝지어
+# [{"name": "우동", "price": "3500"}, ...] 같은 작은 구조로 만듭니다.
+# 외부 호출이 없는 순수 함수라 녹화해둔 OCR JSON (result.as_dict()) 으로 그대로 검증할 수 있습니다.
+
+HANGUL_START, HANGUL_END = "가", "힣"
+
+PRICE_RE = re.compile(r"^[₩\\]?\s*(\d{1,3}(?:[,.]\d{3})+|\d{3,7}|\d{1,2}\.\d)\s*(?:원|won|krw)?$", re.I)
+GLUED_PRICE_RE = re.compile(r"^(.*?[^\d\s,.₩\\])\s*[₩\\]?(\d{1,3}(?:,\d{3})+|\d{4,7})\s*(?:원)?$")
+CURRENCY_ONLY = {"원", "₩", "\\", "won", "krw"}
+NOISE_RE = re.compile(r"^[\.\-·…_~=:|*•]+$")
+SIZE_LABELS = {"소", "중", "대", "특", "S", "M", "L", "(소)", "(중)", "(대)", "(특)"}
+
+
+def _is_single_hangul(text):
+    return len(text) == 1 and HANGUL_START <= text <= HANGUL_END
+
+
+def normalize_price(text):
+    """'3,500' / '3500원' / '8.0'(=8,000원 표기) -> '3500' / '3500' / '8000'. 가격이 아니면 None"""
+    match = PRICE_RE.match(text.strip())
+    if not match:
+        return None
+    raw = match.group(1)
+    if re.fullmatch(r"\d{1,2}\.\d", raw):
+        return str(int(round(float(raw) * 1000)))
+    return re.sub(r"[,.]", "", raw)
+
+
+def _box(polygon):
+    xs = polygon[0::2]
+    ys = polygon[1::2]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _page_tokens(page):
+    """단어 단위(없으면 줄 단위) 토큰 + 박스. 좌표가 없으면 None (줄 순서 그대로 사용)"""
+    units = page.get("words") or []
+    if not units or not all(u.get("polygon") for u in units):
+        units = page.get("lines") or []
+    if not units or not all(u.get("polygon") for u in units):
+        return None
+
+    tokens = []
+    for unit in units:
+        text = str(unit.get("content", "")).strip()
+        if not text or NOISE_RE.match(text):
+            continue
+        x0, y0, x1, y1 = _box(unit["polygon"])
+        tokens.append({"text": text, "x0": x0, "x1": x1, "cy": (y0 + y1) / 2, "h": max(y1 - y0, 1e-6)})
+    return tokens
+
+
+def group_rows(tokens):
+    """세로 중심이 글자 높이의 절반 이내인 토큰끼리 한 행으로 (행 안에서는 x 순서)"""
+    rows = []
+    for token in sorted(tokens, key=lambda t: t["cy"]):
+        if rows:
+            row = rows[-1]
+            if abs(token["cy"] - row["cy"]) <= 0.5 * max(token["h"], row["h"]):
+                row["tokens"].append(token)
+                n = len(row["tokens"])
+                row["cy"] += (token["cy"] - row["cy"]) / n
+                row["h"] = max(row["h"], token["h"])
+                continue
+        rows.append({"cy": token["cy"], "h": token["h"], "tokens": [token]})
+    for row in rows:
+        row["tokens"].sort(key=lambda t: t["x0"])
+    return rows
+
+
+def _split_glued(tokens):
+    """'우동3500' 처럼 이름과 가격이 붙은 토큰 분리"""
+    result = []
+    for token in tokens:
+        match = GLUED_PRICE_RE.match(token["text"])
+        if match and normalize_price(token["text"]) is None:
+            width = token["x1"] - token["x0"]
+            cut = token["x0"] + width * len(match.group(1)) / len(token["text"])
+            result.append(dict(token, text=match.group(1).strip(), x1=cut))
+            result.append(dict(token, text=match.group(2), x0=cut))
+        else:
+            result.append(token)
+    return result
+
+
+def _row_items(row, gap_limit):
+    """한 행 -> [{"name", "price", "x"}]. 가격이 나오면 앞의 이름과 짝지음"""
+    items = []
+    parts = []          # 현재 이름을 이루는 토큰
+    last_priced = None  # 방금 가격이 붙은 항목 (소/대 처럼 가격이 연달아 나오면 여기에 추가)
+    size_label = None   # 가격 바로 앞의 "소" / "대" 같은 사이즈 표기
+
+    def flush(price=None, price_x=None):
+        nonlocal parts, last_priced, size_label
+        if price and size_label:
+            price = f"{size_label} {price}"
+        size_label = None
+        if not parts:
+            if price and last_priced is not None:
+                last_priced["price"] = price if last_priced["price"] is None else f"{last_priced['price']}/{price}"
+            elif price:
+                items.append({"name": "", "price": price, "x": price_x})
+            return
+        name = parts[0]["text"]
+        for prev, cur in zip(parts, parts[1:]):
+            # 한 글자씩 떨어진 한글은 자간 정렬이므로 붙이고, 단어끼리는 띄어씀 ("김치" + "우동")
+            if _is_single_hangul(cur["text"]) and (_is_single_hangul(prev["text"]) or prev["text"][-1:] >= HANGUL_START):
+                name += cur["text"]
+            else:
+                name += " " + cur["text"]
+        item = {"name": name, "price": price, "x": (parts[0]["x0"] + parts[-1]["x1"]) / 2}
+        items.append(item)
+        last_priced = item if price else None
+        parts = []
+
+    tokens = [t for t in _split_glued(row["tokens"]) if t["text"].lower() not in CURRENCY_ONLY]
+    for index, token in enumerate(tokens):
+        text = token["text"]
+        price = normalize_price(text)
+        if price:
+            flush(price, token["x0"])
+            continue
+        next_is_price = index + 1 < len(tokens) and normalize_price(tokens[index + 1]["text"])
+        if text in SIZE_LABELS and next_is_price and (parts or last_priced is not None):
+            if parts:
+                # 이름을 먼저 확정하고, 사이즈는 다음 가격에 붙임
+                flush()
+                last_priced = items[-1]
+            size_label = text
+            continue
+        # 여러 글자 단어 사이가 크게 벌어져 있으면 다른 칸(다른 메뉴)으로 봄
+        if parts and not _is_single_hangul(text) and not _is_single_hangul(parts[-1]["text"]) \
+                and token["x0"] - parts[-1]["x1"] > gap_limit:
+            flush()
+        parts.append(token)
+        last_priced = None
+    flush()
+    return items
+
+
+def build_menu_rows(analyze_result):
+    """
+    Document Intelligence 결과(dict, result.as_dict() 또는 REST JSON) -> [{"name", "price"}]
+    가격만 있는 행은 바로 위 행에서 가격이 없는 메뉴 중 x 위치가 가장 가까운 것에 붙입니다 (열 정렬 메뉴판).
+    """
+    menu_rows = []
+    for page in analyze_result.get("pages", []):
+        tokens = _page_tokens(page)
+        if tokens is None:
+            # 좌표 정보가 없으면 줄 단위 텍스트를 그대로 사용
+            for line in page.get("lines", []):
+                text = " ".join(str(line.get("content", "")).split())
+                if text:
+                    menu_rows.append({"name": text, "price": None})
+            continue
+        if not tokens:
+            continue
+
+        gap_limit = 3 * median(t["h"] for t in tokens)
+        previous = []
+        for row in group_rows(tokens):
+            items = _row_items(row, gap_limit)
+            named = [i for i in items if i["name"]]
+            for orphan in (i for i in items if not i["name"]):
+                candidates = [i for i in previous if i["price"] is None] or previous[-1:]
+                if candidates:
+                    target = min(candidates, key=lambda i: abs(i["x"] - orphan["x"]))
+                    target["price"] = orphan["price"] if target["price"] is None else f"{target['price']}/{orphan['price']}"
+            menu_rows.extend(named)
+            if named:
+                previous = named
+
+    return [{"name": r["name"], "price": r["price"]} for r in menu_rows]
+
+
+def format_rows(rows):
+    """GPT 에 보낼 압축 텍스트: 'index. 이름 | 가격'"""
+    return "\n".join(f"{i}. {r['name']} | {r['price'] or '-'}" for i, r in enumerate(rows))
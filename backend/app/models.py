@@ -33,4 +33,12 @@ class PhotoLog(Base):
     style_type = Column(String, default="default")
     
     # 언제 요청했는지 로그 남기기용
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 변환 작업 큐 (app/photo_jobs.py): queued -> processing -> done / failed
+    status = Column(String, nullable=False, default="queued", index=True)
+    content_hash = Column(String, unique=True, nullable=True)  # sha256(원본 sha256 | 스타일), 중복 요청 제거
+    thumbnails = Column(Text, nullable=True)                    # {"1080": 경로, "480": ..., "160": ...} JSON
+    error = Column(Text, nullable=True)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
\ No newline at end of file
@@ -1,12 +1,13 @@
 # backend/app/ocr.py
 
 import os
-from azure.ai.documentintelligence import DocumentIntelligenceClient
-from azure.core.credentials import AzureKeyCredential
-from openai import AzureOpenAI
 from dotenv import load_dotenv
-import json
 import re
+from . import fast_json
+from .clients import get_document_client, get_openai_client
+from .dish_memory import learn_dishes, recall_dishes
+from .menu_layout import build_menu_rows, format_rows
+from .upstream import UpstreamOverloaded, analyze_document, chat_completion
 
 load_dotenv()
 
@@ -18,9 +19,28 @@ def clean_json_string(raw_string):
     except:
         return raw_string
 
-def analyze_menu_image(image_stream):
-    print("🚀 [1단계] 메뉴판 분석 시작...")
-
+# 좌표 기반 행 복원(app/menu_layout.py)이 자간 합치기 / 이름-가격 짝짓기를 미리 하므로
+# GPT 는 번역 / 설명 / 맵기만 담당합니다. 가격과 한글 이름은 서버에서 다시 붙입니다.
+MENU_SYSTEM_PROMPT = """
+You are an expert Korean Food Translator AI.
+Input: rows from a Korean menu board, one per line as "index. Korean name | price".
+Names are already reconstructed. Skip rows that are not food or drinks (store name, phone, notices).
+For each food row output:
+{"foods": [{"i": index, "english": "Natural English name", "description": "One short sentence on ingredients and taste.", "spicy_level": 0}]}
+spicy_level is 0-3. Only if the Korean name has an obvious OCR typo, add "korean" with the fixed name.
+"""
+
+MENU_BATCH_INSTRUCTION = """
+MULTIPLE MENUS: Input is JSON {"menus": [{"id": "...", "rows": "..."}]}; each is a DIFFERENT menu board.
+Output: {"menus": [{"id": "same id", "foods": [...]}]}
+"""
+
+
+# ==========================================
+# 1. OCR 단계 (Azure Document Intelligence)
+# ==========================================
+def extract_menu_rows(image_stream):
+    """메뉴판 이미지 -> [{"name", "price"}] 행 목록. 실패하면 {"error": ...} dict 반환"""
     # 1. 키 확인
     doc_endpoint = os.getenv("AZURE_DOC_ENDPOINT")
     doc_key = os.getenv("AZURE_DOC_KEY")
@@ -30,85 +50,97 @@ def analyze_menu_image(image_stream):
         return {"error": "Azure credentials missing in .env"}
 
     # 2. Azure Document Intelligence 호출
-    extracted_text = ""
     try:
         print("📡 Azure Document Intelligence에 연결 중...")
-        document_analysis_client = DocumentIntelligenceClient(
-            endpoint=doc_endpoint, 
-            credential=AzureKeyCredential(doc_key)
-        )
+        document_analysis_client = get_document_client()
 
         # ★★★ [수정된 부분] analyze_request -> body 로 변경 ★★★
-        poller = document_analysis_client.begin_analyze_document(
+        print("⏳ 이미지 분석 중 (시간이 좀 걸립니다)...")
+        result = analyze_document(
+            document_analysis_client,
             "prebuilt-read", 
             body=image_stream, 
             content_type="application/octet-stream"
         )
-        
-        print("⏳ 이미지 분석 중 (시간이 좀 걸립니다)...")
-        result = poller.result()
-
-        extracted_text = " ".join([line.content for page in result.pages for line in page.lines])
-        print(f"✅ OCR 성공! 추출된 텍스트(일부): {extracted_text[:50]}...")
-        
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"❌ [OCR 실패] Azure 연결 에러: {str(e)}")
         return {"error": f"OCR Failed: {str(e)}"}
 
-    # 3. GPT 호출
+    # 3. 좌표 기반 행 복원 (로컬, 결정적)
+    rows = build_menu_rows(result.as_dict())
+    print(f"✅ OCR 성공! 메뉴 행 {len(rows)}개 복원: {format_rows(rows[:3])!r}...")
+    return rows
+
+
+# ==========================================
+# 2. 번역 단계 (GPT)
+# ==========================================
+def _foods_by_index(foods, row_count):
+    """GPT 결과 foods 리스트 -> {행 index: food} (범위를 벗어난 index 는 버림)"""
+    indexed = {}
+    for food in foods:
+        try:
+            i = int(food.get("i"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= i < row_count:
+            indexed[i] = food
+    return indexed
+
+
+def merge_menu_rows(rows, foods_by_index):
+    """{행 index: food} 에 한글 이름 / 가격을 붙여 프론트엔드 형식으로 (메뉴판 순서 유지)"""
+    merged = []
+    for i in sorted(foods_by_index):
+        food, row = foods_by_index[i], rows[i]
+        merged.append({
+            "korean": food.get("korean") or row["name"],
+            "english": food.get("english", ""),
+            "description": food.get("description", ""),
+            "spicy_level": food.get("spicy_level", 0),
+            "price": row["price"] or "",
+        })
+    return {"foods": merged}
+
+
+def _recall(rows):
+    """번역 메모리에서 아는 메뉴를 꺼내고, GPT 에 보낼 행만 남김"""
+    known, unknown = recall_dishes(rows)
+    foods_by_index = {i: food for i, food in known.items() if food}
+    return foods_by_index, unknown
+
+
+def _apply_new_foods(rows, unknown, foods, foods_by_index):
+    """GPT 가 번역한 처음 보는 메뉴를 원래 행 위치에 넣고 메모리에 학습"""
+    sub_rows = [rows[i] for i in unknown]
+    learn_dishes(sub_rows, foods)
+    for local_i, food in _foods_by_index(foods, len(sub_rows)).items():
+        foods_by_index[unknown[local_i]] = food
+
+
+def translate_menu_rows(rows):
+    """행 목록 하나 -> {"foods": [...]}. 처음 보는 메뉴만 GPT 로 번역"""
+    if not rows:
+        return {"foods": []}
+    foods_by_index, unknown = _recall(rows)
+    if not unknown:
+        print(f"💾 번역 메모리에서 메뉴 {len(foods_by_index)}개를 모두 찾음 (GPT 생략)")
+        return merge_menu_rows(rows, foods_by_index)
+
+    sub_rows = [rows[i] for i in unknown]
     try:
-        print("🤖 GPT-4o에게 메뉴 분석 요청 중...")
-        api_key = os.getenv("AZURE_OPENAI_KEY")
-        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        client = AzureOpenAI(api_key=api_key, api_version="2023-05-15", azure_endpoint=endpoint)
-
-        system_prompt = """
-    You are an expert Korean Food Translator AI.
-    The user will provide raw text extracted from a Korean menu board.
-    
-    YOUR MISSION (Execute in Order):
-
-    1. **Fix Wide Letter Spacing (CRITICAL)**:
-    - Korean menus often use wide spacing for alignment (Justified Text).
-    - If you see single characters separated by spaces or newlines, COMBINE them.
-    - Example: "우        동" → "우동" (Udon)
-    - Example: "라        면" → "라면" (Ramen)
-    - Example: "물        만        두" → "물만두"
-       - **Rule**: If a single character (like "동", "면", "두") has a price next to it, search for its prefix immediately before it.
-
-    2. **Merge Composite Names**: 
-    - Combine modifiers with the main dish.
-    - Example: "김치" + "우동" → "김치 우동" (ONE item).
-    - Example: "해물" + "파전" → "해물 파전".
-    - If multiple words share ONE price, they are ONE item.
-
-    3. **Translate**: Translate the corrected name to natural English.
-    
-    4. **Description**: Explain ingredients and taste in detail (e.g., "Thick wheat noodle soup with fish cake and savory broth.").
-    
-    5. **Spicy Level**: Estimate spicy level (0~3).
-    
-    6. **Extract Price**: Find the associated price number.
-
-    OUTPUT FORMAT (JSON):
-    {
-        "foods": [
-            {
-                "korean": "Fixed Korean Name (e.g. 우동)",
-                "english": "English Name",
-                "description": "Detailed description...",
-                "spicy_level": 0,
-                "price": "3500"
-            }
-        ]
-    }
-    """
+        print(f"🤖 GPT-4o에게 메뉴 분석 요청 중... (새 메뉴 {len(sub_rows)}개 / 메모리 {len(foods_by_index)}개)")
+        client = get_openai_client()
 
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
+            max_output_tokens=60 * len(sub_rows),
             model="gpt-4o-mini",
             messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": extracted_text}
+                {"role": "system", "content": MENU_SYSTEM_PROMPT},
+                {"role": "user", "content": format_rows(sub_rows)}
             ],
             temperature=0,
             response_format={"type": "json_object"}
@@ -116,8 +148,66 @@ def analyze_menu_image(image_stream):
         
         final_json = clean_json_string(response.choices[0].message.content)
         print("✅ GPT 분석 완료!")
-        return json.loads(final_json)
+        _apply_new_foods(rows, unknown, fast_json.loads(final_json).get("foods", []), foods_by_index)
+        return merge_menu_rows(rows, foods_by_index)
 
+    except UpstreamOverloaded:
+        raise
     except Exception as e:
         print(f"❌ [AI 실패] GPT 에러: {str(e)}")
-        return {"error": f"AI Failed: {str(e)}"}
\ No newline at end of file
+        return {"error": f"AI Failed: {str(e)}"}
+
+
+def translate_menu_row_sets(row_sets):
+    """
+    짧은 메뉴판 여러 개를 한 번의 GPT 호출로 번역 (각 메뉴판의 처음 보는 메뉴만 전송).
+    row_sets: {id: rows} -> {id: {"foods": [...]}} (응답에서 빠진 id 는 결과에 없음)
+    """
+    results = {}
+    pending = {}  # id -> (rows, unknown, foods_by_index)
+    for menu_id, rows in row_sets.items():
+        foods_by_index, unknown = _recall(rows)
+        if unknown:
+            pending[menu_id] = (rows, unknown, foods_by_index)
+        else:
+            results[menu_id] = merge_menu_rows(rows, foods_by_index)
+    if not pending:
+        return results
+
+    client = get_openai_client()
+    payload = {"menus": [
+        {"id": str(menu_id), "rows": format_rows([rows[i] for i in unknown])}
+        for menu_id, (rows, unknown, _) in pending.items()
+    ]}
+    response = chat_completion(
+        client,
+        max_output_tokens=60 * sum(len(unknown) for _, unknown, _ in pending.values()),
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": MENU_SYSTEM_PROMPT + MENU_BATCH_INSTRUCTION},
+            {"role": "user", "content": fast_json.dumps(payload)}
+        ],
+        temperature=0,
+        response_format={"type": "json_object"}
+    )
+    parsed = fast_json.loads(clean_json_string(response.choices[0].message.content))
+    wanted = {str(menu_id): menu_id for menu_id in pending}
+    for menu in parsed.get("menus", []):
+        menu_id = wanted.get(str(menu.get("id")))
+        if menu_id is None:
+            continue
+        rows, unknown, foods_by_index = pending[menu_id]
+        _apply_new_foods(rows, unknown, menu.get("foods", []), foods_by_index)
+        results[menu_id] = merge_menu_rows(rows, foods_by_index)
+    return results
+
+
+def analyze_menu_image(image_stream):
+    print("🚀 [1단계] 메뉴판 분석 시작...")
+
+    rows = extract_menu_rows(image_stream)
+    if isinstance(rows, dict):
+        return rows
+
+    # 3. GPT 호출
+    return translate_menu_rows(rows)
@@ -0,0 +1,351 @@
+# backend/app/photo_jobs.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .catalog import BACKEND_DIR, DB_PATH
+from .shared_state import STATE_DB_PATH, connect_sqlite, import_legacy_table
+
+# ==========================================
+# 0. Photo Style Conversion Jobs
+# ==========================================
+# 사진 스타일 변환(필터 + 여러 크기 썸네일)을 요청 경로에서 빼서 photo_logs 테이블 기반 작업 큐로 처리합니다.
+#   - POST 는 원본을 저장하고 queued 행만 만든 뒤 바로 job_id 를 돌려줌 -> 클라이언트는 상태를 폴링
+#   - 실제 이미지 처리는 ProcessPoolExecutor (KTRIP_PHOTO_WORKERS, 기본 = CPU 코어 수) 에서 Pillow 로
+#   - 같은 사진 + 같은 스타일은 sha256 으로 중복 제거 (이미 끝났거나 진행 중인 작업을 그대로 반환)
+#   - 클라이언트에 주는 job_id 는 순번(photo_logs.id)이 아니라 그 해시의 앞 32자 (job_key) -> 남의 작업을 순회할 수 없음
+#   - 작업은 UPDATE ... WHERE status='queued' 로 한 워커만 가져가므로 gunicorn 멀티 워커에서도 중복 처리 없음
+#   - 풀이 깨지거나(자식 프로세스 사망) 워커가 종료되면 이 워커가 가져간 작업은 다시 queued 로 돌려놓음
+
+PHOTO_DIR = os.getenv("KTRIP_PHOTO_DIR") or os.path.join(BACKEND_DIR, "photos")
+PHOTO_WORKERS = int(os.getenv("KTRIP_PHOTO_WORKERS", "0")) or os.cpu_count() or 1
+MAX_PHOTO_BYTES = int(float(os.getenv("KTRIP_PHOTO_MAX_MB", "15")) * 1024 * 1024)
+JOB_KEY_RE = re.compile(r"^[0-9a-f]{32}$")
+STALE_JOB_SEC = 600  # processing 상태로 이 시간이 지나면 (워커가 죽은 것으로 보고) 다시 대기열로
+
+STYLES = ("default", "cartoon", "sketch", "blog_vibe", "vintage", "mono")
+THUMBNAIL_SIZES = (1080, 480, 160)  # 긴 변 기준 px
+MAX_OUTPUT_EDGE = 2048
+JPEG_QUALITY = 85
+
+
+class InvalidPhotoRequest(ValueError):
+    pass
+
+
+def job_key(content_hash):
+    """공개 작업 id (= 변환 결과 파일 이름)"""
+    return content_hash[:32]
+
+
+# ==========================================
+# 1. Image Processing (자식 프로세스에서 실행)
+# ==========================================
+def _apply_style(image, style):
+    from PIL import Image, ImageEnhance, ImageFilter, ImageOps
+
+    if style == "cartoon":
+        smooth = image.filter(ImageFilter.SMOOTH_MORE).filter(ImageFilter.SMOOTH_MORE)
+        flat = ImageOps.posterize(smooth, 3)
+        edges = ImageOps.invert(image.convert("L").filter(ImageFilter.FIND_EDGES))
+        edges = edges.point(lambda v: 255 if v > 200 else 0)
+        return ImageEnhance.Color(Image.composite(flat, Image.new("RGB", image.size), edges)).enhance(1.4)
+    if style == "sketch":
+        # 연필 스케치: 윤곽선(흰 바탕 검은 선) + 원본 명암 살짝
+        gray = ImageOps.grayscale(image).filter(ImageFilter.SMOOTH)
+        lines = ImageOps.autocontrast(gray.filter(ImageFilter.CONTOUR), cutoff=2)
+        return Image.blend(lines, ImageOps.autocontrast(gray), 0.15).convert("RGB")
+    if style == "blog_vibe":
+        bright = ImageEnhance.Brightness(image).enhance(1.08)
+        soft = ImageEnhance.Contrast(bright).enhance(0.9)
+        warm = Image.merge("RGB", [c.point(lambda v, k=k: min(255, int(v * k)))
+                                   for c, k in zip(soft.split(), (1.06, 1.0, 0.94))])
+        return ImageEnhance.Color(warm).enhance(1.15)
+    if style == "vintage":
+        sepia = ImageOps.colorize(ImageOps.grayscale(image), "#3b2a1a", "#f3e2c0")
+        vignette = Image.radial_gradient("L").resize(image.size)
+        return Image.composite(Image.new("RGB", image.size, "#1a120b"), sepia, vignette.point(lambda v: int(v * 0.6)))
+    if style == "mono":
+        return ImageOps.autocontrast(ImageOps.grayscale(image), cutoff=1).convert("RGB")
+    # default: 자동 대비 + 살짝 선명하게
+    return ImageEnhance.Sharpness(ImageOps.autocontrast(image, cutoff=1)).enhance(1.2)
+
+
+def convert_photo(src_path, style, out_dir, key):
+    """원본 -> 스타일 적용 이미지 + 썸네일들. 반환: {"converted": path, "thumbnails": {size: path}}"""
+    from PIL import Image, ImageOps
+
+    os.makedirs(out_dir, exist_ok=True)
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original).convert("RGB")
+    image.thumbnail((MAX_OUTPUT_EDGE, MAX_OUTPUT_EDGE))  # 큰 원본은 먼저 줄여서 처리 시간 제한
+    styled = _apply_style(image, style)
+
+    converted_path = os.path.join(out_dir, f"{key}.jpg")
+    styled.save(converted_path, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    thumbnails = {}
+    for size in THUMBNAIL_SIZES:
+        thumb = styled.copy()
+        thumb.thumbnail((size, size))
+        path = os.path.join(out_dir, f"{key}_{size}.jpg")
+        thumb.save(path, "JPEG", quality=JPEG_QUALITY, optimize=True)
+        thumbnails[str(size)] = path
+    return {"converted": converted_path, "thumbnails": thumbnails}
+
+
+# ==========================================
+# 2. Job Table (photo_logs)
+# ==========================================
+def ensure_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS photo_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            original_image_path TEXT NOT NULL,
+            converted_image_path TEXT,
+            style_type TEXT DEFAULT 'default',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(photo_logs)")}
+    for name, ddl in (("status", "TEXT NOT NULL DEFAULT 'queued'"), ("content_hash", "TEXT"),
+                      ("thumbnails", "TEXT"), ("error", "TEXT"), ("started_at", "REAL"), ("finished_at", "REAL")):
+        if name not in columns:
+            conn.execute(f"ALTER TABLE photo_logs ADD COLUMN {name} {ddl}")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_photo_logs_hash ON photo_logs (content_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_photo_logs_status ON photo_logs (status)")
+    conn.commit()
+
+
+_table_ready = False
+
+
+def _connect():
+    global _table_ready
+    conn = connect_sqlite(STATE_DB_PATH)
+    if not _table_ready:
+        ensure_table(conn)
+        import_legacy_table(conn, "photo_logs", DB_PATH)
+        _table_ready = True
+    return conn
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_claimed = set()  # 이 워커가 processing 으로 가져가서 아직 끝나지 않은 job id
+_claimed_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=PHOTO_WORKERS)
+                print(f"🖼️ [사진 변환] 프로세스 풀 시작 (workers={PHOTO_WORKERS})")
+    return _pool
+
+
+def _drop_pool(pool):
+    """깨진 풀은 버리고 다음 작업 때 새로 만듦"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_pool():
+    """워커 종료: 풀을 내리고 이 워커가 가져간 작업은 queued 로 (다음 시작 때 resume_pending_jobs 가 처리)"""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+    with _claimed_lock:
+        job_ids = list(_claimed)
+    if job_ids:
+        conn = _connect()
+        try:
+            _requeue(conn, job_ids)
+        finally:
+            conn.close()
+        print(f"🖼️ [사진 변환] 끝나지 않은 작업 {len(job_ids)}건 대기열로 되돌림")
+
+
+def _claim(conn, job_id):
+    """queued -> processing. 다른 워커가 먼저 가져갔으면 False"""
+    cursor = conn.execute(
+        "UPDATE photo_logs SET status = 'processing', started_at = ? WHERE id = ? AND status = 'queued'",
+        (time.time(), job_id),
+    )
+    conn.commit()
+    if cursor.rowcount == 1:
+        with _claimed_lock:
+            _claimed.add(job_id)
+    return cursor.rowcount == 1
+
+
+def _requeue(conn, job_ids):
+    """processing -> queued (이 워커가 끝내지 못한 작업)"""
+    conn.executemany(
+        "UPDATE photo_logs SET status = 'queued', started_at = NULL WHERE id = ? AND status = 'processing'",
+        [(job_id,) for job_id in job_ids],
+    )
+    conn.commit()
+    with _claimed_lock:
+        _claimed.difference_update(job_ids)
+
+
+def _public_error(error):
+    """클라이언트에 보여줄 오류 메시지 (서버 경로는 파일 이름만 남김)"""
+    message = re.sub(r"(?:[A-Za-z]:)?[\\/][^\s'\"]*[\\/]", "", str(error))
+    return f"{type(error).__name__}: {message}"[:500]
+
+
+def _dispatch(job_id, src_path, style, key):
+    conn = _connect()
+    try:
+        if not _claim(conn, job_id):
+            return
+    finally:
+        conn.close()
+    pool = None
+    try:
+        pool = _get_pool()
+        future = pool.submit(convert_photo, src_path, style, os.path.join(PHOTO_DIR, "converted"), key)
+    except BaseException as e:
+        # 깨진 풀 / 종료 중인 풀: 작업은 대기열로 되돌리고 (다음 resume 때 처리) 풀은 버림
+        print(f"❌ [사진 변환] job {job_id} 제출 실패: {e}")
+        if pool is not None:
+            _drop_pool(pool)
+        conn = _connect()
+        try:
+            _requeue(conn, [job_id])
+        finally:
+            conn.close()
+        if not isinstance(e, Exception):
+            raise
+        return
+    future.add_done_callback(lambda f: _finish(job_id, f, pool))
+
+
+def _finish(job_id, future, pool=None):
+    conn = _connect()
+    try:
+        if future.cancelled():
+            _requeue(conn, [job_id])  # 종료 중 취소된 작업은 다음 시작 때 다시 처리
+            return
+        try:
+            result = future.result()
+            conn.execute("""
+                UPDATE photo_logs SET status = 'done', converted_image_path = ?, thumbnails = ?, error = NULL,
+                    finished_at = ? WHERE id = ?
+            """, (result["converted"], json.dumps(result["thumbnails"]), time.time(), job_id))
+        except BaseException as e:
+            print(f"❌ [사진 변환] job {job_id} 실패: {e}")
+            if isinstance(e, BrokenProcessPool) and pool is not None:
+                _drop_pool(pool)
+            conn.execute(
+                "UPDATE photo_logs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (_public_error(e), time.time(), job_id),
+            )
+        conn.commit()
+    finally:
+        with _claimed_lock:
+            _claimed.discard(job_id)
+        conn.close()
+
+
+def enqueue_photo(data, style="default", filename=""):
+    """-> (job_key, deduplicated). 같은 사진 + 스타일이 이미 있으면 그 작업을 반환"""
+    style = style or "default"
+    if style not in STYLES:
+        raise InvalidPhotoRequest(f"unknown style '{style}' (available: {', '.join(STYLES)})")
+    if not data:
+        raise InvalidPhotoRequest("empty file")
+    if len(data) > MAX_PHOTO_BYTES:
+        raise InvalidPhotoRequest(f"file too large (max {MAX_PHOTO_BYTES // 1024 // 1024}MB)")
+
+    image_hash = hashlib.sha256(data).hexdigest()
+    content_hash = hashlib.sha256(f"{image_hash}|{style}".encode()).hexdigest()
+    ext = os.path.splitext(filename)[1].lower() if filename else ""
+    raw_path = os.path.join(PHOTO_DIR, "raw", f"{image_hash}{ext if ext in ('.jpg', '.jpeg', '.png', '.webp', '.heic') else ''}")
+
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT id, status FROM photo_logs WHERE content_hash = ?", (content_hash,)).fetchone()
+        if row and row[1] != "failed":
+            return job_key(content_hash), True
+
+        if not os.path.exists(raw_path):
+            os.makedirs(os.path.dirname(raw_path), exist_ok=True)
+            tmp_path = f"{raw_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, raw_path)
+
+        if row:  # 실패했던 작업은 다시 시도
+            job_id = row[0]
+            conn.execute("UPDATE photo_logs SET status = 'queued', error = NULL WHERE id = ?", (job_id,))
+        else:
+            cursor = conn.execute("""
+                INSERT INTO photo_logs (original_image_path, style_type, status, content_hash)
+                VALUES (?, ?, 'queued', ?)
+                ON CONFLICT(content_hash) DO NOTHING
+            """, (raw_path, style, content_hash))
+            if cursor.rowcount == 0:  # 동시에 같은 요청이 들어온 경우
+                conn.commit()
+                return job_key(content_hash), True
+            job_id = cursor.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+
+    _dispatch(job_id, raw_path, style, job_key(content_hash))
+    return job_key(content_hash), False
+
+
+def get_photo_job(key):
+    """job_key -> 작업 dict 또는 None"""
+    if not JOB_KEY_RE.match(str(key or "")):
+        return None
+    conn = _connect()
+    try:
+        # 접두어 GLOB 은 content_hash 색인을 그대로 씀
+        row = conn.execute("""
+            SELECT substr(content_hash, 1, 32), status, style_type, converted_image_path, thumbnails, error,
+                   created_at, started_at, finished_at
+            FROM photo_logs WHERE content_hash GLOB ?
+        """, (f"{key}*",)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    keys = ("job_id", "status", "style", "converted_image_path", "thumbnails", "error", "created_at", "started_at", "finished_at")
+    job = dict(zip(keys, row))
+    job["thumbnails"] = json.loads(job["thumbnails"]) if job["thumbnails"] else {}
+    return job
+
+
+def resume_pending_jobs():
+    """서버 재시작 후 남아 있는 queued 작업과 오래된 processing 작업을 다시 처리"""
+    conn = _connect()
+    try:
+        conn.execute(
+            "UPDATE photo_logs SET status = 'queued' WHERE status = 'processing' AND started_at < ?",
+            (time.time() - STALE_JOB_SEC,),
+        )
+        conn.commit()
+        rows = conn.execute(
+            "SELECT id, original_image_path, style_type, content_hash FROM photo_logs WHERE status = 'queued'"
+        ).fetchall()
+    finally:
+        conn.close()
+    for job_id, raw_path, style, content_hash in rows:
+        _dispatch(job_id, raw_path, style, (content_hash or str(job_id))[:32])
+    return len(rows)
@@ -0,0 +1,230 @@
+# backend/app/plan_store.py
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .catalog import BACKEND_DIR, DB_PATH
+from .clients import get_blob_service_client
+from .shared_state import STATE_DB_PATH, connect_sqlite, import_legacy_table
+
+# ==========================================
+# 0. Content-addressed Plan Store
+# ==========================================
+# /api/save-plan 은 예전에 매번 uuid4().json (indent=2) 을 새로 올렸습니다 (중복/색인 없음, 다시 읽을 방법 없음).
+#   - 일정 JSON 을 정규화(키 정렬, 공백 제거, timestamp 같은 저장 시각 제외)해서 sha256 -> plan_id
+#   - 같은 내용이면 업로드 생략 (저장 횟수만 증가), 새 내용은 gzip 으로 "<plan_id>.json.gz" 저장
+#   - 지역/기간/장소 수/생성 시각은 상태 DB(ktrip_state.db) 의 plans 테이블에 색인 -> 목록 조회는 SQLite 만 사용
+#   - 읽기는 LRU 캐시 (내용이 plan_id 로 고정이라 무효화가 필요 없음)
+# 저장소: Azure Blob 'plans' 컨테이너 또는 로컬 폴더 (KTRIP_PLAN_BACKEND=local, 테스트/개발용)
+
+PLAN_CONTAINER = "plans"
+PLAN_CACHE_SIZE = int(os.getenv("KTRIP_PLAN_CACHE_SIZE", "256"))
+VOLATILE_FIELDS = ("timestamp",)  # 내용이 같으면 같은 일정으로 보기 위해 해시에서 제외
+PLAN_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class PlanNotFound(Exception):
+    pass
+
+
+# ---------- 저장 백엔드 ----------
+class BlobPlanBackend:
+    def __init__(self, container=PLAN_CONTAINER):
+        self.container = container
+
+    def _blob(self, name):
+        service = get_blob_service_client()
+        if service is None:
+            raise RuntimeError("AZURE_STORAGE_CONNECTION_STRING is not set")
+        return service.get_blob_client(container=self.container, blob=name)
+
+    def exists(self, name):
+        return self._blob(name).exists()
+
+    def put(self, name, data):
+        from azure.storage.blob import ContentSettings  # SDK 는 첫 사용 시 로드
+        self._blob(name).upload_blob(
+            data, overwrite=True,
+            content_settings=ContentSettings(content_type="application/json", content_encoding="gzip"),
+        )
+
+    def get(self, name):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return self._blob(name).download_blob().readall()
+        except ResourceNotFoundError:
+            raise PlanNotFound(name)
+
+
+class LocalPlanBackend:
+    def __init__(self, root=None):
+        self.root = root or os.getenv("KTRIP_PLAN_DIR") or os.path.join(BACKEND_DIR, "plans")
+        os.makedirs(self.root, exist_ok=True)
+
+    def exists(self, name):
+        return os.path.exists(os.path.join(self.root, name))
+
+    def put(self, name, data):
+        path = os.path.join(self.root, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # 동시에 같은 일정을 저장해도 반쯤 쓴 파일이 보이지 않음
+
+    def get(self, name):
+        try:
+            with open(os.path.join(self.root, name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise PlanNotFound(name)
+
+
+def default_backend():
+    kind = os.getenv("KTRIP_PLAN_BACKEND")
+    if kind is None:
+        kind = "blob" if os.getenv("AZURE_STORAGE_CONNECTION_STRING") else "local"
+    return LocalPlanBackend() if kind == "local" else BlobPlanBackend()
+
+
+# ---------- 정규화 / 해시 ----------
+def canonical_plan_bytes(plan):
+    plan = {k: v for k, v in plan.items() if k not in VOLATILE_FIELDS}
+    return json.dumps(plan, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def plan_id_for(plan):
+    return hashlib.sha256(canonical_plan_bytes(plan)).hexdigest()
+
+
+class PlanStore:
+    def __init__(self, backend=None, db_path=STATE_DB_PATH, cache_size=PLAN_CACHE_SIZE):
+        self.backend = backend or default_backend()
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        conn = connect_sqlite(self.db_path)
+        try:
+            self.ensure_table(conn)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def ensure_table(conn):
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS plans (
+                plan_id TEXT PRIMARY KEY,          -- 정규화한 일정 JSON 의 sha256
+                target_area TEXT,
+                duration TEXT,
+                spot_count INTEGER,
+                size INTEGER,                      -- 압축 후 바이트
+                save_count INTEGER NOT NULL DEFAULT 1,
+                created_at REAL NOT NULL,
+                last_saved_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_plans_created ON plans (created_at DESC);
+            CREATE INDEX IF NOT EXISTS idx_plans_area ON plans (target_area, created_at DESC);
+        """)
+        conn.commit()
+        import_legacy_table(conn, "plans", DB_PATH)  # 예전에 ktrip.db 에 쌓인 색인
+
+    @staticmethod
+    def _name(plan_id):
+        return f"{plan_id}.json.gz"
+
+    # ---------- 쓰기 ----------
+    def save(self, plan):
+        """-> (plan_id, deduplicated). 같은 내용이 이미 있으면 업로드하지 않음"""
+        body = canonical_plan_bytes(plan)
+        plan_id = hashlib.sha256(body).hexdigest()
+        now = time.time()
+
+        conn = connect_sqlite(self.db_path)
+        try:
+            cursor = conn.execute(
+                "UPDATE plans SET save_count = save_count + 1, last_saved_at = ? WHERE plan_id = ?", (now, plan_id)
+            )
+            conn.commit()
+            if cursor.rowcount:
+                return plan_id, True
+
+            name = self._name(plan_id)
+            data = gzip.compress(body, compresslevel=9, mtime=0)
+            deduplicated = self.backend.exists(name)  # 색인이 없어진 경우 (다른 서버 / DB 초기화)
+            if not deduplicated:
+                self.backend.put(name, data)
+
+            survey = plan.get("survey") if isinstance(plan.get("survey"), dict) else {}
+            spots = plan.get("spots") if isinstance(plan.get("spots"), list) else []
+            conn.execute("""
+                INSERT INTO plans (plan_id, target_area, duration, spot_count, size, created_at, last_saved_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(plan_id) DO UPDATE SET
+                    save_count = save_count + 1, last_saved_at = excluded.last_saved_at
+            """, (plan_id, survey.get("target_area"), survey.get("duration"), len(spots), len(data), now, now))
+            conn.commit()
+        finally:
+            conn.close()
+        return plan_id, deduplicated
+
+    # ---------- 읽기 ----------
+    def get(self, plan_id):
+        if not PLAN_ID_RE.match(plan_id or ""):
+            raise PlanNotFound(plan_id)
+        with self._cache_lock:
+            plan = self._cache.get(plan_id)
+            if plan is not None:
+                self._cache.move_to_end(plan_id)
+                return plan
+
+        data = self.backend.get(self._name(plan_id))
+        if data[:2] == b"\x1f\x8b":  # Blob SDK 는 Content-Encoding: gzip 을 풀어서 줄 수도 있음
+            data = gzip.decompress(data)
+        plan = json.loads(data)
+        with self._cache_lock:
+            self._cache[plan_id] = plan
+            self._cache.move_to_end(plan_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return plan
+
+    def list(self, limit=20, offset=0, target_area=None, duration=None):
+        query = "SELECT plan_id, target_area, duration, spot_count, size, save_count, created_at, last_saved_at FROM plans"
+        conditions, params = [], []
+        if target_area:
+            conditions.append("target_area = ?")
+            params.append(target_area)
+        if duration:
+            conditions.append("duration = ?")
+            params.append(duration)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params += [max(1, min(int(limit), 100)), max(0, int(offset))]
+
+        conn = connect_sqlite(self.db_path)
+        try:
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        keys = ("plan_id", "target_area", "duration", "spot_count", "size", "save_count", "created_at", "last_saved_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_plan_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PlanStore()
+    return _store
@@ -0,0 +1,135 @@
+# backend/app/planner.py
+
+import math
+import time
+
+from . import fast_json
+from .itinerary_templates import survey_key
+from .llm import extract_base_keywords, get_db_info
+
+# ==========================================
+# 0. Rule-based Itinerary Planner (LLM-free)
+# ==========================================
+# Azure OpenAI 가 느리거나 과부하/장애일 때 빈 일정({"spots": []}) 대신 바로 쓸 수 있는 규칙 기반 플래너.
+#   - get_db_info 의 점수순 후보(키워드는 설문에서 바로 추출 -> LLM 호출 없음)로
+#   - 하루 Lunch -> Tour -> Cafe -> Tour -> Dinner 슬롯을 채우고
+#   - 같은 장소는 한 번만, 다음 장소는 직전 장소에서 가까운 후보를 우선 (거리 - 관련도 점수)
+#   - 이름은 카탈로그의 영어 이름(name_en)이 있으면 영어로
+#   - 보충 후보는 설문 키(survey_key)로 시드를 고정 -> 같은 설문이면 같은 일정 (템플릿 캐시와 어긋나지 않음)
+# 수 ms 안에 끝나므로 "instant" 모드와 LLM 지연 예산 초과 시 fallback 으로 사용합니다.
+
+DAY_PATTERN = ["Lunch", "Tour", "Cafe", "Tour", "Dinner"]
+HALF_DAY_PATTERN = ["Meal", "Tour", "Cafe"]
+
+ROLE_CATEGORIES = {
+    "Meal": ["MEAL"],
+    "Lunch": ["MEAL"],
+    "Dinner": ["MEAL"],
+    "Tour": ["TOUR"],
+    "Cafe": ["CAFE", "MEAL"],  # 카페 후보가 없으면 디저트/식당으로 대체
+}
+
+EXCLUDED_TYPES = {"stay"}  # 숙소는 방문 코스에 넣지 않음
+TOUR_TYPES = {"playground", "place", "store", "shop"}  # Tour 슬롯 후보 (지하철역 등은 제외)
+RELEVANCE_KM = 1.0         # 관련도 1점 = 이동거리 1km 만큼의 가치
+MAX_LEG_KM = 8.0           # 이보다 먼 후보는 가까운 후보가 없을 때만 선택
+NO_COORD_PENALTY_KM = 50.0
+
+TYPE_LABELS = {"MEAL": "Local restaurant", "CAFE": "Local cafe", "TOUR": "K-culture spot"}
+
+
+def slot_pattern(duration):
+    """설문 duration -> 역할 목록 (get_ai_recommendation 의 개수 규칙과 동일)"""
+    duration = str(duration or "1 day").lower()
+    if "half" in duration:
+        return list(HALF_DAY_PATTERN)
+    if "2 day" in duration:
+        return DAY_PATTERN * 2
+    if "3 day" in duration or "+" in duration:
+        return DAY_PATTERN * 3
+    return list(DAY_PATTERN)
+
+
+def distance_km(a, b):
+    """두 후보 사이 대략적인 거리 (haversine). 좌표가 없으면 큰 페널티"""
+    try:
+        lat1, lng1, lat2, lng2 = (math.radians(float(v)) for v in (a["lat"], a["lng"], b["lat"], b["lng"]))
+    except (TypeError, ValueError):
+        return NO_COORD_PENALTY_KM
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def pick_candidate(candidates, used, previous):
+    """아직 안 쓴 후보 중 (거리 - 관련도) 가 가장 작은 것. 첫 장소는 관련도 최고"""
+    available = [c for c in candidates if c["korean_id"] not in used]
+    if not available:
+        return None
+    if previous is None:
+        return max(available, key=lambda c: c["relevance"])
+
+    def cost(c):
+        km = distance_km(previous, c)
+        return (km > MAX_LEG_KM, km - RELEVANCE_KM * c["relevance"])
+    return min(available, key=cost)
+
+
+def candidate_to_spot(item, role, category):
+    name = item.get("name_en") or item["korean_id"]
+    media = item.get("media_title") or ""
+    description = f"{TYPE_LABELS[category]} featured in {media}" if media else TYPE_LABELS[category]
+    return {
+        "name": f"{name}({role})",
+        "description": description,
+        "lat": item["lat"],
+        "lng": item["lng"],
+        "media_title": media,
+        "location_id": item.get("location_id"),
+        "tips": item.get("tips") or "",
+    }
+
+
+def usable_candidates(db_data):
+    """get_db_info 결과에서 코스에 넣을 수 있는 후보만 (숙소 제외, Tour 는 관광지 유형만)"""
+    return {
+        category: [
+            c for c in items
+            if c.get("type", "").strip() not in EXCLUDED_TYPES
+            and (category != "TOUR" or c.get("type", "").strip() in TOUR_TYPES)
+        ]
+        for category, items in db_data.items()
+    }
+
+
+def plan_from_candidates(db_data, duration):
+    """get_db_info 결과 + duration -> spots 목록"""
+    candidates = usable_candidates(db_data)
+    pattern = slot_pattern(duration)
+    day_size = len(HALF_DAY_PATTERN) if len(pattern) == len(HALF_DAY_PATTERN) else len(DAY_PATTERN)
+
+    spots = []
+    used = set()
+    previous = None
+    for position, role in enumerate(pattern):
+        if position % day_size == 0:
+            # 하루의 시작: 남은 관광 후보 중 관련도 최고인 곳 근처에서 출발
+            previous = pick_candidate(candidates.get("TOUR", []), used, None)
+        for category in ROLE_CATEGORIES[role]:
+            item = pick_candidate(candidates.get(category, []), used, previous)
+            if item is not None:
+                used.add(item["korean_id"])
+                spots.append(candidate_to_spot(item, role, category))
+                previous = item
+                break
+    return spots
+
+
+def plan_itinerary(user_query, mode="instant"):
+    """설문(dict 또는 JSON 문자열) -> get_ai_recommendation 과 같은 형식의 JSON 문자열"""
+    started = time.perf_counter()
+    user_data = user_query if isinstance(user_query, dict) else fast_json.loads(user_query)
+    keywords, _ = extract_base_keywords(user_data)
+    db_data = get_db_info(user_data, keywords=keywords or ["서울"], seed=survey_key(user_data))
+    spots = plan_from_candidates(db_data, user_data.get("duration"))
+    print(f"🧭 [규칙 기반 일정] {len(spots)}곳 ({(time.perf_counter() - started) * 1000:.0f}ms, mode={mode})")
+    return fast_json.dumps({"mode": mode, "spots": spots})
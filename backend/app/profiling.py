@@ -0,0 +1,349 @@
+# backend/app/profiling.py
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from .catalog import BACKEND_DIR
+from .shared_state import get_shared_store
+
+# ==========================================
+# 0. On-demand Request Profiling
+# ==========================================
+# 운영 중 특정 /api/recommend, /api/analyze-menu 요청이 느리거나 메모리를 많이 쓸 때
+# 재배포 없이 그 요청 하나만 들여다보기 위한 기능입니다. KTRIP_PROFILE_TOKEN 이 없으면 꺼져 있고
+# 미들웨어도 등록되지 않습니다 (비활성 시 오버헤드 0).
+#   - 요청 헤더 "X-KTrip-Profile: <token>;mode=cpu|alloc" -> 그 요청만 프로파일 (mode 생략 시 cpu)
+#   - POST /api/admin/profiling {"requests": N, "path_prefix": "/api/recommend", "mode": "cpu"} -> 다음 N개 요청 (모든 워커)
+# tracemalloc 은 할당마다 스택을 기록해서 CPU 시간을 크게 부풀리므로 두 모드는 따로 실행합니다.
+#   - cpu: 샘플링 스레드가 KTRIP_PROFILE_INTERVAL_MS 마다 모든 스레드의 스택을 기록 -> <id>.speedscope.json
+#     (run_in_threadpool 로 도는 LLM/OCR 코드도 잡히도록 스레드별로 기록. 같은 워커의 동시 요청도 섞일 수 있음)
+#   - alloc: tracemalloc 으로 요청 동안 늘어난 메모리 상위 위치 + peak -> <id>.json
+# 결과는 KTRIP_PROFILE_DIR (기본 backend/profiles) 에 최근 KTRIP_PROFILE_KEEP 개만 남깁니다.
+# speedscope 파일은 https://www.speedscope.app 에 그대로 올려서 봅니다.
+
+PROFILE_TOKEN = os.getenv("KTRIP_PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("KTRIP_PROFILE_DIR") or os.path.join(BACKEND_DIR, "profiles")
+PROFILE_KEEP = int(os.getenv("KTRIP_PROFILE_KEEP", "20"))
+SAMPLE_INTERVAL_SEC = float(os.getenv("KTRIP_PROFILE_INTERVAL_MS", "5")) / 1000
+MAX_PROFILE_SEC = 120         # 이보다 긴 요청은 앞부분만 샘플링 (메모리 상한)
+MAX_STACK_DEPTH = 128
+TRACE_FRAMES = 10             # tracemalloc 이 할당마다 보관하는 스택 깊이
+TOP_ALLOCATIONS = 30
+
+PROFILE_HEADER = "x-ktrip-profile"
+ADMIN_HEADER = "x-ktrip-admin-token"
+ARMED_KEY = "profiling_armed"
+REMAINING_COUNTER = "profiling_remaining"
+ARMED_CHECK_SEC = 1.0         # 관리자 토글 상태는 워커마다 1초에 한 번만 공유 저장소에서 읽음
+MODES = ("cpu", "alloc")
+DEFAULT_MODE = "cpu"
+
+# 대기 중인 스레드(스레드풀 유휴 워커, 이벤트 루프 select)는 CPU 프로파일에서 제외
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get")}
+
+
+def profiling_enabled():
+    return bool(PROFILE_TOKEN)
+
+
+def check_token(value):
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(str(value or ""), PROFILE_TOKEN)
+
+
+def parse_profile_header(value):
+    """'<token>;mode=alloc' -> (token, mode). 모르는 mode 는 기본(cpu)"""
+    token, *params = str(value or "").split(";")
+    mode = DEFAULT_MODE
+    for param in params:
+        key, _, val = param.partition("=")
+        if key.strip().lower() == "mode" and val.strip().lower() in MODES:
+            mode = val.strip().lower()
+    return token.strip(), mode
+
+
+# ==========================================
+# 1. Sampling CPU Profiler -> speedscope
+# ==========================================
+class StackSampler:
+    def __init__(self, interval=SAMPLE_INTERVAL_SEC, max_duration=MAX_PROFILE_SEC):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.frames = []          # speedscope shared frames
+        self._frame_index = {}
+        self.samples = {}         # thread id -> [(stack, weight_ms)]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration_ms = (time.perf_counter() - self.started_at) * 1000
+
+    def _frame_id(self, code):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        own_id = threading.get_ident()
+        last = self.started_at
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now - self.started_at > self.max_duration:
+                break
+            weight = (now - last) * 1000
+            last = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()  # speedscope 는 root -> leaf 순서
+                self.samples.setdefault(thread_id, []).append((stack, weight))
+
+    def to_speedscope(self, name):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        profiles = []
+        for thread_id, samples in sorted(self.samples.items(), key=lambda item: -len(item[1])):
+            profiles.append({
+                "type": "sampled",
+                "name": f"{names.get(thread_id, 'thread')} ({thread_id})",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(sum(w for _, w in samples), 3),
+                "samples": [stack for stack, _ in samples],
+                "weights": [round(w, 3) for _, w in samples],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ktrip-profiler",
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+
+# ==========================================
+# 2. Allocation Snapshot (tracemalloc)
+# ==========================================
+class AllocationTracer:
+    def start(self):
+        self.owns_tracing = not tracemalloc.is_tracing()
+        if self.owns_tracing:
+            tracemalloc.start(TRACE_FRAMES)
+            self.baseline = None
+        else:  # PYTHONTRACEMALLOC 등으로 이미 켜져 있으면 시작 시점과 비교
+            self.baseline = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+    def stop(self):
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, __file__, all_frames=True),  # 샘플러 자신이 쓴 메모리
+        ))
+        if self.owns_tracing:
+            tracemalloc.stop()
+        if self.baseline is not None:
+            stats = snapshot.compare_to(self.baseline, "traceback")
+            top = [s for s in stats if s.size_diff > 0][:TOP_ALLOCATIONS]
+            items = [{"size_kb": round(s.size_diff / 1024, 1), "count": s.count_diff,
+                      "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback]} for s in top]
+        else:
+            top = snapshot.statistics("traceback")[:TOP_ALLOCATIONS]
+            items = [{"size_kb": round(s.size / 1024, 1), "count": s.count,
+                      "traceback": [f"{f.filename}:{f.lineno}" for f in s.traceback]} for s in top]
+        return {"current_kb": round(current / 1024, 1), "peak_kb": round(peak / 1024, 1), "top": items}
+
+
+# ==========================================
+# 3. Storage (최근 PROFILE_KEEP 개)
+# ==========================================
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save_profile(profile_id, meta, speedscope=None):
+    """메타(+ alloc 모드의 할당 목록)는 <id>.json, cpu 모드의 샘플은 <id>.speedscope.json"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if speedscope is not None:
+        _write_json(os.path.join(PROFILE_DIR, f"{profile_id}.speedscope.json"), speedscope)
+    _write_json(os.path.join(PROFILE_DIR, f"{profile_id}.json"), meta)
+    for old in list_profiles(limit=None)[PROFILE_KEEP:]:
+        for suffix in (".json", ".speedscope.json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, old["id"] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit=50):
+    """최근 것부터 메타 정보 목록 (할당 상위 목록은 제외)"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = [n for n in os.listdir(PROFILE_DIR) if n.endswith(".json") and not n.endswith(".speedscope.json")]
+    names.sort(key=lambda n: os.path.getmtime(os.path.join(PROFILE_DIR, n)), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta.pop("allocations", None)
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(profile_id, kind="speedscope"):
+    """다운로드할 파일 경로 또는 None. kind: speedscope (cpu 모드) / alloc (메타 + 할당 목록)"""
+    if not profile_id or not all(c.isalnum() or c == "-" for c in profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.speedscope.json" if kind == "speedscope" else f"{profile_id}.json")
+    return path if os.path.exists(path) else None
+
+
+# ==========================================
+# 4. Admin Toggle (다음 N개 요청)
+# ==========================================
+_armed_cache = {"checked_at": 0.0, "value": None}
+
+
+def arm(requests=1, path_prefix="/api/", ttl_sec=600, mode=DEFAULT_MODE):
+    if mode not in MODES:
+        raise ValueError(f"unknown mode '{mode}' (available: {', '.join(MODES)})")
+    store = get_shared_store()
+    requests = max(0, int(requests))
+    if requests == 0:
+        store.delete(ARMED_KEY)
+    else:
+        store.set(ARMED_KEY, {"path_prefix": path_prefix, "requests": requests, "mode": mode}, ttl=ttl_sec)
+    store.incr(REMAINING_COUNTER, requests - store.get_count(REMAINING_COUNTER))
+    _armed_cache["checked_at"] = 0.0
+    return {"requests": requests, "path_prefix": path_prefix, "ttl_sec": ttl_sec if requests else 0, "mode": mode}
+
+
+def _armed_mode(path):
+    """관리자 토글이 이 경로를 노리고 있으면 mode, 아니면 None (남은 횟수는 줄이지 않음)"""
+    now = time.time()
+    if now - _armed_cache["checked_at"] >= ARMED_CHECK_SEC:
+        _armed_cache["value"] = get_shared_store().get(ARMED_KEY)
+        _armed_cache["checked_at"] = now
+    armed = _armed_cache["value"]
+    if not armed or not path.startswith(armed["path_prefix"]):
+        return None
+    return armed.get("mode", DEFAULT_MODE)
+
+
+def _consume_armed():
+    """남은 횟수를 하나 사용. 이미 다 썼으면 토글을 해제하고 False (_profile_lock 을 잡은 뒤에만 호출)"""
+    store = get_shared_store()
+    if store.incr(REMAINING_COUNTER, -1) >= 0:
+        return True
+    store.incr(REMAINING_COUNTER, 1)  # 이미 다 씀 -> 0 으로 되돌리고 해제
+    store.delete(ARMED_KEY)
+    _armed_cache["value"] = None
+    return False
+
+
+# ==========================================
+# 5. Middleware
+# ==========================================
+_profile_lock = threading.Lock()  # sys._current_frames / tracemalloc 은 프로세스 전체라 한 번에 하나만
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        requested = Headers(scope=scope).get(PROFILE_HEADER)
+        if requested is None:
+            mode = _armed_mode(scope["path"])
+            if mode is None:
+                return await self.app(scope, receive, send)
+        else:
+            token, mode = parse_profile_header(requested)
+            if not check_token(token):
+                return await self.app(scope, receive, send)
+        if not _profile_lock.acquire(blocking=False):
+            # 관리자 토글의 남은 횟수는 아직 쓰지 않았으므로 다음 요청이 프로파일됨
+            print(f"⏭️ [프로파일] 다른 요청을 프로파일 중이라 건너뜀: {scope['path']}")
+            return await self.app(scope, receive, send)
+        if requested is None and not _consume_armed():
+            _profile_lock.release()
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                MutableHeaders(scope=message)["X-KTrip-Profile-Id"] = profile_id
+            await send(message)
+
+        sampler = StackSampler() if mode == "cpu" else None
+        tracer = AllocationTracer() if mode == "alloc" else None
+        started = time.perf_counter()
+        try:
+            (sampler or tracer).start()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if sampler is not None:
+                    sampler.stop()
+                allocations = tracer.stop() if tracer is not None else None
+        finally:
+            _profile_lock.release()
+
+        name = f"{scope['method']} {scope['path']}"
+        meta = {
+            "id": profile_id,
+            "mode": mode,
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status["code"],
+            "created_at": time.time(),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        if sampler is not None:
+            meta["samples"] = sum(len(s) for s in sampler.samples.values())
+            summary = f"{meta['samples']} samples"
+        else:
+            meta.update(peak_kb=allocations["peak_kb"], current_kb=allocations["current_kb"],
+                        allocations=allocations["top"])
+            summary = f"peak {meta['peak_kb']:.0f}KB"
+        try:
+            speedscope = sampler.to_speedscope(name) if sampler is not None else None
+            await run_in_threadpool(save_profile, profile_id, meta, speedscope)
+            print(f"🔬 [프로파일:{mode}] {name} {meta['duration_ms']:.0f}ms, {summary} -> {profile_id}")
+        except Exception as e:
+            print(f"⚠️ [프로파일] 저장 실패: {e}")
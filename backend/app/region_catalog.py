@@ -0,0 +1,229 @@
+# backend/app/region_catalog.py
+
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .catalog import (DB_PATH, OTHER_REGION, REGIONS, changed_ids_since, ensure_location_columns, get_catalog_version,
+                      region_for, resolve_region)
+
+# ==========================================
+# 0. Region-partitioned Catalog Snapshots
+# ==========================================
+# 일정은 항상 한 지역 안에서 짜는데 get_db_info 는 매번 전국 locations 전체에 LIKE 검색을 했습니다.
+#   - locations.region (시/도, catalog.region_for) + (region, place_type) 색인
+#   - 지역별 장소를 처음 요청될 때 메모리 스냅샷으로 로드 -> 키워드 검색/무작위 후보는 그 지역 안에서만
+#   - 스냅샷 전체 크기가 KTRIP_REGION_CACHE_MB 를 넘으면 가장 오래 안 쓴 지역부터 내림 (LRU)
+#   - init_db 증분 동기화로 카탈로그 버전이 바뀌면 바뀐 id 만 다시 읽어 갱신 (changed_ids_since)
+#   - 팁/영어 이름(ai_summary, name_en)은 버전 없이 채워지므로 KTRIP_REGION_REFRESH_SEC 마다 다시 로드
+# target_area 로 지역을 못 정하거나 그 지역에 장소가 없으면 KTRIP_DEFAULT_REGION (기본 seoul) 스냅샷.
+# 전국 전체를 한 스냅샷으로 올리지는 않음 (지역 분할 / 메모리 한도가 무의미해지므로).
+# 좌표/일정으로 지역을 정할 때는 대표 좌표 거리 대신 저장된 locations.region 을 씁니다
+# (서울 서쪽 끝 장소는 서울 중심보다 인천 중심에 더 가까움).
+
+CACHE_MAX_BYTES = int(float(os.getenv("KTRIP_REGION_CACHE_MB", "64")) * 1024 * 1024)
+REFRESH_SEC = float(os.getenv("KTRIP_REGION_REFRESH_SEC", "600"))
+VERSION_CHECK_SEC = 5.0
+DEFAULT_REGION = os.getenv("KTRIP_DEFAULT_REGION", "seoul")
+NEAR_DEGREES = 0.1  # region_near: 이 범위(약 10km) 안의 카탈로그 장소 중 가장 가까운 곳의 지역
+
+# get_db_info 가 쓰는 행 형식
+COLUMNS = "id, name, description, lat, lng, media_title, place_type, ai_summary, name_en"
+
+
+class RegionSnapshot:
+    """한 지역 장소 목록 (읽기 전용, 갱신은 새 스냅샷을 만들어 교체)"""
+
+    def __init__(self, region, rows, version):
+        self.region = region
+        self.rows = rows
+        self.version = version
+        self.loaded_at = time.time()
+        self.checked_at = self.loaded_at
+        # LIKE '%kw%' 를 name / media_title / description 각각에 건 것과 같은 검색용 문자열
+        self._haystack = [f"{r[1] or ''}\x00{r[5] or ''}\x00{r[2] or ''}".lower() for r in rows]
+        self.size_bytes = sum(sys.getsizeof(h) + sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r)
+                              for h, r in zip(self._haystack, rows))
+
+    def search(self, keyword, limit):
+        keyword = str(keyword).lower()
+        found = []
+        for row, text in zip(self.rows, self._haystack):
+            if keyword in text:
+                found.append(row)
+                if len(found) >= limit:
+                    break
+        return found
+
+    def sample(self, k, seed=None):
+        """무작위 후보 k개. seed 를 주면 같은 스냅샷에서는 항상 같은 후보 (rows 는 id 순)"""
+        rng = random.Random(seed) if seed is not None else random
+        return rng.sample(self.rows, min(k, len(self.rows)))
+
+    def patched(self, changed_rows, removed_ids, version):
+        """바뀐 행만 반영한 새 스냅샷"""
+        by_id = {r[0]: r for r in self.rows}
+        for loc_id in removed_ids:
+            by_id.pop(loc_id, None)
+        by_id.update((r[0], r) for r in changed_rows)
+        return RegionSnapshot(self.region, sorted(by_id.values()), version)
+
+
+_snapshots = OrderedDict()  # region -> RegionSnapshot (LRU 순서)
+_cache_lock = threading.Lock()
+_load_locks = {}
+_columns_ready = False
+
+
+def _connect():
+    global _columns_ready
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    if not _columns_ready:
+        ensure_location_columns(conn)  # region 컬럼이 없는 예전 DB 는 여기서 채움
+        _columns_ready = True
+    return conn
+
+
+def _load(region):
+    started = time.perf_counter()
+    conn = _connect()
+    try:
+        version = get_catalog_version(conn)
+        rows = conn.execute(f"SELECT {COLUMNS} FROM locations WHERE region = ? ORDER BY id", (region,)).fetchall()
+    finally:
+        conn.close()
+    snapshot = RegionSnapshot(region, rows, version)
+    print(f"🗺️ [지역 카탈로그] {region} {len(rows)}곳 로드 "
+          f"({snapshot.size_bytes / 1024 / 1024:.1f}MB, {(time.perf_counter() - started) * 1000:.0f}ms)")
+    return snapshot
+
+
+def _sync(snapshot):
+    """카탈로그 버전이 바뀌었으면 바뀐 id 만 다시 읽은 스냅샷 (변경 기록이 없으면 전체 재로드)"""
+    conn = _connect()
+    try:
+        version = get_catalog_version(conn)
+        if version == snapshot.version:
+            snapshot.checked_at = time.time()
+            return snapshot
+        changed = changed_ids_since(snapshot.version, conn)
+        ids = list(changed or ())
+        rows = []
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows += conn.execute(
+                f"SELECT {COLUMNS}, region FROM locations WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+    finally:
+        conn.close()
+    if changed is None:
+        return _load(snapshot.region)
+    keep = [r[:-1] for r in rows if r[-1] == snapshot.region]
+    print(f"🗺️ [지역 카탈로그] {snapshot.region} v{snapshot.version} -> v{version}: 바뀐 장소 {len(ids)}개 반영")
+    return snapshot.patched(keep, ids, version)
+
+
+def _store(region, snapshot):
+    with _cache_lock:
+        _snapshots[region] = snapshot
+        _snapshots.move_to_end(region)
+        total = sum(s.size_bytes for s in _snapshots.values())
+        while total > CACHE_MAX_BYTES and len(_snapshots) > 1:
+            evicted_region, evicted = _snapshots.popitem(last=False)
+            total -= evicted.size_bytes
+            print(f"🗺️ [지역 카탈로그] 메모리 한도로 {evicted_region} 스냅샷 내림")
+
+
+def get_region_snapshot(region):
+    with _cache_lock:
+        snapshot = _snapshots.get(region)
+        if snapshot is not None:
+            _snapshots.move_to_end(region)
+        load_lock = _load_locks.setdefault(region, threading.Lock())
+    now = time.time()
+    if snapshot is not None and now - snapshot.loaded_at < REFRESH_SEC and now - snapshot.checked_at < VERSION_CHECK_SEC:
+        return snapshot
+
+    with load_lock:  # 같은 지역을 여러 요청이 동시에 로드하지 않도록
+        with _cache_lock:
+            current = _snapshots.get(region)
+        if current is not None and current is not snapshot:
+            return current  # 기다리는 동안 다른 요청이 갱신함
+        if snapshot is None or now - snapshot.loaded_at >= REFRESH_SEC:
+            fresh = _load(region)
+        else:
+            fresh = _sync(snapshot)
+        if fresh is not snapshot:
+            _store(region, fresh)
+        return fresh
+
+
+def snapshot_for_area(target_area):
+    """
+    설문 target_area 또는 region 키 -> 검색할 스냅샷.
+    지역을 못 정하거나 카탈로그에 없는 지역이면 DEFAULT_REGION (그것도 비어 있으면 빈 스냅샷 그대로)
+    """
+    if target_area in REGIONS or target_area == OTHER_REGION:
+        region = target_area
+    else:
+        region = resolve_region(target_area) or DEFAULT_REGION
+    snapshot = get_region_snapshot(region)
+    if not snapshot.rows and DEFAULT_REGION and region != DEFAULT_REGION:
+        print(f"🗺️ [지역 카탈로그] {region} 은 아직 카탈로그에 없는 지역이라 {DEFAULT_REGION} 에서 검색")
+        snapshot = get_region_snapshot(DEFAULT_REGION)
+    return snapshot
+
+
+def region_near(lat, lng):
+    """좌표 -> 가장 가까운 카탈로그 장소의 region (근처에 장소가 없으면 대표 좌표 기준, 그래도 없으면 None)"""
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT region, lat, lng FROM locations WHERE region IS NOT NULL "
+            "AND lat BETWEEN ? AND ? AND lng BETWEEN ? AND ?",
+            (lat - NEAR_DEGREES, lat + NEAR_DEGREES, lng - NEAR_DEGREES, lng + NEAR_DEGREES),
+        ).fetchall()
+    finally:
+        conn.close()
+    if rows:
+        # 한국 위도에서는 경도 1도 ~ 위도 0.8도
+        return min(rows, key=lambda r: (r[1] - lat) ** 2 + ((r[2] - lng) * 0.8) ** 2)[0]
+    region = region_for("", lat, lng)
+    return None if region == OTHER_REGION else region
+
+
+def region_of_spots(spots):
+    """일정 spots -> 장소들의 저장된 locations.region 중 가장 많은 것 (location_id 가 없으면 첫 좌표로)"""
+    ids = []
+    for spot in spots:
+        try:
+            ids.append(int(spot["location_id"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    ids = ids[:500]  # SQLite 변수 개수 제한 (일정은 많아야 15곳)
+    if ids:
+        conn = _connect()
+        try:
+            regions = [r for (r,) in conn.execute(
+                f"SELECT region FROM locations WHERE id IN ({','.join('?' * len(ids))})", ids
+            ) if r]
+        finally:
+            conn.close()
+        if regions:
+            return Counter(regions).most_common(1)[0][0]
+    spot = next((s for s in spots if s.get("lat") is not None and s.get("lng") is not None), None)
+    return region_near(spot["lat"], spot["lng"]) if spot else None
+
+
+def cache_stats():
+    with _cache_lock:
+        return [{"region": region, "places": len(s.rows), "size_mb": round(s.size_bytes / 1024 / 1024, 2),
+                 "version": s.version, "loaded_at": s.loaded_at} for region, s in _snapshots.items()]
@@ -0,0 +1,248 @@
+# backend/app/shared_state.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# ==========================================
+# 0. Shared State for Multi-Worker Mode
+# ==========================================
+# gunicorn/uvicorn 워커를 여러 개 띄우면 모듈 전역 변수는 프로세스마다 따로 놉니다.
+# 캐시 / 카운터처럼 워커끼리 공유해야 하는 상태는 여기(로컬 파일 기반 SQLite)에 둡니다.
+#   - KTRIP_STATE_BACKEND=file   (기본값) 여러 워커가 같은 파일을 공유
+#   - KTRIP_STATE_BACKEND=memory 단일 프로세스 개발용
+# 같은 파일(STATE_DB_PATH, gitignore 됨)에 런타임 테이블도 둡니다: 저장된 일정 색인, 사진 작업 큐,
+# 메뉴 번역 메모리, 설문 통계/템플릿, 방문 통계. git 으로 배포되는 카탈로그(ktrip.db)는 장소 데이터만.
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATE_PATH = os.path.join(BACKEND_DIR, "ktrip_state.db")
+STATE_DB_PATH = os.getenv("KTRIP_STATE_PATH", DEFAULT_STATE_PATH)
+
+
+def connect_sqlite(path, timeout=30.0):
+    """
+    여러 프로세스가 동시에 쓰는 SQLite 연결.
+    WAL 모드라 읽기는 쓰기에 막히지 않고, 쓰기 충돌은 busy timeout 동안 기다립니다.
+    """
+    conn = sqlite3.connect(path, timeout=timeout)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def import_legacy_table(conn, table, legacy_path):
+    """
+    예전 버전이 카탈로그 DB(ktrip.db)에 만들던 런타임 테이블을 conn(상태 DB) 쪽으로 한 번 복사.
+    상태 DB 의 테이블이 비어 있을 때만, 같은 이름의 컬럼만 옮깁니다. 원본은 읽기만 함.
+    """
+    main_file = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+    if not os.path.exists(legacy_path) or os.path.realpath(main_file or "") == os.path.realpath(legacy_path):
+        return 0
+    if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+        return 0
+    conn.commit()
+    conn.execute("ATTACH DATABASE ? AS legacy", (legacy_path,))
+    try:
+        if not conn.execute("SELECT 1 FROM legacy.sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone():
+            return 0
+        legacy_columns = {row[1] for row in conn.execute(f"PRAGMA legacy.table_info({table})")}
+        columns = ", ".join(row[1] for row in conn.execute(f"PRAGMA main.table_info({table})") if row[1] in legacy_columns)
+        copied = conn.execute(
+            f"INSERT OR IGNORE INTO main.{table} ({columns}) SELECT {columns} FROM legacy.{table}"
+        ).rowcount
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE legacy")
+    if copied:
+        print(f"📦 [상태 DB] {os.path.basename(legacy_path)} 의 {table} {copied}건을 상태 DB 로 옮김")
+    return copied
+
+
+class FileStateStore:
+    """파일 기반 공유 캐시(TTL) + 원자적 카운터"""
+
+    def __init__(self, path=None):
+        self.path = path or STATE_DB_PATH
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kv_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL            -- NULL 이면 만료 없음
+            );
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = connect_sqlite(self.path)
+            self._local.conn = conn
+        return conn
+
+    # ---------- cache ----------
+    def get(self, key, default=None):
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            self.delete(key)
+            return default
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl else None
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv_cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+        conn.commit()
+
+    def add(self, key, value, ttl=None):
+        """키가 없거나 만료됐을 때만 저장 (한 문장이라 워커 간 경합 없음). 저장했으면 True -> lease 용"""
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute("""
+            INSERT INTO kv_cache (key, value, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+            WHERE kv_cache.expires_at IS NOT NULL AND kv_cache.expires_at < ?
+        """, (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None, now))
+        conn.commit()
+        return cur.rowcount == 1
+
+    def delete(self, key):
+        conn = self._conn()
+        conn.execute("DELETE FROM kv_cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def purge_expired(self):
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM kv_cache WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        conn.commit()
+        return cur.rowcount
+
+    # ---------- counters ----------
+    def incr(self, name, amount=1):
+        """증가 후 값을 같은 문장에서 돌려받으므로 워커 간 경합이 없습니다"""
+        conn = self._conn()
+        value = conn.execute("""
+            INSERT INTO counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+            RETURNING value
+        """, (name, amount)).fetchone()[0]
+        conn.commit()
+        return value
+
+    def get_count(self, name):
+        row = self._conn().execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+
+class MemoryStateStore:
+    """FileStateStore와 같은 인터페이스의 프로세스 내부 저장소 (워커 1개일 때만 사용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._counters = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._cache[key]
+                return default
+            return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._cache[key] = (json.dumps(value, ensure_ascii=False), time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            item = self._cache.get(key)
+            if item is not None and (item[1] is None or item[1] >= now):
+                return False
+            self._cache[key] = (json.dumps(value, ensure_ascii=False), now + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [k for k, (_, exp) in self._cache.items() if exp is not None and exp < now]
+            for k in expired:
+                del self._cache[k]
+        return len(expired)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            return self._counters[name]
+
+    def get_count(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store():
+    """프로세스당 하나의 공유 상태 저장소 (KTRIP_STATE_BACKEND 로 선택)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = os.getenv("KTRIP_STATE_BACKEND", "file").lower()
+                _store = MemoryStateStore() if backend == "memory" else FileStateStore()
+    return _store
+
+
+# ==========================================
+# 1. Per-Worker Startup Hooks
+# ==========================================
+# 워커 프로세스가 뜰 때마다(lifespan startup) 백그라운드에서 실행할 함수들.
+_startup_hooks = []
+
+
+def register_startup_hook(func):
+    """데코레이터로도 사용 가능: @register_startup_hook"""
+    _startup_hooks.append(func)
+    return func
+
+
+def run_startup_hooks(background=True):
+    """등록된 훅 실행. background=True 면 요청 처리를 막지 않도록 별도 스레드에서 실행"""
+    def run():
+        for hook in list(_startup_hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"⚠️ [startup] {getattr(hook, '__name__', hook)} 실패: {e}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="ktrip-startup-hooks", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,216 @@
+# backend/app/static_assets.py
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+from starlette.responses import Response
+
+# ==========================================
+# 0. Precompressed Static Frontend
+# ==========================================
+# frontend/ 폴더 파일을 서버 시작 시 한 번 읽어서
+#   - gzip / brotli 로 미리 압축해두고 Accept-Encoding 에 맞는 버전을 보내고
+#   - 내용 해시 기반 ETag 로 If-None-Match 가 같으면 304 (본문 없음)
+#   - CSS/JS/이미지는 /style.<hash>.css 같은 지문(fingerprint) URL 로도 제공 -> 1년 immutable 캐시
+#   - HTML 안의 로컬 CSS/JS 참조는 지문 URL 로 바꿔서 내려줍니다 (HTML 자체는 매번 재검증)
+# 로밍 데이터로 접속하는 여행자도 큰 HTML(photo.html 등)을 훨씬 작게 받습니다.
+# brotli 패키지가 없으면 gzip 만 사용합니다.
+
+try:
+    import brotli
+except ImportError:  # 선택 의존성
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 256
+FINGERPRINT_TYPES = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".woff", ".woff2")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"  # 캐시는 하되 매번 ETag 로 확인 (변경 없으면 304)
+
+# HTML 안의 href="style.css" / src="script.js" 같은 로컬 참조
+ASSET_REF_RE = re.compile(r'(\b(?:href|src)=")(?!https?:|//|data:|#)\.?/?([^"?#]+)(")')
+
+
+class StaticAsset:
+    def __init__(self, rel_path, content, mtime=None):
+        self.rel_path = rel_path
+        self.content_type = mimetypes.guess_type(rel_path)[0] or "application/octet-stream"
+        if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+            self.content_type += "; charset=utf-8"
+        self.mtime = mtime
+        self.set_content(content)
+
+    def set_content(self, content):
+        self.content = content
+        self.hash = hashlib.sha256(content).hexdigest()
+        self.etag = f'"{self.hash[:16]}"'
+        self.variants = {"identity": content}
+        if len(content) >= MIN_COMPRESS_SIZE and self.content_type.startswith(COMPRESSIBLE_TYPES):
+            gz = gzip.compress(content, compresslevel=9, mtime=0)
+            if len(gz) < len(content):
+                self.variants["gzip"] = gz
+            if brotli is not None:
+                br = brotli.compress(content, quality=11)
+                if len(br) < len(content):
+                    self.variants["br"] = br
+
+    @property
+    def fingerprinted_path(self):
+        root, ext = os.path.splitext(self.rel_path)
+        return f"{root}.{self.hash[:8]}{ext}"
+
+
+def _accepted_encodings(accept_encoding):
+    """Accept-Encoding 헤더 -> q>0 인 인코딩 집합"""
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        if name and q > 0:
+            accepted.add(name)
+    return accepted
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    base = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        # 압축 버전 ETag ("hash-br", "hash-gzip") 도 같은 내용으로 인정
+        if candidate == base or candidate.startswith(base + "-"):
+            return True
+    return False
+
+
+class StaticAssetStore:
+    def __init__(self, root, dev_reload=False):
+        self.root = root
+        self.dev_reload = dev_reload
+        self._lock = threading.Lock()
+        self.assets = {}        # rel_path -> StaticAsset
+        self.fingerprints = {}  # fingerprinted rel_path -> StaticAsset
+        self.build()
+
+    def build(self):
+        assets = {}
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    assets[rel_path] = StaticAsset(rel_path, f.read(), os.path.getmtime(full_path))
+
+        fingerprints = {a.fingerprinted_path: a for a in assets.values() if a.rel_path.endswith(FINGERPRINT_TYPES)}
+        for asset in assets.values():
+            if asset.rel_path.endswith(".html"):
+                asset.set_content(self._rewrite_html(asset.content, assets))
+
+        with self._lock:
+            self.assets = assets
+            self.fingerprints = fingerprints
+        total = sum(len(a.content) for a in assets.values())
+        packed = sum(len(a.variants.get("br", a.variants.get("gzip", a.content))) for a in assets.values())
+        print(f"📦 정적 파일 {len(assets)}개 준비 ({total / 1024:.0f}KB -> 압축 {packed / 1024:.0f}KB)")
+
+    def _rewrite_html(self, content, assets):
+        def replace(match):
+            target = assets.get(match.group(2))
+            if target is None or not target.rel_path.endswith(FINGERPRINT_TYPES):
+                return match.group(0)
+            return f"{match.group(1)}/{target.fingerprinted_path}{match.group(3)}"
+        return ASSET_REF_RE.sub(replace, content.decode("utf-8")).encode("utf-8")
+
+    def _maybe_reload(self, asset):
+        # 개발 모드: 파일이 바뀌었으면 전체 재빌드 (지문/HTML 참조가 같이 바뀌어야 하므로)
+        full_path = os.path.join(self.root, asset.rel_path)
+        try:
+            if os.path.getmtime(full_path) != asset.mtime:
+                self.build()
+        except OSError:
+            self.build()
+
+    def lookup(self, rel_path):
+        """(asset, 지문 URL 여부) 또는 (None, False)"""
+        rel_path = rel_path.lstrip("/")
+        asset = self.assets.get(rel_path)
+        if asset is not None:
+            if self.dev_reload:
+                self._maybe_reload(asset)
+                asset = self.assets.get(rel_path, asset)
+            return asset, False
+        asset = self.fingerprints.get(rel_path)
+        if asset is not None:
+            return asset, True
+        return None, False
+
+    def asset_url(self, rel_path):
+        asset = self.assets.get(rel_path.lstrip("/"))
+        if asset is None or not asset.rel_path.endswith(FINGERPRINT_TYPES):
+            return "/" + rel_path.lstrip("/")
+        return "/" + asset.fingerprinted_path
+
+    def response(self, request, rel_path):
+        asset, immutable = self.lookup(rel_path)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+
+        encoding = "identity"
+        if len(asset.variants) > 1:
+            accepted = _accepted_encodings(request.headers.get("accept-encoding"))
+            for candidate in ("br", "gzip"):
+                if candidate in accepted and candidate in asset.variants:
+                    encoding = candidate
+                    break
+
+        etag = asset.etag if encoding == "identity" else f'"{asset.hash[:16]}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE,
+        }
+        if len(asset.variants) > 1:
+            headers["Vary"] = "Accept-Encoding"
+
+        if _etag_matches(request.headers.get("if-none-match"), asset.etag):
+            return Response(status_code=304, headers=headers)
+
+        body = asset.variants[encoding]
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=asset.content_type)
+        return Response(body, headers=headers, media_type=asset.content_type)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_asset_store(root):
+    """첫 요청(또는 startup 훅)에서 한 번만 빌드"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                dev_reload = os.getenv("KTRIP_STATIC_DEV", "0").lower() in ("1", "true", "on", "yes")
+                _store = StaticAssetStore(root, dev_reload=dev_reload)
+    return _store
@@ -0,0 +1,255 @@
+# backend/app/upstream.py
+
+import os
+import random
+import threading
+import time
+
+# ==========================================
+# 0. Upstream Scheduler (Azure OpenAI / Document Intelligence)
+# ==========================================
+# 트래픽이 몰릴 때 모든 요청이 곧바로 Azure를 두드리면 429(rate limit)가 나고,
+# 사용자가 재시도하면서 상황이 더 나빠집니다. 모든 LLM/OCR 호출은 여기를 거칩니다.
+#   - 엔드포인트별 동시 호출 수 제한 (429를 받으면 줄이고, 성공하면 천천히 늘림)
+#   - 분당 토큰 예산 (프롬프트 길이로 추정)
+#   - 대기열 길이 / 대기 시간 제한 -> 넘치면 바로 UpstreamOverloaded (API는 503)
+#   - Retry-After 를 존중하는 지터 백오프 재시도
+# 동시 호출 수 / 분당 토큰 한도(KTRIP_OPENAI_CONCURRENCY, KTRIP_OPENAI_TPM, KTRIP_DOC_CONCURRENCY)는
+# 배포 전체(Azure 리소스 하나) 기준입니다. 리미터는 워커 프로세스마다 따로 있으므로
+# WEB_CONCURRENCY (gunicorn.conf.py 가 워커 수로 채움) 로 나눈 값을 워커별 한도로 씁니다.
+# 워커 수가 동시 호출 한도보다 많으면 워커마다 최소 1개라서 합계가 한도를 넘을 수 있습니다.
+
+
+class UpstreamOverloaded(Exception):
+    """대기열이 가득 찼거나 대기 시간이 초과됨 -> 클라이언트에게 503 + Retry-After"""
+
+    def __init__(self, name, reason, retry_after=5):
+        super().__init__(f"{name} upstream overloaded: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 (영문 ~4글자당 1토큰, 한글은 글자당 ~1토큰)"""
+    text = str(text or "")
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def estimate_messages_tokens(messages, max_output_tokens=1000):
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in messages) + max_output_tokens
+
+
+def _retry_info(exc):
+    """(재시도 가능 여부, Retry-After 초) - openai / azure-core 예외 모두 처리"""
+    status = getattr(exc, "status_code", None)
+    response = getattr(exc, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None)
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers:
+        for header in ("retry-after-ms", "retry-after", "x-ms-retry-after-ms"):
+            value = headers.get(header)
+            if not value:
+                continue
+            try:
+                retry_after = float(value) / (1000 if header.endswith("-ms") else 1)
+                break
+            except (TypeError, ValueError):
+                continue
+
+    if status is not None:
+        return (status == 429 or status == 408 or status >= 500), retry_after, status
+    # 상태 코드가 없는 네트워크 계열 에러 (APIConnectionError, APITimeoutError, ServiceRequestError ...)
+    name = type(exc).__name__
+    retryable = any(word in name for word in ("Timeout", "Connection", "ServiceRequest", "ServiceResponse"))
+    return retryable, retry_after, None
+
+
+class UpstreamLimiter:
+    """엔드포인트 하나에 대한 적응형 동시성 제한 + 토큰 예산 + 대기열"""
+
+    def __init__(self, name, max_concurrency=8, tokens_per_minute=0, max_queue=32,
+                 queue_timeout=15.0, max_retries=3, backoff_base=0.5, backoff_max=20.0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.tokens_per_minute = tokens_per_minute  # 0 이면 토큰 예산 없음
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._cond = threading.Condition()
+        self._limit = float(self.max_concurrency)  # AIMD 로 조절되는 현재 동시성 한도
+        self._in_flight = 0
+        self._waiting = 0
+        self._tokens = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0  # 429 Retry-After 동안 새 호출을 멈춤
+        self.stats = {"calls": 0, "retries": 0, "rejected": 0, "rate_limited": 0}
+
+    # ---------- token bucket ----------
+    def _refill(self, now):
+        if not self.tokens_per_minute:
+            return
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        self._tokens = min(float(self.tokens_per_minute), self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def _wait_needed(self, tokens, now):
+        """지금 바로 출발할 수 없으면 기다려야 할 시간(초), 가능하면 0"""
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return None  # 다른 호출이 끝나면 notify 로 깨어남
+        if self.tokens_per_minute and self._tokens < tokens:
+            return (tokens - self._tokens) * 60.0 / self.tokens_per_minute
+        return 0
+
+    def _acquire(self, tokens):
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)  # 한 번에 예산 전체보다 클 수는 없음
+        deadline = time.monotonic() + self.queue_timeout
+        with self._cond:
+            if self._waiting >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise UpstreamOverloaded(self.name, "queue full", retry_after=self._suggest_retry_after())
+            self._waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_needed(tokens, now)
+                    if wait == 0:
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.stats["rejected"] += 1
+                        raise UpstreamOverloaded(self.name, "queue timeout", retry_after=self._suggest_retry_after())
+                    self._cond.wait(min(remaining, wait) if wait is not None else remaining)
+                self._in_flight += 1
+                self.stats["calls"] += 1
+                if self.tokens_per_minute:
+                    self._tokens -= tokens
+            finally:
+                self._waiting -= 1
+
+    def _release(self, rate_limited=False, retry_after=None):
+        with self._cond:
+            self._in_flight -= 1
+            if rate_limited:
+                # multiplicative decrease + Retry-After 동안 신규 호출 중지
+                self.stats["rate_limited"] += 1
+                self._limit = max(1.0, self._limit / 2)
+                if retry_after:
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            else:
+                # additive increase
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / max(self._limit, 1.0))
+            self._cond.notify_all()
+
+    def _suggest_retry_after(self):
+        return max(1, int(self._paused_until - time.monotonic()) + 1, int(self.queue_timeout // 3))
+
+    def _backoff(self, attempt, retry_after):
+        if retry_after:
+            return min(self.backoff_max, retry_after + random.uniform(0, self.backoff_base))
+        # full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    # ---------- public ----------
+    def call(self, func, *args, estimated_tokens=0, **kwargs):
+        """슬롯을 얻은 뒤 func 실행. 재시도 가능한 에러면 백오프 후 다시 대기열로"""
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)  # calls 카운터도 여기서 (락 안에서) 증가
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                retryable, retry_after, status = _retry_info(e)
+                self._release(rate_limited=(status == 429), retry_after=retry_after)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, retry_after)
+                attempt += 1
+                with self._cond:
+                    self.stats["retries"] += 1
+                print(f"🔁 [{self.name}] {type(e).__name__}({status}) -> {delay:.1f}s 후 재시도 ({attempt}/{self.max_retries})")
+                time.sleep(delay)
+                continue
+            self._release()
+            return result
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "name": self.name,
+                "workers": WORKER_COUNT,
+                "limit": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "tokens": int(self._tokens) if self.tokens_per_minute else None,
+                **self.stats,
+            }
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+WORKER_COUNT = max(1, _env_int("WEB_CONCURRENCY", 1))
+
+
+def _per_worker(total):
+    """배포 전체 한도 -> 이 워커의 몫 (0 은 '제한 없음' 이므로 그대로)"""
+    return max(1, total // WORKER_COUNT) if total > 0 else total
+
+
+_limiters = {
+    "openai": UpstreamLimiter(
+        "openai",
+        max_concurrency=_per_worker(_env_int("KTRIP_OPENAI_CONCURRENCY", 8)),
+        tokens_per_minute=_per_worker(_env_int("KTRIP_OPENAI_TPM", 200000)),
+        max_queue=_env_int("KTRIP_OPENAI_QUEUE", 32),
+        queue_timeout=float(os.getenv("KTRIP_UPSTREAM_QUEUE_TIMEOUT", "15")),
+        max_retries=_env_int("KTRIP_UPSTREAM_RETRIES", 3),
+    ),
+    "document": UpstreamLimiter(
+        "document",
+        max_concurrency=_per_worker(_env_int("KTRIP_DOC_CONCURRENCY", 4)),
+        max_queue=_env_int("KTRIP_DOC_QUEUE", 16),
+        queue_timeout=float(os.getenv("KTRIP_UPSTREAM_QUEUE_TIMEOUT", "15")),
+        max_retries=_env_int("KTRIP_UPSTREAM_RETRIES", 3),
+    ),
+}
+
+
+def get_limiter(name):
+    return _limiters[name]
+
+
+def upstream_status():
+    return {name: limiter.snapshot() for name, limiter in _limiters.items()}
+
+
+# ==========================================
+# 1. Wrapped Upstream Calls
+# ==========================================
+def chat_completion(client, max_output_tokens=1000, **kwargs):
+    """client.chat.completions.create 를 스케줄러를 거쳐 호출"""
+    tokens = estimate_messages_tokens(kwargs.get("messages", []), max_output_tokens)
+    return _limiters["openai"].call(client.chat.completions.create, estimated_tokens=tokens, **kwargs)
+
+
+def analyze_document(client, model_id, body, **kwargs):
+    """Document Intelligence 분석 (poller.result() 까지 하나의 슬롯에서 실행)"""
+    def run():
+        return client.begin_analyze_document(model_id, body=body, **kwargs).result()
+    return _limiters["document"].call(run)
@@ -0,0 +1,270 @@
+# backend/app/visit_analytics.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from .catalog import DB_PATH
+from .shared_state import STATE_DB_PATH, connect_sqlite, get_shared_store, import_legacy_table
+
+# ==========================================
+# 0. Visit Analytics (event log + rollups)
+# ==========================================
+# visited_spots 는 장소별 누적 카운터 하나뿐이라 "요즘 뜨는 곳"을 알 수 없습니다.
+#   - 방문(check-in)은 메모리 버퍼에 넣고 바로 응답 -> 백그라운드 스레드가 모아서 한 트랜잭션으로
+#     visit_events 에 쓰고 visit_hourly 집계를 증분 갱신 (상태 DB, ktrip_state.db)
+#   - 두 테이블 모두 TRENDING_WINDOW_HOURS 보다 오래된 행은 PRUNE_INTERVAL_SEC 마다 지움 (파일이 계속 커지지 않도록)
+#   - 최근 시간대 집계로 시간 감쇠 점수를 계산해 상위 N개를 공유 저장소에 스냅샷 -> trending 조회는 O(1)
+#   - 스냅샷은 TRENDING_MAX_AGE_SEC 가 지나면 만료 -> 방문이 끊겨도 오래된 순위가 남지 않음
+#   - calculate_relevance_score 는 메모리에 캐시한 스냅샷으로 뜨는 장소에 가산점 (trending_boost)
+# 프로세스가 죽으면 버퍼에 있던 최대 KTRIP_VISIT_FLUSH_SEC 만큼의 방문은 유실될 수 있습니다.
+#
+#   python bench_visit_analytics.py --events 10000000     (처리량 벤치마크)
+
+FLUSH_INTERVAL_SEC = float(os.getenv("KTRIP_VISIT_FLUSH_SEC", "1.0"))
+MAX_BUFFER = int(os.getenv("KTRIP_VISIT_MAX_BUFFER", "5000"))    # 이만큼 쌓이면 기다리지 않고 flush
+TRENDING_WINDOW_HOURS = 24
+TRENDING_HALF_LIFE_HOURS = 6.0
+TRENDING_SIZE = 50
+TRENDING_REFRESH_SEC = float(os.getenv("KTRIP_TRENDING_REFRESH_SEC", "60"))
+TRENDING_KEY = "visit_trending"
+TRENDING_MAX_AGE_SEC = 2 * TRENDING_REFRESH_SEC  # 이보다 오래된 스냅샷은 버림 (갱신 스레드가 멈춘 경우)
+MAX_TRENDING_BOOST = 3.0  # calculate_relevance_score 에 더해지는 최대 점수 (미디어 매칭 5점보다 작게)
+PRUNE_INTERVAL_SEC = 3600
+
+
+def place_key(place_name, location_id=None):
+    """카탈로그 id 가 있으면 id 로, 없으면 이름으로 집계"""
+    return str(int(location_id)) if location_id else f"name:{str(place_name or '').strip()}"
+
+
+def ensure_tables(conn):
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS visit_events (
+            id INTEGER PRIMARY KEY,
+            place_key TEXT NOT NULL,
+            place_name TEXT,
+            ts REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_visit_events_ts ON visit_events (ts);
+        CREATE TABLE IF NOT EXISTS visit_hourly (
+            hour INTEGER NOT NULL,        -- unix time // 3600
+            place_key TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (hour, place_key)
+        ) WITHOUT ROWID;
+    """)
+    conn.commit()
+
+
+class VisitRecorder:
+    def __init__(self, db_path=STATE_DB_PATH, flush_interval=FLUSH_INTERVAL_SEC, max_buffer=MAX_BUFFER, background=True,
+                 catalog_path=DB_PATH):
+        self.db_path = db_path
+        self.catalog_path = catalog_path  # 장소 id -> 이름 조회용 (읽기 전용)
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.background = background
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._last_trending = 0.0
+        self._last_prune = 0.0
+        conn = connect_sqlite(self.db_path)
+        try:
+            ensure_tables(conn)
+            import_legacy_table(conn, "visit_hourly", self.catalog_path)  # 예전 ktrip.db 의 집계 (오래된 행은 prune)
+        finally:
+            conn.close()
+
+    # ---------- 기록 ----------
+    def record(self, place_name, location_id=None, ts=None):
+        """요청 경로에서 호출: 버퍼에 추가만 하고 바로 반환"""
+        with self._lock:
+            self._buffer.append((place_key(place_name, location_id), place_name, ts or time.time()))
+            full = len(self._buffer) >= self.max_buffer
+        if self.background:
+            self._ensure_thread()
+            if full:
+                self._wakeup.set()
+        elif full:
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="visit-flush", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ [방문 통계] flush 실패: {e}")
+
+    def flush(self, refresh=True):
+        """버퍼 -> events + hourly 집계 (한 트랜잭션). 반환: 기록한 방문 수"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if batch:
+                hourly = Counter((int(ts // 3600), key) for key, _, ts in batch)
+                conn = connect_sqlite(self.db_path)
+                try:
+                    with conn:
+                        conn.executemany("INSERT INTO visit_events (place_key, place_name, ts) VALUES (?, ?, ?)", batch)
+                        conn.executemany("""
+                            INSERT INTO visit_hourly (hour, place_key, count) VALUES (?, ?, ?)
+                            ON CONFLICT(hour, place_key) DO UPDATE SET count = count + excluded.count
+                        """, [(h, k, c) for (h, k), c in hourly.items()])
+                finally:
+                    conn.close()
+            if time.time() - self._last_prune >= PRUNE_INTERVAL_SEC:
+                self.prune()
+            if refresh and time.time() - self._last_trending >= TRENDING_REFRESH_SEC:
+                self.refresh_trending()
+            return len(batch)
+
+    def prune(self, now=None):
+        """TRENDING_WINDOW_HOURS 보다 오래된 방문 기록/집계 삭제. 반환: (events, hourly) 삭제 행 수"""
+        now = now or time.time()
+        self._last_prune = time.time()
+        conn = connect_sqlite(self.db_path)
+        try:
+            with conn:
+                events = conn.execute(
+                    "DELETE FROM visit_events WHERE ts < ?", (now - TRENDING_WINDOW_HOURS * 3600,)
+                ).rowcount
+                hourly = conn.execute(
+                    "DELETE FROM visit_hourly WHERE hour <= ?", (int(now // 3600) - TRENDING_WINDOW_HOURS,)
+                ).rowcount
+        finally:
+            conn.close()
+        if events or hourly:
+            print(f"🧹 [방문 통계] 오래된 방문 {events}건 / 시간별 집계 {hourly}건 정리")
+        return events, hourly
+
+    # ---------- trending ----------
+    def compute_trending(self, now=None, size=TRENDING_SIZE):
+        """최근 TRENDING_WINDOW_HOURS 시간 집계 -> 시간 감쇠 점수 상위 size 개"""
+        now = now or time.time()
+        current_hour = int(now // 3600)
+        conn = connect_sqlite(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT hour, place_key, count FROM visit_hourly WHERE hour > ?",
+                (current_hour - TRENDING_WINDOW_HOURS,),
+            ).fetchall()
+            scores, totals = Counter(), Counter()
+            for hour, key, count in rows:
+                age = max(0, current_hour - hour)
+                scores[key] += count * 0.5 ** (age / TRENDING_HALF_LIFE_HOURS)
+                totals[key] += count
+            top = scores.most_common(size)
+        finally:
+            conn.close()
+
+        # 카탈로그 id -> 한글 장소명 (calculate_relevance_score 가 이름으로 비교하므로)
+        ids = [int(k) for k, _ in top if k.isdigit()]
+        names = {}
+        if ids:
+            conn = sqlite3.connect(self.catalog_path, timeout=30)
+            try:
+                names = dict(conn.execute(
+                    f"SELECT id, name FROM locations WHERE id IN ({','.join('?' * len(ids))})", ids
+                ).fetchall())
+            except sqlite3.OperationalError:
+                pass  # 벤치마크용 DB 등 locations 테이블이 없는 경우
+            finally:
+                conn.close()
+
+        items = []
+        for key, score in top:
+            is_id = key.isdigit()
+            items.append({
+                "place_key": key,
+                "location_id": int(key) if is_id else None,
+                "name": names.get(int(key)) if is_id else key[len("name:"):],
+                "score": round(score, 3),
+                "visits_24h": totals[key],
+            })
+        return items
+
+    def refresh_trending(self, now=None):
+        items = self.compute_trending(now)
+        self._last_trending = time.time()
+        get_shared_store().set(TRENDING_KEY, {"generated_at": self._last_trending, "items": items},
+                               ttl=TRENDING_MAX_AGE_SEC)
+        return items
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+
+def get_visit_recorder():
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = VisitRecorder()
+    return _recorder
+
+
+def record_visit(place_name, location_id=None):
+    get_visit_recorder().record(place_name, location_id)
+
+
+def start_visit_refresher():
+    """워커 시작 시 flush/trending 갱신 스레드를 바로 띄움 (첫 방문 기록을 기다리지 않음)"""
+    recorder = get_visit_recorder()
+    if recorder.background:
+        recorder._ensure_thread()
+
+
+def flush_visits():
+    if _recorder is not None:
+        _recorder.flush()
+
+
+def trending_now(k=10):
+    """미리 계산해둔 스냅샷에서 상위 k 개 (스냅샷이 없거나 오래됐으면 한 번 계산)"""
+    snapshot = get_shared_store().get(TRENDING_KEY)
+    if snapshot is None or time.time() - snapshot.get("generated_at", 0) >= TRENDING_MAX_AGE_SEC:
+        items = get_visit_recorder().refresh_trending()
+    else:
+        items = snapshot["items"]
+    return items[:k]
+
+
+# ---------- calculate_relevance_score 가산점 ----------
+_boost_cache = {"loaded_at": 0.0, "boosts": {}}
+_boost_lock = threading.Lock()
+
+
+def trending_boost(name):
+    """장소명 -> 0 ~ MAX_TRENDING_BOOST. 스냅샷은 TRENDING_REFRESH_SEC 마다 한 번만 다시 읽음"""
+    if time.time() - _boost_cache["loaded_at"] >= TRENDING_REFRESH_SEC:
+        with _boost_lock:
+            if time.time() - _boost_cache["loaded_at"] >= TRENDING_REFRESH_SEC:
+                boosts = {}
+                try:
+                    snapshot = get_shared_store().get(TRENDING_KEY) or {}
+                    items = snapshot.get("items") or []
+                    top_score = items[0]["score"] if items else 0
+                    for item in items:
+                        if item["name"] and top_score:
+                            boosts[item["name"]] = MAX_TRENDING_BOOST * item["score"] / top_score
+                except Exception as e:
+                    print(f"⚠️ [방문 통계] trending 스냅샷 로드 실패: {e}")
+                _boost_cache["boosts"] = boosts
+                _boost_cache["loaded_at"] = time.time()
+    return _boost_cache["boosts"].get(name, 0.0)
@@ -0,0 +1,120 @@
+# backend/bench_json.py
+# JSON 직렬화(app/fast_json.py) + 응답 압축(app/compression.py) 마이크로 벤치마크.
+# ktrip.db 의 실제 장소로 15곳짜리 일정(긴 팁 포함)과 메뉴 번역 결과를 만들어
+#   - 표준 json vs orjson 의 dumps / loads 시간
+#   - 원본 / gzip / brotli 크기와 압축 시간
+# 을 출력합니다. ktrip.db 는 읽기 전용으로 엽니다.
+#
+#   python backend/bench_json.py --spots 15 --foods 40 --repeat 2000
+import argparse
+import gzip
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+
+from app.compression import BROTLI_QUALITY, GZIP_LEVEL  # noqa: E402
+from app.static_assets import brotli  # noqa: E402
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROLES = ["Lunch", "Tour", "Cafe", "Tour", "Dinner"]
+TIP_SENTENCES = [
+    "Arrive before 11am on weekends to skip the queue that forms around lunchtime.",
+    "The scene from episode 4 was filmed by the window seats on the second floor.",
+    "Card payments are accepted, but some stalls nearby only take cash or Korean transfer apps.",
+    "Take exit 3 from the subway station and walk about five minutes uphill.",
+    "Staff speak basic English and there is a picture menu at the counter.",
+    "Golden hour light hits the front steps around 6pm, which is the best time for photos.",
+]
+
+
+def sample_itinerary(spot_count, rng):
+    conn = sqlite3.connect(f"file:{os.path.join(BACKEND_DIR, 'ktrip.db')}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT id, name, description, lat, lng, media_title FROM locations ORDER BY RANDOM() LIMIT ?",
+            (spot_count,),
+        ).fetchall()
+    finally:
+        conn.close()
+    spots = []
+    for i, (loc_id, name, description, lat, lng, media_title) in enumerate(rows):
+        spots.append({
+            "name": f"{name}({ROLES[i % len(ROLES)]})",
+            "description": (description or "")[:150],
+            "lat": lat,
+            "lng": lng,
+            "media_title": media_title or "",
+            "location_id": loc_id,
+            "tips": " ".join(rng.sample(TIP_SENTENCES, 4)),
+        })
+    return {"spots": spots, "session_id": "0" * 32}
+
+
+def sample_menu(food_count, rng):
+    foods = []
+    for i in range(food_count):
+        foods.append({
+            "korean": f"김치찌개 {i}",
+            "english": "Kimchi Stew with Pork and Tofu",
+            "description": "A spicy, tangy stew of aged kimchi, pork belly and soft tofu, served bubbling hot with rice.",
+            "spicy_level": rng.randint(0, 3),
+            "price": f"{rng.randint(8, 30) * 1000:,}원",
+        })
+    return {"foods": foods}
+
+
+def timeit(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6  # us/회
+
+
+def bench(label, payload, repeat):
+    print(f"\n📊 {label}")
+    std_dumps = lambda: json.dumps(payload, ensure_ascii=False).encode("utf-8")  # noqa: E731
+    body = std_dumps()
+    print(f"   dumps  json   {timeit(std_dumps, repeat):8.1f}us")
+    print(f"   loads  json   {timeit(lambda: json.loads(body), repeat):8.1f}us")
+    if orjson is not None:
+        print(f"   dumps  orjson {timeit(lambda: orjson.dumps(payload), repeat):8.1f}us")
+        print(f"   loads  orjson {timeit(lambda: orjson.loads(body), repeat):8.1f}us")
+    else:
+        print("   (orjson 미설치 - 표준 json 만 측정)")
+
+    pretty = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+    gz = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    gz_us = timeit(lambda: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), max(1, repeat // 10))
+    print(f"   size   indent=2 {len(pretty):>7,}B  compact {len(body):>7,}B")
+    print(f"          gzip-{GZIP_LEVEL}   {len(gz):>7,}B ({len(gz) / len(body):.0%}, {gz_us:.0f}us)")
+    if brotli is not None:
+        br = brotli.compress(body, quality=BROTLI_QUALITY)
+        br_us = timeit(lambda: brotli.compress(body, quality=BROTLI_QUALITY), max(1, repeat // 10))
+        print(f"          br-{BROTLI_QUALITY}     {len(br):>7,}B ({len(br) / len(body):.0%}, {br_us:.0f}us)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--spots", type=int, default=15)
+    parser.add_argument("--foods", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bench(f"일정 ({args.spots}곳, 팁 포함)", sample_itinerary(args.spots, rng), args.repeat)
+    bench(f"메뉴 번역 ({args.foods}개)", sample_menu(args.foods, rng), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# backend/bench_visit_analytics.py
+# 방문 통계(app/visit_analytics.py) 처리량 벤치마크.
+# 임시 SQLite 파일에 합성 방문 이벤트를 기록하고 (record -> 배치 flush -> 시간별 집계 갱신)
+# 초당 처리 건수, trending 계산/조회 시간, 보존 기간 정리(prune) 시간을 출력합니다. ktrip.db 는 건드리지 않습니다.
+#
+#   python backend/bench_visit_analytics.py --events 10000000 --places 7000 --days 30
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BACKEND_DIR)
+os.environ.setdefault("KTRIP_STATE_BACKEND", "memory")  # trending 스냅샷은 프로세스 메모리에
+
+from app.visit_analytics import VisitRecorder, trending_now  # noqa: E402
+import app.visit_analytics as visit_analytics  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000_000)
+    parser.add_argument("--places", type=int, default=7000)
+    parser.add_argument("--days", type=int, default=30, help="이벤트 시각을 최근 며칠에 분산")
+    parser.add_argument("--batch", type=int, default=50_000, help="flush 한 번에 쓰는 이벤트 수")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # 인기 장소에 방문이 몰리도록 zipf 비슷한 가중치
+    weights = [1.0 / (rank + 1) ** 1.1 for rank in range(args.places)]
+    place_ids = list(range(1, args.places + 1))
+    now = time.time()
+    span = args.days * 86400
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        recorder = VisitRecorder(db_path=db_path, max_buffer=args.batch, background=False)
+        recorder._last_trending = float("inf")  # 벤치마크 중에는 trending 갱신 / 정리 생략 (마지막에 따로 측정)
+        recorder._last_prune = float("inf")
+        visit_analytics._recorder = recorder
+
+        record_time = 0.0
+        started = time.perf_counter()
+        done = 0
+        while done < args.events:
+            n = min(args.batch, args.events - done)
+            ids = rng.choices(place_ids, weights=weights, k=n)
+            stamps = [now - span * rng.random() ** 3 for _ in range(n)]  # 최근일수록 많이
+            t0 = time.perf_counter()
+            for loc_id, ts in zip(ids, stamps):
+                recorder.record(None, loc_id, ts)
+            recorder.flush(refresh=False)
+            record_time += time.perf_counter() - t0
+            done += n
+            if done % (args.batch * 20) == 0 or done == args.events:
+                print(f"  {done:>11,} events  {done / record_time:,.0f} events/s (기록+집계)")
+        total = time.perf_counter() - started
+
+        t0 = time.perf_counter()
+        recorder.refresh_trending(now)
+        refresh_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            top = trending_now(10)
+        query_us = (time.perf_counter() - t0) * 1000
+
+        size_mb = os.path.getsize(db_path) / 1024 / 1024
+        t0 = time.perf_counter()
+        pruned_events, pruned_hourly = recorder.prune(now)
+        prune_ms = (time.perf_counter() - t0) * 1000
+        print(f"✅ {args.events:,} events in {total:.1f}s (생성 포함) -> 기록+집계 {args.events / record_time:,.0f} events/s")
+        print(f"   trending 재계산 {refresh_ms:.1f}ms, trending 조회 {query_us:.1f}us/회, DB {size_mb:.0f}MB")
+        print(f"   정리 {prune_ms:.0f}ms (방문 {pruned_events:,}건, 시간별 집계 {pruned_hourly:,}건 삭제)")
+        print(f"   top3: {[(t['place_key'], t['visits_24h']) for t in top[:3]]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# backend/check_import_time.py
+# `python -X importtime` 으로 main.py 의 import 비용을 측정하고 예산을 넘으면 실패(exit 1)합니다.
+# 사용법: python backend/check_import_time.py [--budget-ms 1000]
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 콜드 스타트 때 절대 올라오면 안 되는 무거운 SDK (첫 사용 시 app/clients.py 에서 로드)
+LAZY_MODULES = ("openai", "azure.storage.blob", "azure.ai.documentintelligence")
+
+
+def measure(module="main"):
+    """모듈별 누적 import 시간(us) 딕셔너리 반환"""
+    env = dict(os.environ, KTRIP_WARMUP="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 실패:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line.split("|")
+            timings[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # 헤더 줄
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("KTRIP_IMPORT_BUDGET_MS", "1000")))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    best_ms, best_timings = None, {}
+    for _ in range(args.runs):
+        timings = measure()
+        eager = sorted(m for m in timings if any(m == lazy or m.startswith(lazy + ".") for lazy in LAZY_MODULES))
+        if eager:
+            print(f"❌ 지연 로딩 대상 SDK가 import 시점에 로드됨: {', '.join(eager[:5])}")
+            sys.exit(1)
+        total_ms = timings.get("main", 0) / 1000
+        if best_ms is None or total_ms < best_ms:
+            best_ms, best_timings = total_ms, timings
+
+    slowest = sorted(((us, m) for m, us in best_timings.items() if "." not in m and m != "main"), reverse=True)[:5]
+    print(f"⏱️ import main: {best_ms:.0f}ms (예산 {args.budget_ms:.0f}ms)")
+    for us, m in slowest:
+        print(f"   - {m}: {us / 1000:.0f}ms")
+
+    if best_ms > args.budget_ms:
+        print("❌ import-time 예산 초과")
+        sys.exit(1)
+    print("✅ import-time 예산 통과")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# backend/gunicorn.conf.py
+# 멀티 워커 배포용 gunicorn 설정 (uvicorn 워커 사용)
+#
+#   실행:  gunicorn -c backend/gunicorn.conf.py
+#   App Service 시작 명령도 위와 동일하게 지정하면 됩니다.
+#
+# 워커끼리 공유해야 하는 상태(캐시/카운터)는 app/shared_state.py 의 파일 기반 저장소를 쓰고,
+# 방문 카운트는 ktrip.db 에, 런타임 데이터는 ktrip_state.db 에 원자적으로 기록되므로 워커 수를 늘려도 안전합니다.
+import multiprocessing
+import os
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+chdir = BACKEND_DIR
+wsgi_app = "main:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+
+bind = os.getenv("KTRIP_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# WEB_CONCURRENCY 가 없으면 코어 수만큼 (Azure OpenAI 호출은 대부분 I/O 대기)
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# 워커들이 물려받는 환경 변수: app/upstream.py 가 Azure 호출 한도를 워커 수로 나눠 씀
+os.environ["WEB_CONCURRENCY"] = str(workers)
+timeout = int(os.getenv("KTRIP_WORKER_TIMEOUT", "120"))  # LLM 호출이 길어질 수 있음
+graceful_timeout = 30
+keepalive = 5
+
+# 워커마다 main.py 를 따로 import (preload 하면 SDK 클라이언트/SQLite 연결이 fork 로 공유됨)
+preload_app = False
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    # 워커별 warm-up 은 main.py 의 lifespan -> app.shared_state.run_startup_hooks 에서 실행됩니다.
+    worker.log.info(f"👷 워커 준비 완료 (pid={worker.pid})")
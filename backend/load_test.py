@@ -0,0 +1,160 @@
+# backend/load_test.py
+# 워커 수에 따라 처리량(req/s)이 늘어나는지 확인하는 부하 테스트.
+# gunicorn.conf.py 로 서버를 워커 수별로 띄우고, 같은 부하를 걸어 결과를 비교합니다.
+#
+#   python backend/load_test.py --workers 1 2 4 --concurrency 32 --duration 10
+#   python backend/load_test.py --tool wrk      (wrk / hey 가 설치돼 있으면 그것으로 부하)
+#
+# 부하는 서버와 별도의 프로세스 여러 개(--load-procs)에서 겁니다. 한 프로세스의 스레드만으로는
+# GIL 때문에 클라이언트가 먼저 한계에 걸려 워커를 늘려도 처리량이 그대로로 보일 수 있습니다.
+# 가장 작은 워커 수 대비 가장 큰 워커 수의 배율이 --min-speedup 보다 낮으면 종료 코드 1 (CI 게이트용, 0 이면 끔).
+# 멀티 코어 머신에서 실행해야 의미가 있습니다 (코어 1개면 워커를 늘려도 처리량은 그대로).
+import argparse
+import http.client
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def wait_until_ready(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", "/api/config")
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.3)
+    return False
+
+
+def _load_proc(host, port, path, concurrency, duration):
+    """부하 프로세스 하나: duration 초 동안 concurrency 개의 keep-alive 클라이언트로 요청 -> (성공, 에러)"""
+    counts = [0] * concurrency
+    errors = [0] * concurrency
+    stop_at = time.time() + duration
+
+    def client(idx):
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        while time.time() < stop_at:
+            try:
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status == 200:
+                    counts[idx] += 1
+                else:
+                    errors[idx] += 1
+            except (OSError, http.client.HTTPException):
+                errors[idx] += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+        conn.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return sum(counts), sum(errors)
+
+
+def run_load(host, port, path, concurrency, duration, procs):
+    """concurrency 개의 클라이언트를 procs 개의 프로세스에 나눠서 요청 -> (req/s, 에러 수)"""
+    procs = max(1, min(procs, concurrency))
+    shares = [concurrency // procs + (1 if i < concurrency % procs else 0) for i in range(procs)]
+    with multiprocessing.Pool(procs) as pool:
+        results = pool.starmap(_load_proc, [(host, port, path, share, duration) for share in shares])
+    return sum(ok for ok, _ in results) / duration, sum(err for _, err in results)
+
+
+def run_external(tool, host, port, path, concurrency, duration, procs):
+    """wrk / hey 로 부하 -> (req/s, 에러 수)"""
+    url = f"http://{host}:{port}{path}"
+    seconds = f"{max(1, round(duration))}s"
+    if tool == "wrk":
+        cmd = ["wrk", f"-t{max(1, min(procs, concurrency))}", f"-c{concurrency}", f"-d{seconds}", url]
+    else:
+        cmd = ["hey", "-z", seconds, "-c", str(concurrency), url]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    match = re.search(r"Requests/sec:\s*([\d.]+)", out)
+    if match is None:
+        raise RuntimeError(f"{tool} 출력에서 Requests/sec 를 찾지 못했습니다:\n{out}")
+    if tool == "wrk":
+        errors = sum(int(n) for n in re.findall(r"Non-2xx or 3xx responses:\s*(\d+)", out))
+        errors += sum(int(n) for n in re.findall(r"(?:connect|read|write|timeout) (\d+)", out))
+    else:
+        errors = sum(int(n) for code, n in re.findall(r"\[(\d{3})\]\s+(\d+) responses", out) if code != "200")
+    return float(match.group(1)), errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", default="/api/get-visit-count/Gyeongbokgung")
+    parser.add_argument("--tool", choices=("python", "wrk", "hey"), default="python")
+    parser.add_argument("--load-procs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="부하를 거는 프로세스 수 (python) / wrk 스레드 수")
+    parser.add_argument("--min-speedup", type=float, default=1.5,
+                        help="최소 워커 수 대비 최대 워커 수의 처리량 배율 하한 (0 이면 검사 안 함)")
+    args = parser.parse_args()
+
+    host = "127.0.0.1"
+    if args.tool != "python" and shutil.which(args.tool) is None:
+        print(f"❌ {args.tool} 가 설치돼 있지 않습니다")
+        return 2
+
+    def load(duration):
+        if args.tool == "python":
+            return run_load(host, args.port, args.path, args.concurrency, duration, args.load_procs)
+        return run_external(args.tool, host, args.port, args.path, args.concurrency, duration, args.load_procs)
+
+    print(f"🧪 부하 테스트: {args.path} / 동시 {args.concurrency} / {args.duration}s / CPU {os.cpu_count()}개 "
+          f"/ 부하 {args.tool} ({args.load_procs}프로세스)")
+    results = []
+    failed = False
+    for n in args.workers:
+        env = dict(os.environ, WEB_CONCURRENCY=str(n), KTRIP_BIND=f"{host}:{args.port}", KTRIP_WARMUP="0")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+             "--access-logfile", "/dev/null", "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_until_ready(host, args.port):
+                print(f"❌ 워커 {n}개 서버가 뜨지 않았습니다")
+                failed = True
+                continue
+            load(1)  # 예열
+            rps, errors = load(args.duration)
+            results.append((n, rps))
+            print(f"   워커 {n}개: {rps:,.0f} req/s (에러 {errors}건)")
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    if len(results) > 1:
+        results.sort()
+        base = results[0][1] or 1
+        print(f"📈 {results[0][0]}워커 대비 배율: " + ", ".join(f"{n}워커 x{rps / base:.2f}" for n, rps in results))
+        speedup = results[-1][1] / base
+        if args.min_speedup and speedup < args.min_speedup:
+            print(f"❌ {results[-1][0]}워커 배율 x{speedup:.2f} < 기준 x{args.min_speedup:.2f}")
+            return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,15 @@
-from fastapi import FastAPI, Request,UploadFile, File, Form, Body
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request,UploadFile, File, Form, Body, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse # [추가] HTML 파일을 직접 보내기 위해 필요
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-import json
+import asyncio
+import sqlite3
 import sys
 import os
 import uuid
-import sqlite3
-from azure.storage.blob import BlobServiceClient
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -22,19 +23,57 @@ DB_PATH = os.path.join(current_dir, "ktrip.db")
 
 sys.path.append(current_dir)
 
+from app import fast_json
+from app.compression import CompressionMiddleware
+from app.fast_json import FastJSONResponse
 from app.llm import get_ai_recommendation, modify_ai_recommendation
 from app.ocr import analyze_menu_image
-
-app = FastAPI()
+from app.menu_batch import translate_menus
+from app.static_assets import get_asset_store
+from app.clients import get_blob_service_client, start_background_warm_up
+from app.upstream import UpstreamOverloaded, upstream_status
+from app.itinerary_templates import get_template, record_survey, refresh_template
+from app.planner import plan_itinerary
+from app.region_catalog import region_near
+from app.itinerary_sessions import create_session, load_session, update_session
+from app.plan_store import PlanNotFound, get_plan_store
+from app.visit_analytics import flush_visits, record_visit, start_visit_refresher, trending_now
+from app.dish_memory import flush_dish_hits
+from app import profiling
+from app.photo_jobs import MAX_PHOTO_BYTES, InvalidPhotoRequest, enqueue_photo, get_photo_job, resume_pending_jobs, shutdown_pool
+from app.shared_state import get_shared_store, register_startup_hook, run_startup_hooks
 
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
 CONTAINER_NAME = "photos"
+# 이 시간 안에 GPT 일정이 안 나오면 규칙 기반 플래너 결과로 응답
+RECOMMEND_BUDGET_SEC = float(os.getenv("KTRIP_RECOMMEND_BUDGET_SEC", "25"))
 
-if AZURE_STORAGE_CONNECTION_STRING:
-    blob_service_client = BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-else:
+if not AZURE_STORAGE_CONNECTION_STRING:
     print("⚠️ 경고: .env 파일에 AZURE_STORAGE_CONNECTION_STRING이 없습니다.")
 
+# 무거운 SDK(Azure Blob / Document Intelligence / OpenAI)는 첫 사용 시 로드됩니다.
+# 서버가 뜬 직후 백그라운드에서 미리 데워두기 (KTRIP_WARMUP=0 으로 끌 수 있음)
+# 멀티 워커(gunicorn.conf.py)에서는 워커마다 한 번씩 실행됩니다.
+@asynccontextmanager
+async def lifespan(app):
+    print(f"🚀 워커 시작 (pid={os.getpid()})")
+    start_background_warm_up()
+    run_startup_hooks()
+    yield
+    flush_visits()  # 버퍼에 남은 방문 기록 저장
+    flush_dish_hits()  # 메모리에 모아둔 메뉴 조회수 저장
+    shutdown_pool()  # 이 워커가 처리 중이던 사진 변환은 queued 로 되돌림 -> 다음 시작 때 resume_pending_jobs 가 처리
+
+# 응답 직렬화는 KTRIP_FAST_JSON=1 이면 orjson, 1KB 넘는 /api 응답은 br/gzip 압축 (app/fast_json.py, app/compression.py)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+
+# 워커가 뜰 때 만료된 공유 캐시 정리
+@register_startup_hook
+def purge_shared_cache():
+    removed = get_shared_store().purge_expired()
+    if removed:
+        print(f"🧹 만료된 공유 캐시 {removed}건 정리")
+
 # 2. CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -43,6 +82,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+
+# 요청 단위 CPU/메모리 프로파일링 (KTRIP_PROFILE_TOKEN 이 있을 때만 등록, app/profiling.py)
+if profiling.profiling_enabled():
+    app.add_middleware(profiling.ProfilingMiddleware)
+
+# Azure 호출 대기열이 가득 차면 빈 결과 대신 503 + Retry-After 로 빠르게 거절
+@app.exception_handler(UpstreamOverloaded)
+async def upstream_overloaded_handler(request: Request, exc: UpstreamOverloaded):
+    print(f"🚦 [과부하] {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is busy. Please try again shortly.", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 # 3. 데이터 모델 정의
 class SurveyRequest(BaseModel):
     target_area: str
@@ -55,38 +110,97 @@ class SurveyRequest(BaseModel):
     need_cafe: str
     photo_priority: str
     record_method: str
+    mode: str = "ai"  # "instant" 이면 LLM 없이 규칙 기반 플래너로 즉시 응답
+    lat: Optional[float] = None  # 사용자 현재 위치 ("Auto-detect my location") -> 그 지역 장소로 일정
+    lng: Optional[float] = None
 
 class ModifyRequest(BaseModel):
-    current_spots: list
-    user_request: str
+    session_id: Optional[str] = None     # /api/recommend 가 발급한 서버 세션
+    message: Optional[str] = None
+    current_spots: Optional[list] = None  # 세션이 없거나 만료됐을 때만 (새 세션 생성)
+    user_request: Optional[str] = None    # 예전 클라이언트 호환 (= message)
+
+# 일정 응답마다 서버 세션을 만들어 session_id 를 같이 내려줌 (/api/modify 는 id + 메시지만 받음)
+async def with_session(result):
+    if isinstance(result, dict) and result.get("spots"):
+        result = dict(result, session_id=await run_in_threadpool(create_session, result["spots"]))
+    return result
 
 # 4. API 엔드포인트
 @app.post("/api/recommend")
-async def recommend_trip(request: SurveyRequest):
+async def recommend_trip(request: SurveyRequest, background_tasks: BackgroundTasks):
     print(f"📩 [초기 요청] {request.dict()}")
-    user_query_json = json.dumps(request.dict(), ensure_ascii=False)
-    ai_response_str = get_ai_recommendation(user_query_json)
+    survey = request.dict()
+    mode = survey.pop("mode", "ai")
+    lat, lng = survey.pop("lat", None), survey.pop("lng", None)
+    if lat is not None and lng is not None:
+        region = await run_in_threadpool(region_near, lat, lng)
+        if region:
+            survey["region"] = region  # get_db_info 가 target_area 대신 사용, 템플릿 키에도 포함
+    if mode == "instant":
+        return await with_session(fast_json.loads(await run_in_threadpool(plan_itinerary, survey, "instant")))
+    await run_in_threadpool(record_survey, survey)
+
+    # 미리 만들어둔 인기 조합 일정이 있으면 즉시 응답 (카탈로그가 바뀌었으면 뒤에서 갱신)
+    cached = await run_in_threadpool(get_template, survey)
+    if cached:
+        itinerary, is_stale = cached
+        print(f"⚡ [템플릿 적중] stale={is_stale}")
+        if is_stale:
+            background_tasks.add_task(refresh_template, survey)
+        return await with_session(itinerary)
+
+    user_query_json = fast_json.dumps(survey)
+    # LLM 호출은 블로킹이므로 스레드풀에서 실행 (이벤트 루프가 다른 요청을 계속 받도록)
+    # 지연 예산 초과 / Azure 과부하 / 빈 결과면 규칙 기반 플래너로 대체
+    # (시간 초과된 GPT 호출은 스레드에서 끝까지 돌고 결과는 버려짐)
     try:
-        return json.loads(ai_response_str)
-    except:
-        return {"spots": []}
+        ai_response_str = await asyncio.wait_for(
+            run_in_threadpool(get_ai_recommendation, user_query_json), timeout=RECOMMEND_BUDGET_SEC
+        )
+        result = fast_json.loads(ai_response_str)
+        if result.get("spots"):
+            return await with_session(result)
+        print("⚠️ [추천] GPT 결과가 비어 있어 규칙 기반 일정으로 대체")
+    except asyncio.TimeoutError:
+        print(f"⏱️ [추천] {RECOMMEND_BUDGET_SEC:.0f}초 초과, 규칙 기반 일정으로 대체")
+    except UpstreamOverloaded as e:
+        print(f"🚦 [추천] {e}, 규칙 기반 일정으로 대체")
+    except Exception as e:
+        print(f"❌ [추천] GPT 응답 처리 실패 ({e}), 규칙 기반 일정으로 대체")
+    return await with_session(fast_json.loads(await run_in_threadpool(plan_itinerary, survey, "fallback")))
 
 @app.post("/api/modify")
 async def modify_trip(request: ModifyRequest):
-    print(f"💬 [수정 요청] '{request.user_request}'")
-    current_plan = {"spots": request.current_spots}
-    updated_json_str = modify_ai_recommendation(current_plan, request.user_request)
+    message = request.message or request.user_request or ""
+    print(f"💬 [수정 요청] '{message}' (session={request.session_id})")
+    session_id = request.session_id
+    spots = await run_in_threadpool(load_session, session_id)
+    if spots is None:
+        if request.current_spots is None:
+            # 클라이언트가 current_spots 로 다시 보내면 새 세션을 만들어 이어감
+            return JSONResponse(status_code=404, content={"error": "session_expired"})
+        spots = request.current_spots
+        session_id = None
+
+    current_plan = {"spots": spots}
+    updated_json_str = await run_in_threadpool(modify_ai_recommendation, current_plan, message)
     try:
-        return json.loads(updated_json_str)
+        result = fast_json.loads(updated_json_str)
     except:
         print("❌ AI 응답 파싱 실패")
-        return {"spots": request.current_spots}
+        result = current_plan
+    if session_id:
+        await run_in_threadpool(update_session, session_id, result.get("spots", spots))
+        return dict(result, session_id=session_id)
+    return await with_session(result)
     
 
 @app.post("/api/upload-and-count")
 async def upload_and_count(
     file: UploadFile = File(None), # None 허용으로 변경 (사진 없이 저장만 할 때 대비)
-    place_name: str = Form(...)
+    place_name: str = Form(...),
+    location_id: Optional[int] = Form(None)
 ):
     try:
         image_url = None
@@ -94,25 +208,28 @@ async def upload_and_count(
         if file:
             file_ext = file.filename.split(".")[-1]
             unique_filename = f"{uuid.uuid4()}.{file_ext}"
-            blob_client = blob_service_client.get_blob_client(container=CONTAINER_NAME, blob=unique_filename)
+            blob_client = get_blob_service_client().get_blob_client(container=CONTAINER_NAME, blob=unique_filename)
             contents = await file.read()
             blob_client.upload_blob(contents)
             image_url = blob_client.url
 
         # SQLite DB 방문 카운트 증가 (이 부분은 항상 실행)
-        conn = sqlite3.connect(DB_PATH)
+        # RETURNING 으로 증가와 조회를 한 문장에서 처리 -> 여러 워커가 동시에 올려도 경합 없음
+        conn = sqlite3.connect(DB_PATH, timeout=30)
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO visited_spots (place_name, count) 
             VALUES (?, 1)
             ON CONFLICT(place_name) DO UPDATE SET count = count + 1
+            RETURNING count
         """, (place_name,))
-        
-        cursor.execute("SELECT count FROM visited_spots WHERE place_name = ?", (place_name,))
         updated_count = cursor.fetchone()[0]
         conn.commit()
         conn.close()
 
+        # 시간대별 방문 통계 (버퍼에 넣고 바로 반환, app/visit_analytics.py)
+        record_visit(place_name, location_id)
+
         return {"success": True, "newCount": updated_count, "imageUrl": image_url}
     except Exception as e:
         return {"success": False, "error": str(e)}    
@@ -121,60 +238,107 @@ async def upload_and_count(
 # [핵심 수정] 5. HTML 페이지 라우팅 (이정표 세우기)
 # =========================================================
 
+# HTML/CSS/JS 는 app/static_assets.py 가 미리 압축 + ETag/304 + 지문 URL 캐시로 제공
+def serve_frontend(request: Request, rel_path: str):
+    return get_asset_store(frontend_path).response(request, rel_path)
+
+# 워커가 뜰 때 정적 파일 압축을 미리 해두기 (첫 요청이 기다리지 않도록)
+@register_startup_hook
+def build_static_assets():
+    get_asset_store(frontend_path)
+
 # (1) 메인 홈 (http://localhost:8000/) -> index.html
-@app.get("/")
-async def read_root():
-    return FileResponse(os.path.join(frontend_path, "index.html"))
+@app.api_route("/", methods=["GET", "HEAD"])
+async def read_root(request: Request):
+    return serve_frontend(request, "index.html")
 
 # (2) 설문조사 (http://localhost:8000/survey) -> survey.html
-@app.get("/survey")
-async def read_survey():
-    return FileResponse(os.path.join(frontend_path, "survey.html"))
-
-# (3) 결과 페이지
-@app.get("/result.html")
-async def read_result():
-    return FileResponse(os.path.join(frontend_path, "result.html"))
-
-# (4) 채팅 페이지
-@app.get("/chat.html")
-async def read_chat():
-    return FileResponse(os.path.join(frontend_path, "chat.html"))
-
-# (5) 저장됨 페이지
-@app.get("/saved.html")
-async def read_saved():
-    return FileResponse(os.path.join(frontend_path, "saved.html"))
-
-# (6) 포토 페이지
-@app.get("/photo.html")
-async def read_photo():
-    return FileResponse(os.path.join(frontend_path, "photo.html"))
+@app.api_route("/survey", methods=["GET", "HEAD"])
+async def read_survey(request: Request):
+    return serve_frontend(request, "survey.html")
 
 @app.post("/api/save-plan")
 async def save_plan(plan_data: dict = Body(...)):
     try:
-        # 1. 데이터를 JSON 문자열로 변환
-        json_content = json.dumps(plan_data, ensure_ascii=False, indent=2)
-        
-        # 2. 파일명 생성 (예: 20251231_uuid.json)
-        filename = f"{uuid.uuid4()}.json"
-        
-        # 3. Azure Blob Storage 'plans' 컨테이너에 업로드
-        # (주의: 컨테이너 이름이 'plans'인지 확인하세요!)
-        blob_client = blob_service_client.get_blob_client(container="plans", blob=filename)
-        blob_client.upload_blob(json_content)
-        
-        print(f"✅ 경로 데이터 저장 완료: {filename}")
-        return {"success": True, "filename": filename}
+        # 정규화한 내용의 sha256 이 plan_id -> 같은 일정은 다시 업로드하지 않음 (app/plan_store.py)
+        plan_id, deduplicated = await run_in_threadpool(get_plan_store().save, plan_data)
+        print(f"✅ 경로 데이터 저장 완료: {plan_id[:12]} (중복={deduplicated})")
+        return {"success": True, "plan_id": plan_id, "filename": f"{plan_id}.json.gz", "deduplicated": deduplicated}
     except Exception as e:
         print(f"❌ 경로 저장 실패: {e}")
         return {"success": False, "error": str(e)}
+
+@app.get("/api/plans")
+async def list_plans(limit: int = 20, offset: int = 0, area: Optional[str] = None, duration: Optional[str] = None):
+    plans = await run_in_threadpool(get_plan_store().list, limit, offset, area, duration)
+    return {"plans": plans}
+
+@app.get("/api/plans/{plan_id}")
+async def get_plan(plan_id: str):
+    try:
+        return await run_in_threadpool(get_plan_store().get, plan_id)
+    except PlanNotFound:
+        return JSONResponse(status_code=404, content={"error": "plan_not_found"})
+
+# 방문 통계 flush / trending 스냅샷 갱신 스레드 (방문 기록이 없어도 스냅샷이 주기적으로 새로 계산되도록)
+register_startup_hook(start_visit_refresher)
+
+@app.get("/api/trending")
+async def get_trending(k: int = 10):
+    items = await run_in_threadpool(trending_now, max(1, min(k, 50)))
+    return {"trending": items}
+
+# 사진 스타일 변환: 요청은 바로 job_id 를 받고, 변환은 프로세스 풀에서 (app/photo_jobs.py)
+@app.post("/api/photo-jobs", status_code=202)
+async def create_photo_job(file: UploadFile = File(...), style: str = Form("default")):
+    data = await file.read(MAX_PHOTO_BYTES + 1)  # 한도를 넘는지만 알면 되므로 그 이상은 읽지 않음
+    try:
+        job_id, deduplicated = await run_in_threadpool(enqueue_photo, data, style, file.filename or "")
+    except InvalidPhotoRequest as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    job = await run_in_threadpool(get_photo_job, job_id)
+    return photo_job_response(job, deduplicated)
+
+@app.get("/api/photo-jobs/{job_id}")
+async def read_photo_job(job_id: str):
+    job = await run_in_threadpool(get_photo_job, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "job_not_found"})
+    return photo_job_response(job)
+
+@app.get("/api/photo-jobs/{job_id}/image")
+async def read_photo_job_image(job_id: str, size: Optional[int] = None):
+    job = await run_in_threadpool(get_photo_job, job_id)
+    if job is None or job["status"] != "done":
+        return JSONResponse(status_code=404, content={"error": "image_not_ready"})
+    path = job["thumbnails"].get(str(size)) if size else job["converted_image_path"]
+    if not path or not os.path.exists(path):
+        return JSONResponse(status_code=404, content={"error": "image_not_found"})
+    # 파일명이 내용 해시라 내용이 바뀌지 않음 -> 오래 캐시
+    return FileResponse(path, media_type="image/jpeg", headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+def photo_job_response(job, deduplicated=False):
+    result = {"job_id": job["job_id"], "status": job["status"], "style": job["style"], "deduplicated": deduplicated}
+    if job["status"] == "done":
+        base = f"/api/photo-jobs/{job['job_id']}/image"
+        result["image_url"] = base
+        result["thumbnails"] = {size: f"{base}?size={size}" for size in job["thumbnails"]}
+    elif job["status"] == "failed":
+        result["error"] = job["error"]
+    return result
+
+# 재시작 전에 끝나지 못한 변환 작업 다시 처리
+@register_startup_hook
+def resume_photo_jobs():
+    resumed = resume_pending_jobs()
+    if resumed:
+        print(f"🖼️ 대기 중이던 사진 변환 {resumed}건 재개")
+
 @app.get("/api/get-visit-count/{place_name}")
 async def get_visit_count(place_name: str):
     try:
         # DB 연결
-        conn = sqlite3.connect(DB_PATH)
+        conn = sqlite3.connect(DB_PATH, timeout=30)
         cursor = conn.cursor()
         
         # 해당 장소의 카운트 조회
@@ -192,6 +356,11 @@ async def get_visit_count(place_name: str):
         print(f"❌ 조회 실패: {e}")
         return {"success": False, "count": 0}
 
+@app.get("/api/upstream-status")
+def get_upstream_status():
+    # 엔드포인트별 동시성 한도 / 대기열 / 재시도 현황 (운영 모니터링용)
+    return upstream_status()
+
 @app.get("/api/config")
 def get_config():
     # 환경 변수에서 키를 읽어서 프론트엔드에 전달
@@ -205,11 +374,72 @@ async def analyze_menu(file: UploadFile = File(...)):
     image_data = await file.read()
     
     # 2. OCR 및 AI 분석 시작
-    result = analyze_menu_image(image_data)
+    result = await run_in_threadpool(analyze_menu_image, image_data)
     
     return result
 
-# 6. 정적 파일 (CSS, JS, 이미지 등) 연결 - 가장 마지막에 배치!
-# 위에서 정의하지 않은 나머지 파일들을 frontend 폴더에서 찾음
-app.mount("/", StaticFiles(directory=frontend_path), name="frontend")
+MENU_BATCH_MAX_FILES = int(os.getenv("KTRIP_MENU_BATCH_MAX", "50"))
+
+@app.post("/api/analyze-menu/batch")
+async def analyze_menu_batch(files: List[UploadFile] = File(...)):
+    # 여러 장을 OCR/번역 파이프라인으로 동시에 처리하고, 끝나는 순서대로 한 줄씩(NDJSON) 스트리밍
+    if len(files) > MENU_BATCH_MAX_FILES:
+        return JSONResponse(status_code=413, content={"error": f"Too many files (max {MENU_BATCH_MAX_FILES})"})
+    print(f"📸 [일괄 이미지 수신] {len(files)}장")
+
+    filenames = [f.filename for f in files]
+    images = [await f.read() for f in files]
+
+    def stream():
+        for index, result in translate_menus(images):
+            line = {"index": index, "filename": filenames[index], "result": result}
+            yield fast_json.dumps(line) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# 프로파일링 관리: X-KTrip-Admin-Token 헤더가 KTRIP_PROFILE_TOKEN 과 같아야 함 (설정이 없으면 404)
+class ProfilingToggle(BaseModel):
+    requests: int = 1                # 다음 N개 요청을 프로파일 (0 이면 해제)
+    path_prefix: str = "/api/"
+    ttl_sec: int = 600
+    mode: str = profiling.DEFAULT_MODE  # cpu (스택 샘플링) / alloc (tracemalloc)
+
+def admin_error(request: Request):
+    if not profiling.profiling_enabled():
+        return JSONResponse(status_code=404, content={"error": "profiling_disabled"})
+    if not profiling.check_token(request.headers.get(profiling.ADMIN_HEADER)):
+        return JSONResponse(status_code=403, content={"error": "forbidden"})
+    return None
+
+@app.post("/api/admin/profiling")
+async def arm_profiling(request: Request, toggle: ProfilingToggle):
+    error = admin_error(request)
+    if error:
+        return error
+    if toggle.mode not in profiling.MODES:
+        return JSONResponse(status_code=400, content={"error": f"mode must be one of {', '.join(profiling.MODES)}"})
+    return await run_in_threadpool(profiling.arm, toggle.requests, toggle.path_prefix, toggle.ttl_sec, toggle.mode)
+
+@app.get("/api/admin/profiles")
+async def list_profiles(request: Request, limit: int = 20):
+    error = admin_error(request)
+    if error:
+        return error
+    return {"profiles": await run_in_threadpool(profiling.list_profiles, max(1, min(limit, 100)))}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def download_profile(request: Request, profile_id: str, kind: str = "speedscope"):
+    error = admin_error(request)
+    if error:
+        return error
+    path = profiling.profile_path(profile_id, kind)
+    if path is None:
+        return JSONResponse(status_code=404, content={"error": "profile_not_found"})
+    return FileResponse(path, media_type="application/json", filename=os.path.basename(path))
+
+# 6. 정적 파일 (HTML, CSS, JS, 이미지 등) 연결 - 가장 마지막에 배치!
+# 위에서 정의하지 않은 나머지 경로(result.html, style.<hash>.css 등)를 frontend 폴더에서 찾음
+@app.api_route("/{rel_path:path}", methods=["GET", "HEAD"])
+async def read_frontend(request: Request, rel_path: str):
+    return serve_frontend(request, rel_path)
 
@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+
+# (경로 설정) 어디서 실행하든 backend/app 을 찾도록
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from app.menu_layout import build_menu_rows, format_rows, normalize_price  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name):
+    # Document Intelligence prebuilt-read 의 result.as_dict() 를 저장한 JSON
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_normalize_price():
+    assert normalize_price("3,500") == "3500"
+    assert normalize_price("4000원") == "4000"
+    assert normalize_price("8.0") == "8000"
+    assert normalize_price("₩12,000") == "12000"
+    assert normalize_price("우동") is None
+
+
+def test_single_column_menu_joins_spaced_glyphs_and_pairs_prices():
+    rows = build_menu_rows(load_fixture("menu_single_column.json"))
+
+    assert rows == [
+        {"name": "우동", "price": "3500"},       # "우      동" -> 자간 정렬 글자 합치기
+        {"name": "김치 우동", "price": "4000"},  # 단어끼리는 띄어쓰기 유지
+        {"name": "돈까스", "price": "7000"},     # "돈까스7,000" 처럼 붙은 가격 분리
+        {"name": "라면", "price": "3500"},       # 점선 무시 + "3.5" 천원 단위 표기
+        {"name": "떡볶이", "price": "4500"},     # 떨어져 있는 ₩ 기호 무시
+    ]
+
+
+def test_two_column_menu_splits_rows_into_separate_dishes():
+    rows = build_menu_rows(load_fixture("menu_two_columns.json"))
+
+    assert rows == [
+        {"name": "비빔밥", "price": "8000"},
+        {"name": "냉면", "price": "9000"},
+        {"name": "김치찌개", "price": "8500"},
+        {"name": "된장찌개", "price": "8000"},
+        {"name": "보쌈", "price": "소 25000/대 35000"},
+    ]
+
+
+def test_price_row_below_names_matches_by_column():
+    rows = build_menu_rows(load_fixture("menu_price_row.json"))
+
+    assert rows[:3] == [
+        {"name": "아메리카노", "price": "4000"},
+        {"name": "카페라떼", "price": "4500"},
+        {"name": "바닐라라떼", "price": "5000"},
+    ]
+    # 좌표가 없는 페이지는 줄 텍스트를 그대로 (빈 줄 제외)
+    assert rows[3:] == [{"name": "오늘의 디저트 5,500", "price": None}]
+
+
+def test_format_rows():
+    rows = build_menu_rows(load_fixture("menu_single_column.json"))[:2] + [{"name": "공기밥", "price": None}]
+
+    assert format_rows(rows) == "0. 우동 | 3500\n1. 김치 우동 | 4000\n2. 공기밥 | -"